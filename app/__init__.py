@@ -32,6 +32,10 @@ def create_app(config_class='app.config.Config'):
     jwt.init_app(app)
     mail.init_app(app) # Mail eklentisini başlatın
     
+    # Oturum verisi sunucuda tutulur; çerezde yalnızca imzalı oturum kimliği bulunur
+    from app.sessions import init_session_store
+    init_session_store(app)
+    
     # Scheduler'ı başlat
     scheduler.start()
     
@@ -60,10 +64,18 @@ def create_app(config_class='app.config.Config'):
     app.register_blueprint(subscription_bp)
     app.register_blueprint(user_profile_bp)
     
+    # Paylaşılan OpenAI istemcisi; başlangıçta bir kez yoklanır, sonrasında durumu devre kesici izler
+    from app.services.llm_client import init_llm_client
+    init_llm_client(app)
+    
     # Register error handlers
     from app.routes.errors import register_error_handlers
     register_error_handlers(app)
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Add template context processors
     @app.context_processor
     def inject_now():
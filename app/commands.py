@@ -0,0 +1,32 @@
+import click
+from flask.cli import AppGroup
+
+ratings_cli = AppGroup('ratings', help='Maintain the stored psychologist rating aggregates.')
+
+
+@ratings_cli.command('backfill')
+def backfill_ratings():
+    """Recompute rating_sum/rating_count from the reviews table"""
+    from app.services.psychologist_service import PsychologistService
+    updated = PsychologistService.backfill_ratings()
+    click.echo(f"Updated rating aggregates for {updated} psychologist(s).")
+
+
+@ratings_cli.command('check')
+def check_ratings():
+    """Report psychologists whose stored aggregates do not match their reviews"""
+    from app.services.psychologist_service import PsychologistService
+    mismatches = PsychologistService.check_rating_consistency()
+    for psychologist, expected_sum, expected_count in mismatches:
+        click.echo(
+            f"{psychologist.id} {psychologist.full_name}: stored {psychologist.rating_sum}/{psychologist.rating_count}, "
+            f"expected {expected_sum}/{expected_count}"
+        )
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} psychologist(s) have inconsistent rating aggregates.")
+    click.echo("Rating aggregates are consistent.")
+
+
+def register_commands(app):
+    """Register custom CLI commands for the application"""
+    app.cli.add_command(ratings_cli)
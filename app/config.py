@@ -11,6 +11,42 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-dev-key-for-development-only')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    # Psikolog dizini önbelleğinin ömrü (saniye); boş bırakılırsa sadece değişikliklerde yenilenir
+    PSYCHOLOGIST_DIRECTORY_TTL = int(os.environ.get('PSYCHOLOGIST_DIRECTORY_TTL', 300)) or None
+    # Bellekte tutulacak en fazla hazır PDF raporu sayısı (0 önbelleği kapatır)
+    REPORT_CACHE_SIZE = int(os.environ.get('REPORT_CACHE_SIZE', 64))
+    # ?async=1 ile istenen raporları hazırlayan iş parçacığı sayısı ve sonuçların saklanma süresi (saniye)
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    REPORT_JOB_TTL = int(os.environ.get('REPORT_JOB_TTL', 600))
+    # Oturum deposu: 'sqlite' (varsayılan, instance/sessions.db), 'memory' veya 'cookie' (Flask'in imzalı çerezi)
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+    SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH')
+    SESSION_TTL = int(os.environ.get('SESSION_TTL', 7 * 24 * 3600))
+    # Sohbet isteminde gönderilen son mesaj sayısı; daha eskileri özet olarak eklenir
+    CHAT_HISTORY_WINDOW = int(os.environ.get('CHAT_HISTORY_WINDOW', 20))
+    # Sohbet istemi için token bütçesi (sistem mesajı + geçmiş + yeni mesaj); sığmayan eski mesajlar özete eklenir
+    CHAT_PROMPT_TOKEN_BUDGET = int(os.environ.get('CHAT_PROMPT_TOKEN_BUDGET', 4000))
+    # Bir mesajda en fazla kaç araç çağrısı turu yapılır ve aynı turdaki araçları paralel çalıştıran iş parçacığı sayısı
+    CHAT_MAX_TOOL_ROUNDS = int(os.environ.get('CHAT_MAX_TOOL_ROUNDS', 3))
+    CHAT_TOOL_WORKERS = int(os.environ.get('CHAT_TOOL_WORKERS', 4))
+    # Sohbet aracı sonuç önbelleği: en fazla kayıt sayısı (0 kapatır) ve kayıt ömrü (saniye)
+    TOOL_CACHE_SIZE = int(os.environ.get('TOOL_CACHE_SIZE', 512))
+    TOOL_CACHE_TTL = int(os.environ.get('TOOL_CACHE_TTL', 300))
+    # OpenAI istemcisi: istek zaman aşımları (saniye), bağlantı havuzu, aynı anda en fazla istek sayısı,
+    # boş yer beklenecek süre ve 429/5xx yanıtlarında yeniden deneme sayısı
+    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')
+    LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+    LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', 20))
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 10))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+    LLM_STARTUP_PROBE = True
+    # OpenAI devre kesicisi: art arda kaç hatada devre açılır ve yeniden deneme bekleme süreleri (saniye)
+    LLM_FAILURE_THRESHOLD = int(os.environ.get('LLM_FAILURE_THRESHOLD', 3))
+    LLM_HEALTH_BACKOFF = int(os.environ.get('LLM_HEALTH_BACKOFF', 5))
+    LLM_HEALTH_MAX_BACKOFF = int(os.environ.get('LLM_HEALTH_MAX_BACKOFF', 300))
     # Mail Server Ayarları
 # Mail Server Ayarları - Bu satırları sınıf içine taşıyın
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -28,6 +64,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///C:/Users/XYZ/Desktop/ModeCALM//ModeCALM/PsikologSitesi/instance/app.db'
+    SESSION_BACKEND = 'memory'
+    LLM_STARTUP_PROBE = False
     
 class ProductionConfig(Config):
     """Production configuration"""
@@ -1,4 +1,6 @@
 # Import models to make them available when importing from the models package
 from app.models.user import User
 from app.models.psychologist import Psychologist
-from app.models.appointment import Appointment
\ No newline at end of file
+from app.models.psychologist_specialty import PsychologistSpecialty
+from app.models.appointment import Appointment
+from app.models.chat import ChatConversation, ChatMessage
\ No newline at end of file
@@ -1,10 +1,22 @@
 from datetime import datetime
 from app import db
+from sqlalchemy import text
 
 
 class Appointment(db.Model):
     """Appointment model for storing appointment information"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Conflict checks, availability and booking: psychologist + slot + status
+        db.Index('ix_appointments_psychologist_slot', 'psychologist_id', 'appointment_date', 'appointment_time', 'status'),
+        # Upcoming/past appointment lists of a user
+        db.Index('ix_appointments_user_status_date', 'user_id', 'status', 'appointment_date'),
+        # A slot can only hold one planned appointment; cancelled/completed rows are not constrained
+        db.Index('uq_appointments_planned_slot', 'psychologist_id', 'appointment_date', 'appointment_time',
+                 unique=True,
+                 sqlite_where=text("status = 'planned'"),
+                 postgresql_where=text("status = 'planned'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -13,6 +25,7 @@ class Appointment(db.Model):
     appointment_time = db.Column(db.Time, nullable=False)
     status = db.Column(db.String(50), default='planned', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     def __repr__(self):
         return f"Appointment('{self.appointment_date}', '{self.appointment_time}', '{self.status}')"
@@ -39,4 +52,12 @@ class Appointment(db.Model):
             appointment_date=appointment_date,
             appointment_time=appointment_time,
             status='planned'
-        ).first() is not None
\ No newline at end of file
+        ).first() is not None
+    
+    @staticmethod
+    def is_slot_conflict(error):
+        """Check if an IntegrityError comes from the uq_appointments_planned_slot index"""
+        message = str(getattr(error, 'orig', error))
+        # PostgreSQL names the index; SQLite lists the indexed columns instead
+        columns = ', '.join(f'appointments.{name}' for name in ('psychologist_id', 'appointment_date', 'appointment_time'))
+        return 'uq_appointments_planned_slot' in message or f'UNIQUE constraint failed: {columns}' in message
\ No newline at end of file
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+from app import db
+
+
+def default_user_context(message=''):
+    """Context the consultant tracks for a new conversation"""
+    return {
+        'symptoms': [],
+        'preferred_specialty': None,
+        'preferred_gender': None,
+        'language': 'Turkish' if any(char in message for char in 'çğıöşüÇĞIÖŞÜ') else 'English'
+    }
+
+
+class ChatConversation(db.Model):
+    """A chatbot conversation; older turns are folded into a rolling summary"""
+    __tablename__ = 'chat_conversations'
+    __table_args__ = (
+        # Latest open conversation of a user
+        db.Index('ix_chat_conversations_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    summary = db.Column(db.Text, nullable=True)  # Rolling summary of turns outside the window
+    summarized_through_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Last ChatMessage.id in the summary
+    context = db.Column(db.Text, nullable=True)  # JSON: symptoms, preferred specialty, language
+    closed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    messages = db.relationship('ChatMessage', backref='conversation', lazy='dynamic', cascade='all, delete-orphan')
+
+    def get_context(self):
+        """Return the user context dict"""
+        if self.context:
+            try:
+                return json.loads(self.context)
+            except json.JSONDecodeError:
+                pass
+        return default_user_context()
+
+    def set_context(self, context):
+        """Store the user context dict"""
+        self.context = json.dumps(context, ensure_ascii=False)
+
+    def __repr__(self):
+        return f"ChatConversation(user_id={self.user_id}, created_at='{self.created_at}')"
+
+
+class ChatMessage(db.Model):
+    """A single user or assistant turn"""
+    __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # Windowed loading of the most recent turns
+        db.Index('ix_chat_messages_conversation_id', 'conversation_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('chat_conversations.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # 'user' or 'assistant'
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_prompt(self):
+        """Message in the chat completions format"""
+        return {'role': self.role, 'content': self.content}
+
+    def __repr__(self):
+        return f"ChatMessage('{self.role}', '{self.content[:30]}')"
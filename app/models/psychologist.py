@@ -1,7 +1,54 @@
 import json
+from datetime import datetime
 from app import db
-from app.models.review import Review
-from sqlalchemy import func
+from app.models.psychologist_specialty import PsychologistSpecialty, normalize_specialty
+from sqlalchemy import event
+
+
+def parse_specialties(value):
+    """Parse a JSON or comma-separated specialties string into a list"""
+    if not value:
+        return []
+
+    try:
+        # Try to parse as JSON
+        return json.loads(value)
+    except json.JSONDecodeError:
+        # Fall back to comma-separated string
+        return [s.strip() for s in value.split(',')]
+
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def _parse_minute(value):
+    """Convert 'HH:MM' to minutes since midnight"""
+    hour, minute = value.strip().split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def compile_working_hours(working_hours):
+    """Compile a {'Monday': '09:00-17:00'} dict into {0: ((540, 1020),)}
+    
+    Keys are weekday numbers (date.weekday()), values are tuples of
+    (start_minute, end_minute) intervals. Days that are missing, empty,
+    'Not available' or malformed have no entry.
+    """
+    compiled = {}
+    for day, hours in working_hours.items():
+        if day not in WEEKDAYS or not isinstance(hours, str):
+            continue
+        intervals = []
+        for interval in hours.split(','):
+            try:
+                start, end = interval.split('-')
+                intervals.append((_parse_minute(start), _parse_minute(end)))
+            except ValueError:
+                continue
+        if intervals:
+            compiled[WEEKDAYS.index(day)] = tuple(intervals)
+    return compiled
+
 
 class Psychologist(db.Model):
     """Psychologist model for storing psychologist information"""
@@ -17,10 +64,16 @@ class Psychologist(db.Model):
     gender = db.Column(db.String(50))  # e.g.,
     profile_image_url = db.Column(db.String(500))
     education = db.Column(db.Text, nullable=True)
+    # Denormalized review aggregates, kept up to date by PsychologistService.add_review
+    rating_sum = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    rating_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     # Relationships
     appointments = db.relationship('Appointment', backref='psychologist', lazy=True)
     reviews = db.relationship('Review', backref='psychologist', lazy='dynamic')
+    specialty_entries = db.relationship('PsychologistSpecialty', backref='psychologist', lazy=True,
+                                        cascade='all, delete-orphan')
     
     def __repr__(self):
         return f"Psychologist('{self.first_name} {self.last_name}')"
@@ -32,26 +85,19 @@ class Psychologist(db.Model):
     
     @property
     def average_rating(self):
-        """Psikoloğun puan ortalamasını hesaplar."""
-        avg = self.reviews.with_entities(func.avg(Review.rating)).scalar()
-        return int(round(avg)) if avg else 0
+        """Psikoloğun puan ortalamasını saklanan toplamlardan hesaplar."""
+        if not self.rating_count:
+            return 0
+        return int(round((self.rating_sum or 0) / self.rating_count))
 
     @property
     def review_count(self):
         """Psikoloğun toplam yorum sayısını döndürür."""
-        return self.reviews.count()
+        return self.rating_count or 0
     
     def get_specialties(self):
         """Parse and return specialties as a list"""
-        if not self.specialties:
-            return []
-        
-        try:
-            # Try to parse as JSON
-            return json.loads(self.specialties)
-        except json.JSONDecodeError:
-            # Fall back to comma-separated string
-            return [s.strip() for s in self.specialties.split(',')]
+        return parse_specialties(self.specialties)
     
     def get_education(self):
         """Parse and return specialties as a list"""
@@ -69,57 +115,71 @@ class Psychologist(db.Model):
         """Convert specialties list to JSON and store it"""
         self.specialties = json.dumps(specialties_list)
     
+    def _working_hours_cache(self):
+        """Return (parsed, compiled) working hours, cached per instance for the current text"""
+        cache = self.__dict__.get('_working_hours_cached')
+        if cache is None or cache[0] != self.working_hours:
+            parsed = {}
+            if self.working_hours:
+                try:
+                    parsed = json.loads(self.working_hours)
+                except json.JSONDecodeError:
+                    parsed = {}
+            if not isinstance(parsed, dict):
+                parsed = {}
+            cache = (self.working_hours, parsed, compile_working_hours(parsed))
+            self.__dict__['_working_hours_cached'] = cache
+        return cache[1], cache[2]
+    
     def get_working_hours(self):
         """Parse and return working hours as a dictionary"""
-        if not self.working_hours:
-            return {}
-        
-        try:
-            return json.loads(self.working_hours)
-        except json.JSONDecodeError:
-            return {}
+        return dict(self._working_hours_cache()[0])
+    
+    def get_compiled_working_hours(self):
+        """Return working hours as {weekday: ((start_minute, end_minute), ...)}"""
+        return self._working_hours_cache()[1]
     
     def set_working_hours(self, working_hours_dict):
         """Convert working hours dictionary to JSON and store it"""
+        self.__dict__.pop('_working_hours_cached', None)
         self.working_hours = json.dumps(working_hours_dict)
     
-    def is_available(self, date, time):
-        """Check if the psychologist is available at the given date and time"""
-        from datetime import datetime
-        
-        # Get working hours for the day of the week
-        working_hours = self.get_working_hours()
-        day_of_week = date.strftime('%A')  # e.g., 'Monday'
-        
-        if day_of_week not in working_hours:
-            return False
-        
-        # Parse working hours for the day
-        day_hours = working_hours[day_of_week]
-        if not day_hours:
-            return False
-        
-        # Check if the time is within working hours
-        start_time_str, end_time_str = day_hours.split('-')
-        
-        # Convert string times to datetime.time objects for comparison
-        start_time = datetime.strptime(start_time_str, '%H:%M').time()
-        end_time = datetime.strptime(end_time_str, '%H:%M').time()
-        
-        # Convert time parameter to datetime.time if it's a string
+    def is_within_working_hours(self, date, time):
+        """Check if the given date and time fall inside the psychologist's working hours"""
+        # Convert time parameter to minutes if it's a string
         if isinstance(time, str):
-            time = datetime.strptime(time, '%H:%M').time()
+            minute = _parse_minute(time)
+        else:
+            minute = time.hour * 60 + time.minute
         
-        if time < start_time or time > end_time:
+        intervals = self.get_compiled_working_hours().get(date.weekday(), ())
+        return any(start <= minute <= end for start, end in intervals)
+    
+    def is_available(self, date, time):
+        """Check if the psychologist is available at the given date and time"""
+        if not self.is_within_working_hours(date, time):
             return False
         
         # Check if there's an existing appointment at this time
         from app.models.appointment import Appointment
-        existing_appointment = Appointment.query.filter_by(
-            psychologist_id=self.id,
-            appointment_date=date,
-            appointment_time=time,
-            status='planned'
-        ).first()
-        
-        return existing_appointment is None
\ No newline at end of file
+        return not Appointment.check_conflict(self.id, date, time)
+
+
+@event.listens_for(Psychologist.specialties, 'set')
+def _sync_specialty_entries(target, value, oldvalue, initiator):
+    """Keep the psychologist_specialties rows in step with the specialties text"""
+    existing = {entry.specialty_key: entry for entry in target.specialty_entries}
+    entries = []
+    names = parse_specialties(value)
+    if isinstance(names, str):
+        names = [names]
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        key = normalize_specialty(name)
+        if not key or any(entry.specialty_key == key for entry in entries):
+            continue
+        entry = existing.get(key) or PsychologistSpecialty(specialty_key=key)
+        entry.name = name.strip()
+        entries.append(entry)
+    target.specialty_entries = entries
@@ -0,0 +1,22 @@
+from app import db
+
+
+def normalize_specialty(name):
+    """Return the case-folded lookup key for a specialty name"""
+    return (name or '').strip().casefold()
+
+
+class PsychologistSpecialty(db.Model):
+    """Normalized specialty rows used for indexed specialty lookups"""
+    __tablename__ = 'psychologist_specialties'
+    __table_args__ = (
+        db.UniqueConstraint('psychologist_id', 'specialty_key', name='uq_psychologist_specialties_psychologist_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    psychologist_id = db.Column(db.Integer, db.ForeignKey('psychologists.id'), nullable=False, index=True)
+    name = db.Column(db.String(255), nullable=False)  # Original spelling, e.g. 'Anger Management'
+    specialty_key = db.Column(db.String(255), nullable=False, index=True)  # normalize_specialty(name)
+
+    def __repr__(self):
+        return f"PsychologistSpecialty('{self.name}')"
@@ -56,13 +56,14 @@ class User(db.Model, UserMixin):
             return True, "HAS_SESSIONS"
         return False, "NO_SESSIONS"
 
-    def use_session(self):
+    def use_session(self, commit=True):
         """Decrement remaining sessions or use the free trial."""
         if not self.has_used_free_trial:
             self.has_used_free_trial = True
         elif self.remaining_sessions > 0:
             self.remaining_sessions -= 1
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
     def subscribe(self, plan_name, phone_number):
         """Subscribes the user to a new plan."""
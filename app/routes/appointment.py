@@ -14,7 +14,7 @@ def create_appointment():
     form = AppointmentForm()
     
     # Populate psychologist choices
-    psychologists = PsychologistService.get_all_psychologists()
+    psychologists = PsychologistService.get_directory()
     form.psychologist_id.choices = [(p.id, p.full_name) for p in psychologists]
     
     if form.validate_on_submit():
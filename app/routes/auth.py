@@ -4,6 +4,7 @@ from flask_jwt_extended import create_access_token
 from app.services.user_service import UserService
 from app.forms.auth_forms import LoginForm, RegistrationForm
 from app.models.company import Company
+from app.sessions import regenerate_session
 from wtforms.validators import DataRequired
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -86,6 +87,8 @@ def login():
         
         if user:
             login_user(user, remember=form.remember.data)
+            # Yeni oturum kimliği: giriş öncesi verilen kimlik (session fixation) geçersiz olur
+            regenerate_session()
             next_page = request.args.get('next')
             return redirect(next_page or url_for('main.index'))
         else:
@@ -101,9 +104,9 @@ def login():
 def logout():
     """User logout route"""
     logout_user()
+    regenerate_session()
     # Eşleştirme formuna ait verileri oturumdan manuel olarak temizle
-    session.pop('matching_answers', None)
-    session.pop('current_step', None)
+    session.pop('matching', None)
     return redirect(url_for('main.index'))
 
 @auth_bp.route('/token', methods=['POST'])
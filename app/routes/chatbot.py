@@ -1,29 +1,184 @@
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
+from app import db
 from app.models.psychologist import Psychologist
 from app.models.appointment import Appointment
 from app.services.appointment_service import AppointmentService
+from app.services.psychologist_service import PsychologistService
+from app.services.chat_service import ChatService
+from app.models.chat import default_user_context
+from app.services.llm_client import LLMBusyError
+from app.services.llm_health import CircuitOpenError
+from app.services.tool_executor import ToolExecutor
+from app.services.tool_cache import get_tool_cache, availability_tag
+from app.services.prompt_builder import PromptBuilder
+from app.services.keyword_matcher import KeywordMatcher
 from datetime import datetime, timedelta
 import json
-import os
-import openai
-from openai import OpenAI
 
 chatbot_bp = Blueprint('chatbot', __name__, url_prefix='/chatbot')
 
-# Initialize OpenAI client (legacy format for openai==1.3.0)
-try:
-    api_key = os.getenv('OPENAI_API_KEY')
-    if api_key and api_key != 'your-openai-api-key-here':
-        openai.api_key = api_key
-        OPENAI_AVAILABLE = True
-        print("OpenAI API key configured successfully")
-    else:
-        OPENAI_AVAILABLE = False
-        print("Warning: OpenAI API key not configured.")
-except Exception as e:
-    OPENAI_AVAILABLE = False
-    print(f"Warning: OpenAI initialization failed: {e}")
+def _get_llm_client():
+    """Return the app's shared OpenAI client (created in create_app)"""
+    return current_app.extensions['llm_client']
+
+def _get_tool_executor():
+    """Return the thread pool that runs the chatbot's tool calls
+
+    Set app.extensions['chat_tools'] to use a different executor.
+    """
+    executor = current_app.extensions.get('chat_tools')
+    if executor is None:
+        executor = ToolExecutor(max_workers=current_app.config.get('CHAT_TOOL_WORKERS', 4))
+        current_app.extensions['chat_tools'] = executor
+    return executor
+
+def _unavailable_message(error):
+    if isinstance(error, LLMBusyError):
+        return 'Üzgünüm, şu anda çok fazla istek var. Lütfen birkaç saniye sonra tekrar deneyin.'
+    return f'Üzgünüm, AI danışman hizmetine şu anda ulaşılamıyor. Lütfen {max(1, round(error.retry_in))} saniye sonra tekrar deneyin.'
+
+# Functions ChatGPT can call
+CONSULTANT_FUNCTIONS = [
+    {
+        "name": "search_psychologists",
+        "description": "Search for psychologists by specialty, gender, and language preferences",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "specialty": {
+                    "type": "string",
+                    "description": "Psychology specialty based on user's symptoms (e.g., Anxiety, Depression, Trauma, Anger Management, Relationship Issues, etc.)"
+                },
+                "gender": {
+                    "type": "string",
+                    "description": "Preferred gender (male/female/erkek/kadın) - only use if user specifically mentions gender preference"
+                },
+                "language": {
+                    "type": "string",
+                    "description": "Preferred language (Turkish/English) - infer from user's message language"
+                }
+            }
+        }
+    },
+    {
+        "name": "get_psychologist_details",
+        "description": "Get detailed information about a specific psychologist",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "psychologist_id": {
+                    "type": "integer",
+                    "description": "ID of the psychologist"
+                }
+            },
+            "required": ["psychologist_id"]
+        }
+    },
+    {
+        "name": "check_availability",
+        "description": "Check available time slots for a psychologist on a specific date",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "psychologist_id": {
+                    "type": "integer",
+                    "description": "ID of the psychologist"
+                },
+                "date_str": {
+                    "type": "string",
+                    "description": "Date in YYYY-MM-DD format"
+                }
+            },
+            "required": ["psychologist_id", "date_str"]
+        }
+    },
+    {
+        "name": "create_appointment",
+        "description": "Create an appointment for the user",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "psychologist_id": {
+                    "type": "integer",
+                    "description": "ID of the psychologist"
+                },
+                "date_str": {
+                    "type": "string",
+                    "description": "Date in YYYY-MM-DD format"
+                },
+                "time_str": {
+                    "type": "string",
+                    "description": "Time in HH:MM format"
+                },
+                "user_id": {
+                    "type": "integer",
+                    "description": "ID of the user creating the appointment"
+                }
+            },
+            "required": ["psychologist_id", "date_str", "time_str", "user_id"]
+        }
+    }
+]
+
+CONSULTANT_TOOLS = [{"type": "function", "function": schema} for schema in CONSULTANT_FUNCTIONS]
+
+# Tools that only read, so several calls in one turn can run at the same time
+PARALLEL_TOOLS = frozenset({"search_psychologists", "get_psychologist_details", "check_availability"})
+
+# Symptoms mentioned by the user
+SYMPTOM_KEYWORDS = {
+    'kaygı': 'anxiety', 'anksiyete': 'anxiety', 'endişe': 'anxiety', 'korku': 'anxiety',
+    'depresyon': 'depression', 'üzgün': 'depression', 'mutsuz': 'depression',
+    'öfke': 'anger', 'agresif': 'anger', 'sinir': 'anger', 'sinirli': 'anger', 'kızgın': 'anger', 'öfkeli': 'anger',
+    'travma': 'trauma', 'ptsd': 'trauma', 'şok': 'trauma',
+    'ilişki': 'relationship', 'evlilik': 'relationship', 'partner': 'relationship',
+    'aile': 'family', 'çocuk': 'child', 'ebeveyn': 'family',
+    'bağımlılık': 'addiction', 'madde': 'addiction', 'alkol': 'addiction',
+    'yeme': 'eating', 'anoreksiya': 'eating', 'bulimia': 'eating',
+    'ocd': 'ocd', 'takıntı': 'ocd', 'kompulsif': 'ocd', 'obsesyon': 'ocd',
+    'bipolar': 'bipolar', 'manik': 'bipolar',
+    'kişilik': 'personality',
+    # Spellings without Turkish characters
+    'kaygi': 'anxiety', 'endise': 'anxiety', 'uzgun': 'depression', 'ofke': 'anger', 'kizgin': 'anger',
+    'iliski': 'relationship', 'cocuk': 'child', 'bagimlilik': 'addiction', 'takinti': 'ocd', 'kisilik': 'personality'
+}
+
+# Specialty the assistant steered the user towards
+SPECIALTY_KEYWORDS = {
+    'anksiyete': 'Anxiety Disorders',
+    'anxiety': 'Anxiety Disorders',
+    'kaygı': 'Anxiety Disorders',
+    'kaygi': 'Anxiety Disorders',
+    'depresyon': 'Depression',
+    'depression': 'Depression',
+    'travma': 'Trauma & PTSD',
+    'trauma': 'Trauma & PTSD',
+    'öfke': 'Anger Management',
+    'ofke': 'Anger Management',
+    'anger': 'Anger Management',
+    'sinir': 'Anger Management',
+    'agresif': 'Anger Management',
+    'ilişki': 'Relationship Issues',
+    'iliski': 'Relationship Issues',
+    'relationship': 'Relationship Issues',
+    'aile': 'Family Therapy',
+    'family': 'Family Therapy',
+    'bağımlılık': 'Addiction',
+    'bagimlilik': 'Addiction',
+    'addiction': 'Addiction',
+    'yeme': 'Eating Disorders',
+    'eating': 'Eating Disorders',
+    'ocd': 'OCD',
+    'bipolar': 'Bipolar Disorder',
+    'kişilik': 'Personality Disorders',
+    'kisilik': 'Personality Disorders',
+    'personality': 'Personality Disorders'
+}
+
+# Compiled once; each message is scanned in a single pass
+SYMPTOM_MATCHER = KeywordMatcher(SYMPTOM_KEYWORDS)
+SPECIALTY_MATCHER = KeywordMatcher(SPECIALTY_KEYWORDS)
 
 class PsychologyConsultantTools:
     """Tools for ChatGPT to interact with the psychology website database"""
@@ -32,100 +187,82 @@ class PsychologyConsultantTools:
     def search_psychologists(specialty=None, gender=None, language=None):
         """Search psychologists by specialty, gender, and language preferences"""
         try:
-            psychologists = Psychologist.query.all()
-            filtered = []
-            
-            for p in psychologists:
-                # Filter by specialty if provided
-                if specialty:
-                    specialties = p.get_specialties()
-                    specialty_match = any(specialty.lower() in s.lower() for s in specialties)
-                    if not specialty_match:
-                        continue
-                
-                # Filter by gender if provided
-                if gender:
-                    first_name = p.first_name.lower()
-                    # Simple gender detection based on common names
-                    female_names = ['mary', 'patricia', 'jennifer', 'linda', 'elizabeth', 'barbara', 'susan', 'jessica', 'sarah', 'karen', 'nancy', 'lisa', 'betty', 'helen', 'sandra', 'donna', 'carol', 'ruth', 'sharon', 'michelle', 'laura', 'kimberly', 'deborah', 'dorothy', 'ayşe', 'fatma', 'emine', 'hatice', 'zeynep', 'elif', 'merve', 'seda', 'büşra', 'esra']
-                    
-                    is_female = first_name in female_names
-                    
-                    if gender.lower() in ['female', 'kadın', 'bayan'] and not is_female:
-                        continue
-                    elif gender.lower() in ['male', 'erkek', 'bay'] and is_female:
-                        continue
-                
-                filtered.append({
-                    'id': p.id,
-                    'name': p.full_name,
-                    'specialties': p.get_specialties(),
-                    'bio': p.bio,
-                    'working_hours': p.get_working_hours(),
-                    'experience_years': getattr(p, 'experience_years', 'N/A')
-                })
-            
-            return filtered[:5]  # Return top 5 matches
+            # Filtering and ranking happen in SQL; only a compact summary goes into the prompt
+            return PsychologistService.search_candidates(
+                specialty=specialty,
+                gender=gender,
+                language=language,
+                limit=5
+            )
         except Exception as e:
             return f"Error searching psychologists: {str(e)}"
     
     @staticmethod
     def get_psychologist_details(psychologist_id):
-        """Get detailed information about a specific psychologist"""
+        """Get detailed information about a specific psychologist (cached until the directory changes)"""
         try:
-            psychologist = Psychologist.query.get(psychologist_id)
-            if not psychologist:
-                return "Psychologist not found"
-            
-            return {
-                'id': psychologist.id,
-                'name': psychologist.full_name,
-                'specialties': psychologist.get_specialties(),
-                'bio': psychologist.bio,
-                'working_hours': psychologist.get_working_hours(),
-                'experience_years': getattr(psychologist, 'experience_years', 'N/A')
-            }
+            psychologist_id = int(psychologist_id)
+            return get_tool_cache().get_or_compute(
+                ('get_psychologist_details', psychologist_id, PsychologistService.get_directory_version()),
+                lambda: PsychologyConsultantTools._psychologist_details(psychologist_id),
+                cacheable=lambda result: isinstance(result, dict)
+            )
         except Exception as e:
             return f"Error getting psychologist details: {str(e)}"
     
+    @staticmethod
+    def _psychologist_details(psychologist_id):
+        psychologist = Psychologist.query.get(psychologist_id)
+        if not psychologist:
+            return "Psychologist not found"
+        
+        return {
+            'id': psychologist.id,
+            'name': psychologist.full_name,
+            'specialties': psychologist.get_specialties(),
+            'bio': psychologist.bio,
+            'working_hours': psychologist.get_working_hours(),
+            'experience_years': getattr(psychologist, 'experience_years', 'N/A')
+        }
+    
     @staticmethod
     def check_availability(psychologist_id, date_str):
-        """Check available time slots for a psychologist on a specific date"""
+        """Check available time slots for a psychologist on a specific date
+        
+        Cached per (psychologist, date) until an appointment for that day is
+        created or cancelled, or the directory changes.
+        """
         try:
-            psychologist = Psychologist.query.get(psychologist_id)
-            if not psychologist:
-                return "Psychologist not found"
-            
+            psychologist_id = int(psychologist_id)
             date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-            day_of_week = date_obj.strftime('%A')
-            
-            working_hours = psychologist.get_working_hours()
-            if day_of_week not in working_hours or not working_hours[day_of_week] or working_hours[day_of_week] == "Not available":
-                return f"Psychologist is not available on {day_of_week}"
-            
-            # Generate available time slots
-            day_hours = working_hours[day_of_week]
-            if '-' not in day_hours:
-                return f"Invalid working hours format for {day_of_week}"
-            
-            start_time, end_time = day_hours.split('-')
-            start_hour = int(start_time.split(':')[0])
-            end_hour = int(end_time.split(':')[0])
-            
-            available_slots = []
-            for hour in range(start_hour, end_hour):
-                time_slot = f"{hour:02d}:00"
-                available_slots.append(time_slot)
-            
-            return {
-                'psychologist_name': psychologist.full_name,
-                'date': date_str,
-                'day': day_of_week,
-                'available_slots': available_slots
-            }
+            return get_tool_cache().get_or_compute(
+                ('check_availability', psychologist_id, date_obj.isoformat(), PsychologistService.get_directory_version()),
+                lambda: PsychologyConsultantTools._availability(psychologist_id, date_obj),
+                tags=[availability_tag(psychologist_id, date_obj)],
+                cacheable=lambda result: isinstance(result, dict)
+            )
         except Exception as e:
             return f"Error checking availability: {str(e)}"
     
+    @staticmethod
+    def _availability(psychologist_id, date_obj):
+        psychologist = Psychologist.query.get(psychologist_id)
+        if not psychologist:
+            return "Psychologist not found"
+        
+        day_of_week = date_obj.strftime('%A')
+        if not psychologist.get_compiled_working_hours().get(date_obj.weekday()):
+            return f"Psychologist is not available on {day_of_week}"
+        
+        # Working-hour slots without the ones already booked
+        slots_by_date, _ = PsychologistService.get_availability_calendar(psychologist, date_obj, date_obj)
+        return {
+            'psychologist_name': psychologist.full_name,
+            'date': date_obj.isoformat(),
+            'day': day_of_week,
+            'available_slots': [slot.strftime('%H:%M') for slot in slots_by_date[date_obj]]
+        }
+    
     @staticmethod
     def create_appointment(psychologist_id, date_str, time_str, user_id):
         """Create an appointment for the user"""
@@ -196,291 +333,240 @@ Psikologları listelerken MUTLAKA her psikoloğun veritabanındaki gerçek ID nu
 ARAÇLARIN: search_psychologists(), get_psychologist_details(), check_availability(), create_appointment()
 
 UNUTMA: Önceki konuşmaları hatırla, kullanıcının dilinde yanıt ver, sadece psikoloji konularında yardım et."""
+        # The system prompt is static, so its token count is computed once here
+        self.prompt_builder = PromptBuilder(self.system_prompt)
 
     def process_message(self, message, user_id):
         """Process user message using ChatGPT with psychology consultation"""
-        if not OPENAI_AVAILABLE:
+        llm = _get_llm_client()
+        if not llm.available:
             return {
                 'message': 'Üzgünüm, şu anda AI danışman hizmeti kullanılamıyor. Lütfen daha sonra tekrar deneyin.',
                 'type': 'error'
             }
-        
+
         try:
-            # Test if OpenAI is working by making a simple call first
-            test_response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
+            conversation, user_context, messages = self._prepare_messages(message, user_id)
+            max_rounds = current_app.config.get('CHAT_MAX_TOOL_ROUNDS', 3)
+
+            # ChatGPT may call several tools per round; after max_rounds it has to answer
+            for round_number in range(max_rounds + 1):
+                response = llm.chat(**self._completion_args(messages, round_number >= max_rounds))
+                message_response = response.choices[0].message
+                if not message_response.tool_calls:
+                    break
+                messages.extend(self._run_tool_calls([
+                    {'id': call.id, 'name': call.function.name, 'arguments': call.function.arguments}
+                    for call in message_response.tool_calls
+                ], user_id))
+
+            assistant_message = message_response.content or ''
+            self._save_reply(conversation, message, assistant_message, user_context)
+
+            return {
+                'message': assistant_message,
+                'type': 'text'
+            }
+
+        except (CircuitOpenError, LLMBusyError) as e:
+            db.session.rollback()
+            return {
+                'message': _unavailable_message(e),
+                'type': 'error'
+            }
         except Exception as e:
+            db.session.rollback()
             return {
-                'message': f'OpenAI servis hatası: {str(e)}. Lütfen sistem yöneticisine başvurun.',
+                'message': f'Üzgünüm, teknik bir sorun yaşıyorum. Lütfen daha sonra tekrar deneyin. Hata: {str(e)}',
                 'type': 'error'
             }
-        
+
+    def stream_message(self, message, user_id):
+        """Process user message like process_message, yielding (event, data) pairs as the reply arrives
+
+        Events are 'token' for each piece of the reply, 'tool' for each tool
+        run between completions, then 'done' with the full reply or 'error'.
+        """
+        llm = _get_llm_client()
+        if not llm.available:
+            yield 'error', {'message': 'Üzgünüm, şu anda AI danışman hizmeti kullanılamıyor. Lütfen daha sonra tekrar deneyin.'}
+            return
+
         try:
-            # Define available functions for ChatGPT
-            functions = [
-                {
-                    "name": "search_psychologists",
-                    "description": "Search for psychologists by specialty, gender, and language preferences",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "specialty": {
-                                "type": "string",
-                                "description": "Psychology specialty based on user's symptoms (e.g., Anxiety, Depression, Trauma, Anger Management, Relationship Issues, etc.)"
-                            },
-                            "gender": {
-                                "type": "string",
-                                "description": "Preferred gender (male/female/erkek/kadın) - only use if user specifically mentions gender preference"
-                            },
-                            "language": {
-                                "type": "string",
-                                "description": "Preferred language (Turkish/English) - infer from user's message language"
-                            }
-                        }
-                    }
-                },
-                {
-                    "name": "get_psychologist_details",
-                    "description": "Get detailed information about a specific psychologist",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "psychologist_id": {
-                                "type": "integer",
-                                "description": "ID of the psychologist"
-                            }
-                        },
-                        "required": ["psychologist_id"]
-                    }
-                },
-                {
-                    "name": "check_availability",
-                    "description": "Check available time slots for a psychologist on a specific date",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "psychologist_id": {
-                                "type": "integer",
-                                "description": "ID of the psychologist"
-                            },
-                            "date_str": {
-                                "type": "string",
-                                "description": "Date in YYYY-MM-DD format"
-                            }
-                        },
-                        "required": ["psychologist_id", "date_str"]
-                    }
-                },
-                {
-                    "name": "create_appointment",
-                    "description": "Create an appointment for the user",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "psychologist_id": {
-                                "type": "integer",
-                                "description": "ID of the psychologist"
-                            },
-                            "date_str": {
-                                "type": "string",
-                                "description": "Date in YYYY-MM-DD format"
-                            },
-                            "time_str": {
-                                "type": "string",
-                                "description": "Time in HH:MM format"
-                            },
-                            "user_id": {
-                                "type": "integer",
-                                "description": "ID of the user creating the appointment"
-                            }
-                        },
-                        "required": ["psychologist_id", "date_str", "time_str", "user_id"]
-                    }
-                }
-            ]
+            conversation, user_context, messages = self._prepare_messages(message, user_id)
+            max_rounds = current_app.config.get('CHAT_MAX_TOOL_ROUNDS', 3)
+            parts = []
 
-            # Get conversation history from session
-            if 'chat_history' not in session:
-                session['chat_history'] = []
-            
-            # Initialize user context if not exists
-            if 'user_context' not in session:
-                session['user_context'] = {
-                    'symptoms': [],
-                    'preferred_specialty': None,
-                    'preferred_gender': None,
-                    'language': 'Turkish' if any(char in message for char in 'çğıöşüÇĞIÖŞÜ') else 'English'
-                }
+            for round_number in range(max_rounds + 1):
+                stream = llm.chat(stream=True, **self._completion_args(messages, round_number >= max_rounds))
 
-            # Add user message to history
-            session['chat_history'].append({"role": "user", "content": message})
+                # Tool calls arrive in pieces, keyed by their index in the turn
+                calls = {}
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    for piece in delta.tool_calls or ():
+                        call = calls.setdefault(piece.index, {'id': None, 'name': '', 'arguments': ''})
+                        call['id'] = piece.id or call['id']
+                        if piece.function:
+                            call['name'] += piece.function.name or ''
+                            call['arguments'] += piece.function.arguments or ''
+                    if delta.content:
+                        parts.append(delta.content)
+                        yield 'token', {'text': delta.content}
 
-            # Prepare messages for ChatGPT with enhanced context
-            context_summary = ""
-            if session['user_context']['symptoms']:
-                context_summary += f"Kullanıcının belirttiği semptomlar: {', '.join(session['user_context']['symptoms'])}. "
-            if session['user_context']['preferred_specialty']:
-                context_summary += f"İlgilendiği alan: {session['user_context']['preferred_specialty']}. "
-            
-            enhanced_system_prompt = self.system_prompt
-            if context_summary:
-                enhanced_system_prompt += f"\n\nKULLANICI DURUMU: {context_summary}"
-            
-            messages = [{"role": "system", "content": enhanced_system_prompt}]
-            # Keep last 20 messages for better context (increased from 10)
-            messages.extend(session['chat_history'][-20:])
-
-            # Call ChatGPT with function calling (legacy format)
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                functions=functions,
-                function_call="auto",
-                temperature=0.7,
-                max_tokens=1500
+                if not calls:
+                    break
+                tool_calls = [calls[index] for index in sorted(calls)]
+                for call in tool_calls:
+                    yield 'tool', {'name': call['name']}
+                messages.extend(self._run_tool_calls(tool_calls, user_id))
+
+            assistant_message = ''.join(parts)
+            self._save_reply(conversation, message, assistant_message, user_context)
+            yield 'done', {'message': assistant_message}
+
+        except (CircuitOpenError, LLMBusyError) as e:
+            db.session.rollback()
+            yield 'error', {'message': _unavailable_message(e)}
+        except Exception as e:
+            db.session.rollback()
+            yield 'error', {'message': f'Üzgünüm, teknik bir sorun yaşıyorum. Lütfen daha sonra tekrar deneyin. Hata: {str(e)}'}
+
+    def _completion_args(self, messages, last_round):
+        """Chat completion arguments; in the last round tools stay described but cannot be called"""
+        return dict(
+            model="gpt-4",
+            messages=messages,
+            tools=CONSULTANT_TOOLS,
+            tool_choice="none" if last_round else "auto",
+            temperature=0.7,
+            max_tokens=1500
+        )
+
+    def _prepare_messages(self, message, user_id):
+        """Load the conversation and build the ChatGPT messages for a new user message"""
+        # Conversation is persisted; only the recent window and a rolling summary are loaded
+        conversation = ChatService.get_active_conversation(user_id)
+        user_context = conversation.get_context() if conversation.context else default_user_context(message)
+        _, history = ChatService.load_window(conversation)
+
+        # Add user message to history
+        ChatService.add_message(conversation, 'user', message)
+
+        # Prepare messages for ChatGPT with enhanced context
+        context_summary = ""
+        if user_context['symptoms']:
+            context_summary += f"Kullanıcının belirttiği semptomlar: {', '.join(user_context['symptoms'])}. "
+        if user_context['preferred_specialty']:
+            context_summary += f"İlgilendiği alan: {user_context['preferred_specialty']}. "
+
+        # History that does not fit the token budget is folded into the summary
+        messages = self.prompt_builder.build(
+            conversation, history, message,
+            state=context_summary,
+            budget=current_app.config.get('CHAT_PROMPT_TOKEN_BUDGET', 4000)
+        )
+        return conversation, user_context, messages
+
+    def _run_tool_calls(self, tool_calls, user_id):
+        """Run the tool calls of one assistant turn; returns the turn and the results as messages
+
+        Read-only tools run concurrently, each in its own app context. Tools
+        that write (create_appointment) run afterwards in this request's session.
+        """
+        # Save the user turn (and a new conversation) first: a failed booking
+        # rolls the session back and must not take the chat state with it
+        db.session.commit()
+
+        parallel = [call for call in tool_calls if call['name'] in PARALLEL_TOOLS]
+        results = dict(zip(
+            [call['id'] for call in parallel],
+            _get_tool_executor().map(
+                current_app._get_current_object(),
+                lambda call: self._execute_tool(call['name'], call['arguments'], user_id),
+                parallel
             )
+        ))
+        for call in tool_calls:
+            if call['id'] not in results:
+                results[call['id']] = self._execute_tool(call['name'], call['arguments'], user_id)
 
-            message_response = response.choices[0].message
-
-            # Check if ChatGPT wants to call a function
-            if message_response.function_call:
-                function_name = message_response.function_call.name
-                function_args = json.loads(message_response.function_call.arguments)
-                
-                # Call the appropriate function
-                if function_name == "search_psychologists":
-                    function_result = self.tools.search_psychologists(
-                        specialty=function_args.get('specialty'),
-                        gender=function_args.get('gender'),
-                        language=function_args.get('language')
-                    )
-                elif function_name == "get_psychologist_details":
-                    function_result = self.tools.get_psychologist_details(
-                        function_args['psychologist_id']
-                    )
-                elif function_name == "check_availability":
-                    function_result = self.tools.check_availability(
-                        function_args['psychologist_id'],
-                        function_args['date_str']
-                    )
-                elif function_name == "create_appointment":
-                    function_result = self.tools.create_appointment(
-                        function_args['psychologist_id'],
-                        function_args['date_str'],
-                        function_args['time_str'],
-                        user_id
-                    )
-                else:
-                    function_result = "Function not found"
-
-                # Add function call and result to messages
-                messages.append({
-                    "role": "assistant",
-                    "content": None,
-                    "function_call": {
-                        "name": function_name,
-                        "arguments": message_response.function_call.arguments
-                    }
-                })
-                messages.append({
-                    "role": "function",
-                    "name": function_name,
-                    "content": json.dumps(function_result) if isinstance(function_result, (dict, list)) else str(function_result)
-                })
-
-                # Get final response from ChatGPT (legacy format)
-                final_response = openai.chat.completions.create(
-                    model="gpt-4",
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=1500
-                )
+        messages = [{
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": call['id'], "type": "function", "function": {"name": call['name'], "arguments": call['arguments']}}
+                for call in tool_calls
+            ]
+        }]
+        messages.extend(
+            {"role": "tool", "tool_call_id": call['id'], "content": results[call['id']]}
+            for call in tool_calls
+        )
+        return messages
+
+    def _execute_tool(self, function_name, arguments, user_id):
+        """Run one tool ChatGPT asked for and return its result as message content"""
+        try:
+            function_args = json.loads(arguments or '{}')
 
-                assistant_message = final_response.choices[0].message.content
+            # Call the appropriate function
+            if function_name == "search_psychologists":
+                function_result = self.tools.search_psychologists(
+                    specialty=function_args.get('specialty'),
+                    gender=function_args.get('gender'),
+                    language=function_args.get('language')
+                )
+            elif function_name == "get_psychologist_details":
+                function_result = self.tools.get_psychologist_details(
+                    function_args['psychologist_id']
+                )
+            elif function_name == "check_availability":
+                function_result = self.tools.check_availability(
+                    function_args['psychologist_id'],
+                    function_args['date_str']
+                )
+            elif function_name == "create_appointment":
+                function_result = self.tools.create_appointment(
+                    function_args['psychologist_id'],
+                    function_args['date_str'],
+                    function_args['time_str'],
+                    user_id
+                )
             else:
-                assistant_message = message_response.content
+                function_result = "Function not found"
+        except (ValueError, KeyError) as e:
+            function_result = f"Invalid arguments for {function_name}: {str(e)}"
 
-            # Add assistant response to history
-            session['chat_history'].append({"role": "assistant", "content": assistant_message})
-            
-            # Update user context based on conversation
-            self._update_user_context(message, assistant_message, session)
+        return json.dumps(function_result, ensure_ascii=False) if isinstance(function_result, (dict, list)) else str(function_result)
 
-            return {
-                'message': assistant_message,
-                'type': 'text'
-            }
+    def _save_reply(self, conversation, message, assistant_message, user_context):
+        """Store the assistant reply and the updated user context"""
+        ChatService.add_message(conversation, 'assistant', assistant_message)
 
-        except Exception as e:
-            return {
-                'message': f'Üzgünüm, teknik bir sorun yaşıyorum. Lütfen daha sonra tekrar deneyin. Hata: {str(e)}',
-                'type': 'error'
-            }
+        # Update user context based on conversation
+        self._update_user_context(message, assistant_message, user_context)
+        conversation.set_context(user_context)
+        db.session.commit()
     
-    def _update_user_context(self, user_message, assistant_message, session):
+    def _update_user_context(self, user_message, assistant_message, user_context):
         """Update user context based on conversation"""
         try:
-            user_message_lower = user_message.lower()
-            
             # Extract symptoms from user message
-            symptom_keywords = {
-                'kaygı': 'anxiety', 'anksiyete': 'anxiety', 'endişe': 'anxiety', 'korku': 'anxiety',
-                'depresyon': 'depression', 'üzgün': 'depression', 'mutsuz': 'depression',
-                'öfke': 'anger', 'agresif': 'anger', 'sinir': 'anger', 'sinirli': 'anger', 'kızgın': 'anger', 'öfkeli': 'anger',
-                'travma': 'trauma', 'ptsd': 'trauma', 'şok': 'trauma',
-                'ilişki': 'relationship', 'evlilik': 'relationship', 'partner': 'relationship',
-                'aile': 'family', 'çocuk': 'child', 'ebeveyn': 'family',
-                'bağımlılık': 'addiction', 'madde': 'addiction', 'alkol': 'addiction',
-                'yeme': 'eating', 'anoreksiya': 'eating', 'bulimia': 'eating',
-                'ocd': 'ocd', 'takıntı': 'ocd', 'kompulsif': 'ocd', 'obsesyon': 'ocd',
-                'bipolar': 'bipolar', 'manik': 'bipolar',
-                'kişilik': 'personality'
-            }
-            
-            # Update symptoms
-            for keyword, symptom in symptom_keywords.items():
-                if keyword in user_message_lower and symptom not in session['user_context']['symptoms']:
-                    session['user_context']['symptoms'].append(symptom)
+            for symptom in SYMPTOM_MATCHER.find_all(user_message):
+                if symptom not in user_context['symptoms']:
+                    user_context['symptoms'].append(symptom)
             
             # Extract specialty preference from assistant message
-            specialty_keywords = {
-                'anksiyete': 'Anxiety Disorders',
-                'anxiety': 'Anxiety Disorders',
-                'kaygı': 'Anxiety Disorders',
-                'depresyon': 'Depression',
-                'depression': 'Depression',
-                'travma': 'Trauma & PTSD',
-                'trauma': 'Trauma & PTSD',
-                'öfke': 'Anger Management',
-                'anger': 'Anger Management',
-                'sinir': 'Anger Management',
-                'agresif': 'Anger Management',
-                'ilişki': 'Relationship Issues',
-                'relationship': 'Relationship Issues',
-                'aile': 'Family Therapy',
-                'family': 'Family Therapy',
-                'bağımlılık': 'Addiction',
-                'addiction': 'Addiction',
-                'yeme': 'Eating Disorders',
-                'eating': 'Eating Disorders',
-                'ocd': 'OCD',
-                'bipolar': 'Bipolar Disorder',
-                'kişilik': 'Personality Disorders',
-                'personality': 'Personality Disorders'
-            }
-            
-            assistant_lower = assistant_message.lower()
-            for keyword, specialty in specialty_keywords.items():
-                if keyword in assistant_lower:
-                    session['user_context']['preferred_specialty'] = specialty
-                    break
+            specialty = SPECIALTY_MATCHER.first(assistant_message)
+            if specialty:
+                user_context['preferred_specialty'] = specialty
             
             # Keep only last 10 symptoms to avoid overflow
-            if len(session['user_context']['symptoms']) > 10:
-                session['user_context']['symptoms'] = session['user_context']['symptoms'][-10:]
+            if len(user_context['symptoms']) > 10:
+                user_context['symptoms'] = user_context['symptoms'][-10:]
         except Exception as e:
             # Silently handle context update errors
             pass
@@ -492,10 +578,12 @@ psychology_consultant = ChatGPTPsychologyConsultant()
 @login_required
 def chat():
     """Main chatbot interface"""
-    session['chat_history'] = []  # Bu satır geçmişi her zaman sıfırlar.
-
-    # Pass existing chat history to template
-    chat_history = session.get('chat_history', [])
+    # Açık konuşmanın son mesajları gösterilir; yeni konuşma için /api/clear kullanılır
+    conversation = ChatService.get_active_conversation(current_user.id, create=False)
+    chat_history = []
+    if conversation:
+        window = current_app.config.get('CHAT_HISTORY_WINDOW', 20)
+        chat_history = [turn.to_prompt() for turn in ChatService.get_recent_messages(conversation, window)]
     return render_template('chatbot/chat.html', title='AI Psychology Consultant', chat_history=chat_history)
 
 @chatbot_bp.route('/api/message', methods=['POST'])
@@ -521,6 +609,28 @@ def process_message():
 @login_required
 def clear_chat():
     """Clear chat history"""
-    session.pop('chat_history', None)
-    session.pop('user_context', None)
-    return jsonify({'success': True})
\ No newline at end of file
+    ChatService.close_conversation(current_user.id)
+    return jsonify({'success': True})
+
+@chatbot_bp.route('/api/stream', methods=['POST'])
+@login_required
+def stream_message():
+    """Stream the chatbot reply as Server-Sent Events"""
+    data = request.get_json()
+    message = data.get('message', '').strip()
+
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    user_id = current_user.id
+
+    def generate():
+        # Sent right away so proxies and the browser see the response start
+        yield ': stream opened\n\n'
+        for event, payload in psychology_consultant.stream_message(message, user_id):
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx would otherwise buffer the whole reply
+    })
@@ -1,14 +1,14 @@
 # app/routes/matching.py
-from flask import Blueprint, render_template, session, redirect, url_for, request, flash, send_file, current_app
+from flask import Blueprint, render_template, session, redirect, url_for, request, flash, send_file, current_app, jsonify, abort
 from flask_login import login_required, current_user
 from datetime import datetime
 from datetime import date
-import os
-from fpdf import FPDF
 from io import BytesIO
 from app.models.psychologist import Psychologist
 from app.forms.matching_form import TherapistMatchingForm
 from app.services.psychologist_service import PsychologistService
+from app.services.report_service import ReportRenderer, ReportJobQueue
+from app.services.matching_flow import MatchingFlow, RESULTS, MULTI, TEXT
 
 matching_bp = Blueprint('matching', __name__, url_prefix='/matching')
 
@@ -244,6 +244,11 @@ STEP_FLOW = {
     15: 'results'
 }
 
+# Akış bir kez derlenir; graf hataları uygulama açılırken yakalanır
+MATCHING_FLOW = MatchingFlow(STEP_QUESTIONS, STEP_FLOW, TherapistMatchingForm)
+# Oturumda yalnızca [mevcut adım, cevap vektörü] saklanır
+FLOW_SESSION_KEY = 'matching'
+
 def _normalize_step_input(step_value):
     """Gelen step parametresini tamsayıya çevirir."""
     if step_value:
@@ -253,152 +258,188 @@ def _normalize_step_input(step_value):
             return 1 # Geçersiz bir step değeri varsa 1'e dön
     return 1
 
+def _get_requested_specialties(answers):
+    """Cevaplardan seçilen gelişim alanlarını ve destek türünü döndürür."""
+    support_type = answers.get('6')
+    improvement_areas = []
+    if support_type == 'Individual Therapy':
+        improvement_areas.extend(answers.get('7', []))
+    elif support_type == 'Couples Therapy':
+        improvement_areas.extend(answers.get('12', []))
+    elif support_type == 'Child & Adolescent Therapy':
+        improvement_areas.extend(answers.get('15', []))
+    return improvement_areas, support_type
+
+def _get_report_renderer():
+    """Uygulama başına tek bir rapor oluşturucu döndürür (fontlar ve PDF önbelleği paylaşılır)."""
+    renderer = current_app.extensions.get('report_renderer')
+    if renderer is None:
+        renderer = ReportRenderer(
+            current_app.static_folder,
+            STEP_QUESTIONS,
+            SUGGESTION_TEMPLATES,
+            cache_size=current_app.config.get('REPORT_CACHE_SIZE', 64)
+        )
+        current_app.extensions['report_renderer'] = renderer
+    return renderer
+
+def _get_report_jobs():
+    """Arka planda oluşturulan raporların iş kuyruğunu döndürür."""
+    jobs = current_app.extensions.get('report_jobs')
+    if jobs is None:
+        jobs = ReportJobQueue(
+            max_workers=current_app.config.get('REPORT_WORKERS', 2),
+            ttl=current_app.config.get('REPORT_JOB_TTL', 600)
+        )
+        current_app.extensions['report_jobs'] = jobs
+    return jobs
+
+def _build_report(answers, recommended_therapist_id, user_label, report_date):
+    """Raporu önbellekten döndürür; yoksa terapistleri sorgulayıp PDF'i oluşturur."""
+    renderer = _get_report_renderer()
+    cache_key = renderer.cache_key(
+        answers, recommended_therapist_id, PsychologistService.get_report_stamp(), user_label, report_date
+    )
+    pdf_bytes = renderer.get_cached(cache_key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    recommendation = None
+    other_therapists = []
+
+    # Oturumda kaydedilen ID varsa, önerilen terapisti bul
+    if recommended_therapist_id:
+        recommendation = PsychologistService.get_psychologist_by_id(recommended_therapist_id)
+
+    # Diğer terapistleri bulma mantığı
+    improvement_areas, support_type = _get_requested_specialties(answers)
+    if improvement_areas or support_type:
+        # Önerilen terapisti listeden çıkar
+        other_therapists = [
+            psychologist
+            for psychologist, _ in PsychologistService.match(improvement_areas, support_type)
+            if psychologist != recommendation
+        ]
+
+    pdf_bytes = renderer.render(user_label, report_date, answers, recommendation, other_therapists)
+    renderer.store(cache_key, pdf_bytes)
+    return pdf_bytes
+
+def _report_filename(user_label):
+    return f"Evaluation_Report_{user_label}.pdf"
+
 @matching_bp.route('/', methods=['GET', 'POST'])
 def find_therapist():
-    form = TherapistMatchingForm()
-    
     # Oturumda mevcut bir adım yoksa veya sıfırlama isteği varsa oturumu başlat
-    if 'current_step' not in session or request.args.get('reset'):
-        session['current_step'] = 1
-        session['matching_answers'] = {}
+    state = session.get(FLOW_SESSION_KEY)
+    if state is None or request.args.get('reset'):
+        state = MATCHING_FLOW.new_state()
+        session[FLOW_SESSION_KEY] = state
 
     has_progress = False
 
     # POST isteği
     if request.method == 'POST':
         posted_step = _normalize_step_input(request.form.get('step'))
-        
-        history = session.get('step_history', [])
-        if not history or history[-1] != posted_step:
-            history.append(posted_step)
-            session['step_history'] = history
-        
-        answers = session.get('matching_answers', {})
-        field_name = STEP_QUESTIONS.get(posted_step, {}).get('field')
 
-        if not field_name:
+        if not MATCHING_FLOW.is_step(posted_step):
             flash('Invalid step or form field.', 'danger')
-            return redirect(url_for('matching.find_therapist', step=session.get('current_step', 1)))
+            return redirect(url_for('matching.find_therapist', step=MATCHING_FLOW.current_step(state)))
 
-        if field_name == 'improvement_areas':
-            stored_value = request.form.getlist(field_name)
-            if len(stored_value) > 3:
-                flash('You can make up to 3 selections.', 'danger')
-                return redirect(url_for('matching.find_therapist', step=posted_step))
-        elif field_name == 'togetherness_improvement_areas':
+        field_name = MATCHING_FLOW.field_name(posted_step)
+        kind = MATCHING_FLOW.kind(posted_step)
+        if kind == MULTI:
             stored_value = request.form.getlist(field_name)
-            if len(stored_value) > 3:
-                flash('You can make up to 3 selections.', 'danger')
+            if len(stored_value) > MATCHING_FLOW.max_selections:
+                flash(f'You can make up to {MATCHING_FLOW.max_selections} selections.', 'danger')
                 return redirect(url_for('matching.find_therapist', step=posted_step))
-        elif field_name == 'children_improvement_areas':
-            stored_value = request.form.getlist(field_name)
-            if len(stored_value) > 3:
-                flash('You can make up to 3 selections.', 'danger')
-                return redirect(url_for('matching.find_therapist', step=posted_step))
-        elif field_name in ['reason', 'medication_info']:
+        elif kind == TEXT:
             stored_value = request.form.get(field_name, '').strip()
         else:
             stored_value = request.form.get(field_name, '')
-            
-        answers[str(posted_step)] = stored_value
-        session['matching_answers'] = answers
-        
-        next_step_logic = STEP_FLOW.get(posted_step)
-        if isinstance(next_step_logic, dict):
-            first_answer = stored_value[0] if isinstance(stored_value, list) else stored_value
-            next_step = next_step_logic.get(first_answer)
-        else:
-            next_step = next_step_logic
 
-        if next_step == 'results':
+        next_step = MATCHING_FLOW.set_answer(state, posted_step, stored_value)
+        if next_step is None:
+            flash('Please select an option.', 'danger')
+            return redirect(url_for('matching.find_therapist', step=posted_step))
+        session.modified = True
+
+        if next_step == RESULTS:
             if not current_user.is_authenticated:
                 session['pending_show_results'] = True
                 flash("Please log in or register to see suitable therapist recommendations.", "warning")
                 return redirect(url_for('auth.login'))
             return redirect(url_for('matching.results'))
-        
-        if isinstance(next_step, int):
-            session['current_step'] = next_step
+
+        MATCHING_FLOW.set_current_step(state, next_step)
         return redirect(url_for('matching.find_therapist', step=next_step))
 
     # GET isteği
-    current_step = _normalize_step_input(request.values.get('step')) if 'step' in request.args else session.get('current_step', 1)
-    
+    saved_step = MATCHING_FLOW.current_step(state)
+    current_step = _normalize_step_input(request.values.get('step')) if 'step' in request.args else saved_step
+
     # Ana sayfaya gelindiğinde (step parametresi olmadan) ve devam eden bir oturum varsa modal gösterilir.
-    if not request.args.get('step') and session.get('current_step', 1) > 1:
+    if not request.args.get('step') and saved_step > 1:
         has_progress = True
-        current_step = session.get('current_step', 1)
-    else:
-        session['current_step'] = current_step
-    
+        current_step = saved_step
+    elif current_step != saved_step:
+        MATCHING_FLOW.set_current_step(state, current_step)
+        session.modified = True
+
     return render_template(
         'matching/form.html',
-        form=form,
+        form=TherapistMatchingForm(),
         step=current_step,
         has_progress=has_progress,
-        resume_step=session.get('current_step', 1),
-        answers=session.get('matching_answers', {})
+        resume_step=MATCHING_FLOW.current_step(state),
+        answers=MATCHING_FLOW.answers(state)
     )
 
 @matching_bp.route('/back')
 def go_back():
     """Kullanıcıyı bir önceki mantıksal adıma yönlendirir."""
-    history = session.get('step_history', [])
-    
-    if history:
-        previous_step = history.pop()
-        session['step_history'] = history  # Güncellenmiş listeyi kaydet
-        session['current_step'] = previous_step # Mevcut adımı da güncelle
-        return redirect(url_for('matching.find_therapist', step=previous_step))
-        
-    # Geçmiş boşsa ilk adıma yönlendir
-    return redirect(url_for('matching.find_therapist', step=1))
+    state = session.get(FLOW_SESSION_KEY)
+    if not state:
+        return redirect(url_for('matching.find_therapist', step=1))
+
+    # Geçmiş saklanmaz; önceki adım cevaplardan izlenen yol üzerinden bulunur
+    previous_step = MATCHING_FLOW.previous_step(state, MATCHING_FLOW.current_step(state))
+    MATCHING_FLOW.set_current_step(state, previous_step)
+    session.modified = True
+    return redirect(url_for('matching.find_therapist', step=previous_step))
 
 @matching_bp.route('/reset')
 def reset():
-    session.pop('matching_answers', None)
-    session.pop('current_step', None)
+    session.pop(FLOW_SESSION_KEY, None)
     session.pop('recommended_therapist_id', None)
     return redirect(url_for('matching.find_therapist', step=1))
 
+def _get_answers():
+    """Oturumdaki kodlanmış cevap vektörünü {'adım': cevap} sözlüğüne çevirir."""
+    return MATCHING_FLOW.answers(session.get(FLOW_SESSION_KEY))
+
 @matching_bp.route('/results')
 @login_required
 def results():
-    answers = session.get('matching_answers', {})
-    specialties = []
-    support_type = answers.get('6')
+    answers = _get_answers()
+    improvement_areas, support_type = _get_requested_specialties(answers)
 
-    if support_type == 'Individual Therapy':
-        specialties.extend(answers.get('7', []))
-    elif support_type == 'Couples Therapy':
-        specialties.extend(answers.get('12', []))
-    elif support_type == 'Child & Adolescent Therapy':
-        specialties.extend(answers.get('15', []))
-
-    if support_type:
-        specialties.append(support_type)
-
-    if not specialties:
+    if not improvement_areas and not support_type:
         # Öneri bulunamazsa, oturumdaki öneri ID'sini temizle
         session.pop('recommended_therapist_id', None)
         return render_template('matching/results.html', recommendation=None, therapists=[], answers=answers)
 
-    matching_psychologists = set()
-    for specialty in specialties:
-        found_psychologists = PsychologistService.filter_by_specialty(specialty)
-        for psy in found_psychologists:
-            matching_psychologists.add(psy)
-    
-    therapists = list(matching_psychologists)
+    # Tüm alanlar tek sorguda eşleştirilir; sonuçlar eşleşme skoru ve puana göre sıralı gelir
+    therapists = []
+    for psychologist, match_score in PsychologistService.match(improvement_areas, support_type):
+        psychologist.match_score = match_score
+        therapists.append(psychologist)
     
     if not therapists:
         # Öneri bulunamazsa, oturumdaki öneri ID'sini temizle
         session.pop('recommended_therapist_id', None)
         return render_template('matching/results.html', recommendation=None, therapists=[], answers=answers)
 
-    # Terapistleri ortalama puana göre sırala
-    therapists.sort(key=lambda p: p.average_rating if p.average_rating is not None else -1, reverse=True)
-    
     recommendation = therapists.pop(0) if therapists else None
     
     # Yeni eklenen kısım: Önerilen terapistin ID'sini oturuma kaydet
@@ -435,305 +476,51 @@ def results():
 @matching_bp.route('/generate_report')
 @login_required
 def generate_report():
-    def wrap_long_words(text, max_len=40):
-        words = text.split()
-        result = []
-        for word in words:
-            if len(word) > max_len:
-                chunks = [word[i:i+max_len] for i in range(0, len(word), max_len)]
-                result.append("-\n".join(chunks))
-            else:
-                result.append(word)
-        return " ".join(result)
-
-    class PDF(FPDF):
-        def header(self):
-            logo_path = os.path.join(current_app.static_folder, 'images', 'arkaplan.jpg')
-            if os.path.exists(logo_path):
-                self.image(logo_path, x=10, y=8, w=30)
-            self.set_font("NotoSans", 'B', 14)
-            self.cell(0, 10, "ModeCalm - Evaluation Report", ln=True, align='C')
-            self.ln(5)
-
-        def footer(self):
-            self.set_y(-15)
-            self.set_font('helvetica', 'I', 8)
-            self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", 0, 0, 'C')
-
-    # Bu fonksiyon sadece PDF için sayısal puan döndürür.
-    def get_rating_as_text(rating, max_stars=5):
-        if rating is None or rating == 0:
-            return 'No reviews'
-        rounded_rating = round(rating * 2) / 2
-        return f"{rounded_rating} / {max_stars}"
-
-    def add_therapist_to_pdf(pdf, therapist, is_recommended=False):
-        """PDF'e tek bir terapist bilgisini biçimlendirilmiş şekilde ekler."""
-        # Tahmini yükseklik (görsel + metinler için minimum)
-        image_box_height = 40
-        min_height = 50 
-        
-        # Sayfa sonunda yeterli boşluk yoksa yeni sayfa ekle
-        if pdf.get_y() + min_height > pdf.page_break_trigger:
-            pdf.add_page()
-            
-        start_y = pdf.get_y()
-        
-        image_box_width = 40
-        text_start_x = pdf.l_margin + image_box_width + 5
-        text_start_y = start_y + 5
-        
-        # Kutuyu çiz
-        if is_recommended:
-            pdf.set_fill_color(240, 255, 240)
-        else:
-            pdf.set_draw_color(200, 200, 200)
-
-        # Görseli yerleştirin
-        if therapist.profile_image_url:
-            image_path = os.path.join(current_app.static_folder, 'images', therapist.profile_image_url.lstrip('/\\'))
-            if os.path.exists(image_path):
-                pdf.image(image_path, x=pdf.l_margin + 2, y=start_y + 2, w=image_box_width - 4, h=image_box_height - 4)
-
-        # Metinleri yerleştirin
-        pdf.set_xy(text_start_x, text_start_y)
-        pdf.set_font("NotoSans", 'B', 12)
-        pdf.cell(0, 7, therapist.full_name, ln=True)
-
-        pdf.set_x(text_start_x)
-        pdf.set_font("NotoSans", '', 11)
-        rating_text = get_rating_as_text(therapist.average_rating)
-        pdf.cell(0, 7, f"Average Score: {rating_text}", ln=True)
-
-        pdf.set_x(text_start_x)
-        pdf.set_font("NotoSans", '', 10)
-        specialties_str = ", ".join(therapist.get_specialties())
-        pdf.multi_cell(pdf.w - text_start_x - pdf.r_margin, 5, f"Areas of Expertise: {specialties_str}")
-        
-        # Metin bloğunun bittiği son Y pozisyonunu alın
-        end_y_text = pdf.get_y()
-        
-        # Görselin bittiği pozisyonu hesaplayın
-        end_y_image = start_y + image_box_height + 5  # Görsel ve tampon boşluk
-        
-        # Bir sonraki bloğun başlayacağı konumu, görsel ve metin bloğundan hangisi daha yüksekse ona göre ayarlayın
-        next_y = max(end_y_text, end_y_image)
-        
-        # Kutuyu son yüksekliğe göre yeniden çiz
-        if is_recommended:
-            pdf.rect(pdf.l_margin, start_y, pdf.w - pdf.l_margin - pdf.r_margin, next_y - start_y, 'DF')
-        else:
-            pdf.rect(pdf.l_margin, start_y, pdf.w - pdf.l_margin - pdf.r_margin, next_y - start_y, 'D')
-            
-        # Metinleri ve görseli tekrar üzerine yazma (ilk deneme sırasında çizilen kutuyu örtmek için)
-        if therapist.profile_image_url:
-            if os.path.exists(image_path):
-                pdf.image(image_path, x=pdf.l_margin + 2, y=start_y + 2, w=image_box_width - 4, h=image_box_height - 4)
-        pdf.set_xy(text_start_x, text_start_y)
-        pdf.set_font("NotoSans", 'B', 12)
-        pdf.cell(0, 7, therapist.full_name, ln=True)
-        pdf.set_x(text_start_x)
-        pdf.set_font("NotoSans", '', 11)
-        pdf.cell(0, 7, f"Average Score: {rating_text}", ln=True)
-        pdf.set_x(text_start_x)
-        pdf.set_font("NotoSans", '', 10)
-        pdf.multi_cell(pdf.w - text_start_x - pdf.r_margin, 5, f"Areas of Expertise: {specialties_str}")
-        
-        # Bir sonraki eleman için Y pozisyonunu ayarlayın
-        pdf.set_y(next_y + 5)
-    pdf = PDF()
-    pdf.alias_nb_pages()
-
-    font_regular = os.path.join(current_app.static_folder, "fonts", "NotoSans-Regular.ttf")
-    font_bold = os.path.join(current_app.static_folder, "fonts", "NotoSans-Bold.ttf")
-
-    if os.path.exists(font_regular) and os.path.exists(font_bold):
-        pdf.add_font("NotoSans", "", font_regular, uni=True)
-        pdf.add_font("NotoSans", "B", font_bold, uni=True)
-    else:
-        pdf.set_font('Helvetica', '', 10)
-
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_left_margin(15)
-    pdf.set_right_margin(15)
-
+    answers = _get_answers()
+    recommended_therapist_id = session.get('recommended_therapist_id')
     user_label = getattr(current_user, 'full_name', 'Guest')
     report_date = date.today().strftime("%d/%m/%Y")
-    
-    pdf.set_font("NotoSans", 'B', 12)
-    pdf.cell(0, 8, f"User: {user_label}", ln=True)
-    pdf.cell(0, 8, f"Report Date: {report_date}", ln=True)
-    pdf.ln(5)
-
-    answers = session.get('matching_answers', {})
-    
-    recommendation = None
-    other_therapists = []
-    
-    # Oturumda kaydedilen ID varsa, önerilen terapisti bul
-    recommended_therapist_id = session.get('recommended_therapist_id')
-    if recommended_therapist_id:
-        recommendation = PsychologistService.get_psychologist_by_id(recommended_therapist_id)
 
-    # Diğer terapistleri bulma mantığı
-    specialties = []
-    support_type = answers.get('6')
-    if support_type == 'Individual Therapy':
-        specialties.extend(answers.get('7', []))
-    elif support_type == 'Couples Therapy':
-        specialties.extend(answers.get('12', []))
-    elif support_type == 'Child & Adolescent Therapy':
-        specialties.extend(answers.get('15', []))
-    if support_type:
-        specialties.append(support_type)
-
-    if specialties:
-        all_matching_psychologists = set()
-        for specialty in specialties:
-            found_psychologists = PsychologistService.filter_by_specialty(specialty)
-            for psy in found_psychologists:
-                all_matching_psychologists.add(psy)
-        
-        # Önerilen terapisti listeden çıkar
-        if recommendation and recommendation in all_matching_psychologists:
-            all_matching_psychologists.remove(recommendation)
-        
-        therapists_list = list(all_matching_psychologists)
-        if therapists_list:
-            therapists_list.sort(key=lambda p: p.average_rating if p.average_rating is not None else -1, reverse=True)
-            other_therapists = therapists_list
-
-    pdf.set_font('NotoSans', 'B', 12)
-    pdf.cell(0, 10, "Your answers:", ln=True)
-    pdf.ln(2)
-
-    answers = session.get('matching_answers', {})
-    
-    # answers sözlüğünde yer alan adımlar üzerinden döngü kur
-    for step_num_str in sorted(answers.keys(), key=int):
-        step_num = int(step_num_str)
-        
-        # Soru metnini STEP_QUESTIONS sözlüğünden al
-        question_data = STEP_QUESTIONS.get(step_num)
-        if not question_data:
-            continue  # Eğer soru tanımı yoksa, atla.
-
-        question_text = question_data['question']
-        answer = answers.get(step_num_str)
-        
-        # Cevap formatını düzelt
-        if isinstance(answer, list):
-            answer = ", ".join(answer)
-        answer_text = "—" if not answer or (isinstance(answer, str) and not answer.strip()) else str(answer)
-        
-        pdf.set_font('NotoSans', 'B', 11)
-        pdf.multi_cell(0, 7, f"Question: {question_text}")
-        
-        pdf.set_x(pdf.l_margin)
-        pdf.set_font('NotoSans', '', 11)
-        pdf.multi_cell(0, 7, f"Answer: {answer_text}")
-        pdf.ln(3)
-
-    pdf.ln(5)
-    
-    pdf.set_font('NotoSans', 'B', 12)
-    pdf.cell(0, 10, "Summary and Evaluation:", ln=True)
-    pdf.ln(2)
-    
-    if support_type == 'Couples Therapy':
-        togetherness_improvement_areas = answers.get('12', [])
-        therapy_suggestions = SUGGESTION_TEMPLATES.get('Couples Therapy', {})
-        for area in togetherness_improvement_areas:
-            suggestions = therapy_suggestions.get(area, [])
-            if suggestions:
-                # Başlık için kalın fontu ve yeni satırı ayarla
-                pdf.set_font('NotoSans', 'B', 11)
-                pdf.set_x(15)
-                pdf.multi_cell(0, 7, f"- {area}:")
-                # Öneriler için normal fontu ve girintiyi ayarla
-                pdf.set_font('NotoSans', '', 11)
-                for suggestion in suggestions:
-                    pdf.set_x(25)
-                    pdf.multi_cell(0, 7, f"• {suggestion}")
-                pdf.ln(2)
-
-    elif support_type == 'Child & Adolescent Therapy':
-        children_improvement_areas = answers.get('15', [])
-        therapy_suggestions = SUGGESTION_TEMPLATES.get('Child & Adolescent Therapy', {})
-        for area in children_improvement_areas:
-            suggestions = therapy_suggestions.get(area, [])
-            if suggestions:
-                # Başlık için kalın fontu ve yeni satırı ayarla
-                pdf.set_font('NotoSans', 'B', 11)
-                pdf.set_x(15)
-                pdf.multi_cell(0, 7, f"- {area}:")
-                # Öneriler için normal fontu ve girintiyi ayarla
-                pdf.set_font('NotoSans', '', 11)
-                for suggestion in suggestions:
-                    pdf.set_x(25)
-                    pdf.multi_cell(0, 7, f"• {suggestion}")
-                pdf.ln(2)
-    elif support_type == 'Individual Therapy':
-        improvement_areas = answers.get('7', [])
-        therapy_suggestions = SUGGESTION_TEMPLATES.get('Individual Therapy', {})
-        for area in improvement_areas:
-            suggestions = therapy_suggestions.get(area, [])
-            if suggestions:
-                # Başlık için kalın fontu ve yeni satırı ayarla
-                pdf.set_font('NotoSans', 'B', 11)
-                pdf.set_x(15)
-                pdf.multi_cell(0, 7, f"- {area}:")
-                # Öneriler için normal fontu ve girintiyi ayarla
-                pdf.set_font('NotoSans', '', 11)
-                for suggestion in suggestions:
-                    pdf.set_x(25)
-                    pdf.multi_cell(0, 7, f"• {suggestion}")
-                pdf.ln(2)
-    else:
-        improvement_areas = answers.get('7', [])
-        for area in improvement_areas:
-            suggestions = SUGGESTION_TEMPLATES.get(area.capitalize(), [])
-            if suggestions:
-                for suggestion in suggestions:
-                    pdf.set_x(15)
-                    pdf.multi_cell(0, 7, f"- {suggestion}")
-                pdf.ln(2)
-
-    # Hiçbir öneri yoksa genel bir metin göster
-    if not any(
-        (answers.get('12', []), answers.get('15', []), answers.get('7', []))
-    ):
-        pdf.set_x(15)
-        pdf.multi_cell(0, 7, "- Sessions that will support your general psychological well-being are recommended.")
-    
-    pdf.ln(3)
+    # ?async=1: rapor arka planda hazırlanır, istemci /matching/report/<job_id> ile durumu sorgular
+    if request.args.get('async') == '1':
+        job = _get_report_jobs().submit(
+            current_app._get_current_object(),
+            current_user.id,
+            _build_report,
+            answers, recommended_therapist_id, user_label, report_date
+        )
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('matching.report_status', job_id=job.id)
+        }), 202
+
+    pdf_bytes = _build_report(answers, recommended_therapist_id, user_label, report_date)
+    return send_file(
+        BytesIO(pdf_bytes),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=_report_filename(user_label)
+    )
 
-    pdf.add_page()
-    pdf.set_font('NotoSans', 'B', 14)
-    pdf.cell(0, 10, "Therapist Recommendations Special to You", ln=True, align='C')
-    pdf.ln(10)
+@matching_bp.route('/report/<job_id>')
+@login_required
+def report_status(job_id):
+    """Arka plan rapor işinin durumunu döndürür; hazırsa PDF'i indirir."""
+    job = _get_report_jobs().get(job_id, current_user.id)
+    if job is None:
+        abort(404)
+
+    status = job.status
+    if status == 'failed':
+        current_app.logger.error(f"Report job {job_id} failed: {job.future.exception()}")
+        return jsonify({'job_id': job_id, 'status': status}), 500
+    if status != 'ready':
+        return jsonify({'job_id': job_id, 'status': status}), 202
 
-    if recommendation:
-        pdf.set_font('NotoSans', 'B', 12)
-        pdf.cell(0, 10, "Recommended Therapist", ln=True)
-        add_therapist_to_pdf(pdf, recommendation, is_recommended=True)
-    
-    if other_therapists:
-        pdf.set_font('NotoSans', 'B', 12)
-        pdf.cell(0, 10, "Other Suitable Therapists", ln=True)
-        for therapist in other_therapists:
-            add_therapist_to_pdf(pdf, therapist)
-            
-    if not recommendation and not other_therapists:
-        pdf.set_font('NotoSans', '', 11)
-        pdf.multi_cell(0, 7, "Based on your answers, no suitable therapists were found for you at this time. Please try again later or expand your criteria.")
-
-    pdf_output = pdf.output(dest='S')
     return send_file(
-        BytesIO(pdf_output.encode('latin-1')),
+        BytesIO(job.result()),
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=f"Evaluation_Report_{user_label}.pdf"
-
+        download_name=_report_filename(getattr(current_user, 'full_name', 'Guest'))
     )
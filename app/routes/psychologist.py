@@ -5,10 +5,34 @@ from datetime import datetime
 from datetime import timedelta 
 from app.models.review import Review
 from app.forms.review_form import ReviewForm
-from app import db
+from app.models.psychologist import WEEKDAYS
 
 psychologist_bp = Blueprint('psychologist', __name__, url_prefix='/psychologists')
 
+# Takvim modunda tek istekte dönülebilecek en fazla gün sayısı
+MAX_AVAILABILITY_DAYS = 30
+
+def _turkey_now():
+    """Türkiye saatine göre şimdiki zamanı döndürür (UTC+3)."""
+    return datetime.utcnow() + timedelta(hours=3)
+
+def _filter_past_slots(date, slots, now_adjusted):
+    """Geçmişte kalan saatleri listeden çıkarır."""
+    today = now_adjusted.date()
+    current_time = now_adjusted.time()
+    # Koşul: Seçilen tarih gelecekteyse VEYA seçilen tarih bugünse ve slot saati şimdiki saatten ilerideyse
+    return [slot for slot in slots if date > today or (date == today and slot > current_time)]
+
+def _parsed_working_hours(psychologist):
+    """Çalışma saatlerini {'Monday': [{'start': '09:00', 'end': '17:00'}]} biçiminde döndürür."""
+    return {
+        WEEKDAYS[weekday]: [
+            {'start': f'{start // 60:02d}:{start % 60:02d}', 'end': f'{end // 60:02d}:{end % 60:02d}'}
+            for start, end in intervals
+        ]
+        for weekday, intervals in psychologist.get_compiled_working_hours().items()
+    }
+
 @psychologist_bp.route('/')
 @login_required
 def list_psychologists():
@@ -18,7 +42,7 @@ def list_psychologists():
     if specialty:
         psychologists = PsychologistService.filter_by_specialty(specialty)
     else:
-        psychologists = PsychologistService.get_all_psychologists()
+        psychologists = PsychologistService.get_directory()
     
     return render_template('psychologist/list.html', title='Psychologists', psychologists=psychologists)
 
@@ -65,14 +89,12 @@ def add_review(psychologist_id):
         return redirect(url_for('psychologist.psychologist_detail', psychologist_id=psychologist.id))
 
     if form.validate_on_submit():
-        new_review = Review(
-            rating=form.rating.data,
-            comment=form.comment.data,
+        PsychologistService.add_review(
+            psychologist_id=psychologist.id,
             user_id=current_user.id,
-            psychologist_id=psychologist.id
+            rating=form.rating.data,
+            comment=form.comment.data
         )
-        db.session.add(new_review)
-        db.session.commit()
         flash('Değerlendirmeniz için teşekkür ederiz!', 'success')
     else:
         # Form validasyonu başarısız olursa hataları flash mesaj olarak göster
@@ -86,6 +108,9 @@ def add_review(psychologist_id):
 @login_required
 def psychologist_availability(psychologist_id):
     """Get availability for a specific psychologist"""
+    if 'from' in request.args:
+        return _availability_calendar(psychologist_id)
+    
     date_str = request.args.get('date')
     if date_str:
         try:
@@ -99,19 +124,8 @@ def psychologist_availability(psychologist_id):
         return render_template('errors/404.html'), 404
     all_slots = PsychologistService.get_available_slots(psychologist_id, date)
  
-    # --- YENİ EKLENEN ZAMAN AYARLAMA VE FİLTRELEME KODU ---
-    now_utc = datetime.utcnow()
-    now_adjusted = now_utc + timedelta(hours=3)  # Türkiye saati için +3 saat
- 
-    filtered_slots = []
-    today = now_adjusted.date()
-    current_time = now_adjusted.time()
- 
-    for slot in all_slots:
-        # Koşul: Seçilen tarih gelecekteyse VEYA seçilen tarih bugünse ve slot saati şimdiki saatten ilerideyse
-        if date > today or (date == today and slot > current_time):
-            filtered_slots.append(slot)
-    # --- YENİ KODUN SONU ---
+    now_adjusted = _turkey_now()  # Türkiye saati için +3 saat
+    filtered_slots = _filter_past_slots(date, all_slots, now_adjusted)
  
     # Eğer AJAX isteği ise, filtrelenmiş saatleri JSON olarak döndür
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -129,6 +143,48 @@ def psychologist_availability(psychologist_id):
         now=now_adjusted # Şablona güncel 'now' değişkenini gönder
     )
 
+def _availability_calendar(psychologist_id):
+    """Return free slots for a ?from=&to= date range as JSON with cache validators"""
+    from_str = request.args.get('from')
+    to_str = request.args.get('to') or from_str
+    try:
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+    
+    if end_date < start_date or (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        return jsonify({'error': f'Date range must cover 1 to {MAX_AVAILABILITY_DAYS} days'}), 400
+    
+    psychologist = PsychologistService.get_psychologist_by_id(psychologist_id)
+    if not psychologist:
+        return jsonify({'error': 'Psychologist not found'}), 404
+    
+    slots_by_date, last_modified = PsychologistService.get_availability_calendar(psychologist, start_date, end_date)
+    now_adjusted = _turkey_now()
+    
+    response = jsonify({
+        'psychologist_id': psychologist.id,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'working_hours': _parsed_working_hours(psychologist),
+        'days': [
+            {
+                'date': day.isoformat(),
+                'slots': [slot.strftime('%H:%M') for slot in _filter_past_slots(day, slots, now_adjusted)]
+            }
+            for day, slots in slots_by_date.items()
+        ]
+    })
+    # ETag covers the body (working hours and past-slot filtering included);
+    # Last-Modified follows the latest appointment change in the range
+    response.add_etag()
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @psychologist_bp.route('/search')
 def search_psychologists():
     """Search for psychologists by specialty"""
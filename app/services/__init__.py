@@ -1,4 +1,5 @@
 # Import services to make them available when importing from the services package
 from app.services.user_service import UserService
 from app.services.psychologist_service import PsychologistService
-from app.services.appointment_service import AppointmentService
\ No newline at end of file
+from app.services.appointment_service import AppointmentService
+from app.services.chat_service import ChatService
\ No newline at end of file
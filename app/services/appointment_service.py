@@ -4,7 +4,9 @@ from app.models.psychologist import Psychologist
 from app.models.user import User
 #from flask import current_app # current_app'i içe aktarın
 from .email_service import send_appointment_confirmation_email
+from .tool_cache import invalidate_availability
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 
 class AppointmentService:
     """Service for appointment-related operations"""
@@ -28,18 +30,9 @@ class AppointmentService:
                 return None, "You are not authorized to create an appointment."
         # ▲▲▲ ABONELİK KONTROL MANTIĞI ▲▲▲
         
-        # Check for conflicts
-        conflict = Appointment.check_conflict(
-            psychologist_id=psychologist_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        )
-        
-        if conflict:
-            return None, "This time slot is already booked"
-        
-        # Check if psychologist is available at this time
-        if not psychologist.is_available(appointment_date, appointment_time):
+        # Check if psychologist works at this time (no query; slot conflicts are
+        # enforced by the uq_appointments_planned_slot index on commit)
+        if not psychologist.is_within_working_hours(appointment_date, appointment_time):
             return None, "Psychologist is not available at this time"
         
         # Create appointment
@@ -54,9 +47,20 @@ class AppointmentService:
         # Save to database
         db.session.add(appointment)
         # ▼▼▼ SEANS HAKKINI DÜŞÜRME ▼▼▼
-        user.use_session()
+        user.use_session(commit=False)
         # ▲▲▲ SEANS HAKKINI DÜŞÜRME ▲▲▲
-        db.session.commit()
+        # Randevu ve seans hakkı tek bir transaction içinde kaydedilir
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not Appointment.is_slot_conflict(e):
+                raise
+            # Aynı slota eşzamanlı bir randevu kaydedildi
+            return None, "This time slot is already booked"
+        
+        # Chatbot'un önbellekteki müsaitlik sonucu artık geçersiz
+        invalidate_availability(psychologist_id, appointment_date)
         
         # ▼▼▼ E-POSTA GÖNDERME İŞLEMİNİ ÇAĞIRIN ▼▼▼
         # Randevu başarıyla oluşturulduktan sonra e-posta gönder.
@@ -110,6 +114,7 @@ class AppointmentService:
                     user.remaining_sessions += 1
             # ▲▲▲ SEANS İADE MANTIĞI ▲▲▲
             db.session.commit()
+            invalidate_availability(appointment.psychologist_id, appointment.appointment_date)
             return True, "Appointment cancelled successfully"
         
         return False, "Cannot cancel this appointment"
@@ -130,6 +135,7 @@ class AppointmentService:
         success = appointment.complete()
         if success:
             db.session.commit()
+            invalidate_availability(appointment.psychologist_id, appointment.appointment_date)
             return True, "Appointment marked as completed"
         
         return False, "Cannot complete this appointment"
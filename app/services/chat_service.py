@@ -0,0 +1,93 @@
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.chat import ChatConversation, ChatMessage
+
+# Rolling summary limits: characters kept per folded turn and for the whole summary
+SUMMARY_LINE_CHARS = 200
+SUMMARY_MAX_CHARS = 2000
+
+
+class ChatService:
+    """Service for persisted chatbot conversations"""
+
+    @staticmethod
+    def get_active_conversation(user_id, create=True):
+        """Return the user's latest open conversation, starting one if needed"""
+        conversation = ChatConversation.query.filter_by(user_id=user_id, closed_at=None)\
+            .order_by(ChatConversation.created_at.desc(), ChatConversation.id.desc()).first()
+        if conversation is None and create:
+            conversation = ChatConversation(user_id=user_id)
+            db.session.add(conversation)
+            db.session.flush()
+        return conversation
+
+    @staticmethod
+    def close_conversation(user_id):
+        """Close the open conversation so the next message starts a new one"""
+        conversation = ChatService.get_active_conversation(user_id, create=False)
+        if conversation:
+            conversation.closed_at = datetime.utcnow()
+            db.session.commit()
+
+    @staticmethod
+    def add_message(conversation, role, content):
+        """Append a turn to the conversation (committed with the caller's transaction)"""
+        message = ChatMessage(conversation_id=conversation.id, role=role, content=content)
+        db.session.add(message)
+        db.session.flush()
+        return message
+
+    @staticmethod
+    def get_recent_messages(conversation, limit):
+        """Last `limit` turns, oldest first"""
+        if limit <= 0:
+            return []
+        messages = conversation.messages.order_by(ChatMessage.id.desc()).limit(limit).all()
+        messages.reverse()
+        return messages
+
+    @staticmethod
+    def load_window(conversation, window=None):
+        """Return (summary, recent turns) for building a prompt
+
+        Turns that slid out of the window since the last call are folded into
+        the stored summary, so each call reads at most the window plus the few
+        turns added since.
+        """
+        if window is None:
+            window = current_app.config.get('CHAT_HISTORY_WINDOW', 20)
+        recent = ChatService.get_recent_messages(conversation, window)
+
+        if recent:
+            overflow = conversation.messages.filter(
+                ChatMessage.id > conversation.summarized_through_id,
+                ChatMessage.id < recent[0].id
+            ).order_by(ChatMessage.id).all()
+            if overflow:
+                ChatService.summarize(conversation, overflow)
+
+        return conversation.summary, recent
+
+    @staticmethod
+    def summarize(conversation, messages):
+        """Fold turns (oldest first) into the conversation summary; they are not sent again"""
+        conversation.summary = ChatService.fold_summary(conversation.summary, messages)
+        conversation.summarized_through_id = messages[-1].id
+
+    @staticmethod
+    def fold_summary(summary, messages):
+        """Append the user's side of older turns to the summary, keeping it bounded"""
+        lines = summary.split('\n') if summary else []
+        for message in messages:
+            if message.role != 'user':
+                continue
+            content = ' '.join(message.content.split())
+            if len(content) > SUMMARY_LINE_CHARS:
+                content = content[:SUMMARY_LINE_CHARS - 1] + '…'
+            lines.append(f"- {content}")
+
+        # Oldest points go first once the summary is full
+        while lines and len('\n'.join(lines)) > SUMMARY_MAX_CHARS:
+            lines.pop(0)
+        return '\n'.join(lines) or None
@@ -0,0 +1,79 @@
+import re
+
+
+def turkish_fold(text):
+    """Lowercase text with Turkish rules: I -> ı and İ -> i
+
+    Dotted and dotless i stay different letters ('sınır' is not 'sinir');
+    ASCII spellings have to be listed as keywords of their own. (Chained
+    replace is several times faster than str.translate here.)
+    """
+    return text.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+# What an ASCII capital I folds to for matching: ı in Turkish ('KIZGIN') but i in
+# English and in Turkish typed without Turkish letters ('ANXIETY', 'ILISKI').
+# A letter of its own (U+026A) that keywords accept in place of either.
+AMBIGUOUS_I = '\u026a'
+
+
+def match_fold(text):
+    """Lowercase text for keyword matching, folding I to AMBIGUOUS_I"""
+    return text.replace('I', AMBIGUOUS_I).replace('İ', 'i').lower()
+
+
+def keyword_spellings(keyword):
+    """Return every spelling of a folded keyword with any of its i/ı written as AMBIGUOUS_I"""
+    spellings = ['']
+    for char in keyword:
+        options = (char, AMBIGUOUS_I) if char in 'iı' else (char,)
+        spellings = [spelling + option for spelling in spellings for option in options]
+    return spellings
+
+
+def _trie_pattern(keywords):
+    """Regex alternation with shared prefixes factored out, e.g. sinir(?:li)?"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional tails are greedy, so the longest keyword at a position wins
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds keywords in text with one precompiled regex (a trie of the keywords)
+
+    Keywords match at the start of a word, so Turkish suffixes still match
+    ('kaygılarım' -> 'kaygı') but 'danger' does not match 'anger'.
+    """
+
+    def __init__(self, keywords):
+        # Spelling -> (position in the keyword table, value)
+        self._entries = {}
+        for index, (keyword, value) in enumerate(keywords.items()):
+            for spelling in keyword_spellings(turkish_fold(keyword)):
+                self._entries.setdefault(spelling, (index, value))
+        # A keyword has to follow a non-word character; texts get a leading space.
+        # Scanning for \W first is cheaper than a lookbehind at every position.
+        self._pattern = re.compile(r'\W(' + _trie_pattern(self._entries) + ')')
+
+    def find_all(self, text):
+        """Return the values of the keywords in text, in order of appearance, without duplicates"""
+        entries = self._entries
+        return list(dict.fromkeys(entries[keyword][1] for keyword in self._pattern.findall(' ' + match_fold(text))))
+
+    def first(self, text):
+        """Return the value of the keyword listed first in the table among those in text, or None"""
+        keywords = self._pattern.findall(' ' + match_fold(text))
+        return min(map(self._entries.__getitem__, keywords))[1] if keywords else None
@@ -0,0 +1,186 @@
+import random
+import threading
+import time
+import httpx
+import openai
+from app.services.llm_health import ProviderHealth
+
+# Placeholder shipped in .env examples; treated as "not configured"
+_PLACEHOLDER_KEYS = ('', 'your-openai-api-key-here')
+
+
+class LLMBusyError(Exception):
+    """Raised when no concurrency slot frees up within the queue timeout"""
+
+
+def is_provider_failure(error):
+    """Errors that mean the provider is unreachable or unusable, not that the request was bad"""
+    if isinstance(error, openai.APIConnectionError):  # Includes timeouts
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500 or error.status_code in (401, 403, 429)
+    return False
+
+
+def is_retryable(error):
+    """Rate limits, server errors and dropped connections are worth another try; timeouts are not"""
+    if isinstance(error, openai.APITimeoutError):
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class _ReleasingStream:
+    """Iterates a completion stream and frees its concurrency slot once it is finished or closed"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            self._stream.close()
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+class LLMClient:
+    """Shared OpenAI client for the app
+
+    One pooled HTTP client with keep-alive is reused by every request. At most
+    max_concurrency calls run at once; others wait up to queue_timeout and
+    then fail with LLMBusyError instead of piling up. 429/5xx responses are
+    retried with exponential backoff and full jitter, and each call goes
+    through the ProviderHealth circuit breaker.
+    """
+
+    def __init__(self, api_key=None, base_url=None, timeout=30, connect_timeout=5,
+                 max_connections=20, max_keepalive=10, max_concurrency=8, queue_timeout=10,
+                 max_retries=2, retry_backoff=0.5, max_retry_backoff=8, health=None, sleep=time.sleep):
+        self.api_key = api_key if api_key not in _PLACEHOLDER_KEYS else None
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        # A ProviderHealth built before the client (see init_llm_client) probes through it
+        self.health = health or ProviderHealth(None, is_failure=is_provider_failure)
+        if self.health.probe_func is None:
+            self.health.probe_func = self.probe
+        self.sleep = sleep
+        self.stats = {'calls': 0, 'retries': 0, 'busy': 0}
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._http = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=30
+            )
+        )
+        # Retries are done here (with jitter and the semaphore held), not by the SDK
+        self._client = openai.OpenAI(
+            api_key=self.api_key or 'not-configured',
+            base_url=base_url or None,
+            http_client=self._http,
+            max_retries=0
+        )
+
+    @property
+    def available(self):
+        return self.api_key is not None
+
+    def chat(self, timeout=None, **kwargs):
+        """Create a chat completion; with stream=True the chunks are returned as an iterable"""
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            self.stats['busy'] += 1
+            raise LLMBusyError("Too many concurrent LLM requests")
+        try:
+            response = self.health.call(self._create, timeout or self.timeout, kwargs)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        if kwargs.get('stream'):
+            # The slot stays taken while the reply is being streamed
+            return _ReleasingStream(response, self._semaphore.release)
+        self._semaphore.release()
+        return response
+
+    def _create(self, timeout, kwargs):
+        attempt = 0
+        while True:
+            self.stats['calls'] += 1
+            try:
+                return self._client.chat.completions.create(timeout=timeout, **kwargs)
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable(error):
+                    raise
+                self.stats['retries'] += 1
+                self.sleep(self._retry_delay(attempt, error))
+                attempt += 1
+
+    def _retry_delay(self, attempt, error):
+        """Full jitter over the exponential backoff, honouring Retry-After when the server sends it"""
+        delay = random.uniform(0, min(self.max_retry_backoff, self.retry_backoff * 2 ** attempt))
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                delay = max(delay, min(float(response.headers.get('retry-after', 0)), self.max_retry_backoff))
+            except ValueError:
+                pass
+        return delay
+
+    def probe(self, model='gpt-4'):
+        """Cheap request that checks the API key and model access without generating tokens"""
+        self._client.models.retrieve(model, timeout=self.timeout)
+
+    def close(self):
+        self._http.close()
+
+
+def init_llm_client(app):
+    """Create the app's LLMClient from config and probe the provider once"""
+    from app import scheduler
+    health = ProviderHealth(
+        None,
+        failure_threshold=app.config.get('LLM_FAILURE_THRESHOLD', 3),
+        backoff=app.config.get('LLM_HEALTH_BACKOFF', 5),
+        max_backoff=app.config.get('LLM_HEALTH_MAX_BACKOFF', 300),
+        is_failure=is_provider_failure,
+        scheduler=scheduler
+    )
+    api_key = app.config.get('OPENAI_API_KEY')
+    client = LLMClient(
+        api_key=api_key,
+        base_url=app.config.get('OPENAI_BASE_URL'),
+        timeout=app.config.get('LLM_TIMEOUT', 30),
+        connect_timeout=app.config.get('LLM_CONNECT_TIMEOUT', 5),
+        max_connections=app.config.get('LLM_MAX_CONNECTIONS', 20),
+        max_concurrency=app.config.get('LLM_MAX_CONCURRENCY', 8),
+        queue_timeout=app.config.get('LLM_QUEUE_TIMEOUT', 10),
+        max_retries=app.config.get('LLM_MAX_RETRIES', 2),
+        health=health
+    )
+
+    previous = app.extensions.get('llm_client')
+    if previous is not None:
+        previous.close()
+    app.extensions['llm_client'] = client
+
+    if not client.available:
+        app.logger.warning("OpenAI API key not configured; the chatbot is disabled.")
+    elif app.config.get('LLM_STARTUP_PROBE', True):
+        client.health.start()
+    return client
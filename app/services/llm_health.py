@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while it is known to be down"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"LLM provider unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class ProviderHealth:
+    """Circuit breaker for the LLM provider
+
+    closed    - calls go straight to the provider
+    open      - calls fail fast until the backoff expires
+    half_open - one trial (a probe or a real call) decides whether to close again
+
+    The provider is probed once on start(); later probes are only scheduled
+    while the circuit is open, with the backoff doubling after every failed
+    trial up to max_backoff.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, probe, failure_threshold=3, backoff=5, max_backoff=300,
+                 is_failure=None, scheduler=None, clock=time.monotonic):
+        self.probe_func = probe
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.is_failure = is_failure or (lambda error: True)
+        self.scheduler = scheduler
+        self.clock = clock
+        self.stats = {'calls': 0, 'rejected': 0, 'failures': 0, 'probes': 0}
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened = 0  # Consecutive times the circuit opened, for the backoff
+        self._retry_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def retry_in(self):
+        """Seconds until the next trial is allowed (0 when the circuit is not open)"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._retry_at - self.clock())
+
+    def allow_request(self):
+        """Return True if a call may go to the provider now
+
+        The first caller after the backoff moves the circuit to half_open and
+        becomes the trial; everyone else fails fast until it reports back.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.clock() >= self._retry_at:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        """Open the circuit with the next backoff (called with the lock held)"""
+        delay = min(self.backoff * 2 ** self._opened, self.max_backoff)
+        self._opened += 1
+        self._state = self.OPEN
+        self._trial_running = False
+        self._retry_at = self.clock() + delay
+        if self.scheduler is not None and self.scheduler.running:
+            self.scheduler.add_job(
+                func=self.probe,
+                trigger='date',
+                run_date=datetime.now() + timedelta(seconds=delay),
+                id=f'llm_health_probe_{id(self)}',
+                replace_existing=True
+            )
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker; raises CircuitOpenError without calling it when open"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.retry_in())
+        self.stats['calls'] += 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            if self.is_failure(error):
+                self.record_failure()
+            else:
+                # The provider answered; the request itself was wrong
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def probe(self):
+        """Run the probe as a trial if one is due; returns True if the provider is healthy"""
+        if not self.allow_request():
+            return False
+        self.stats['probes'] += 1
+        try:
+            self.probe_func()
+        except Exception:
+            # A failed probe means the provider is down, whatever the threshold
+            with self._lock:
+                self.stats['failures'] += 1
+                self._open()
+            return False
+        self.record_success()
+        return True
+
+    def start(self):
+        """Probe the provider once in the background (or right away without a scheduler)"""
+        if self.scheduler is not None and self.scheduler.running:
+            self.scheduler.add_job(func=self.probe, id=f'llm_health_probe_{id(self)}', replace_existing=True)
+        else:
+            self.probe()
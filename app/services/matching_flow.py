@@ -0,0 +1,200 @@
+from wtforms import RadioField, SelectMultipleField
+
+RESULTS = 'results'
+
+# Answer kinds
+CHOICE = 'choice'   # RadioField: stored as the choice index
+MULTI = 'multi'     # SelectMultipleField: stored as a bitmask of choice indexes
+TEXT = 'text'       # Anything else: stored as the submitted string
+
+# Stored for a single-choice question left blank (only allowed where the answer does not pick the next step)
+SKIPPED = -1
+
+
+class MatchingFlow:
+    """Compiled matching wizard
+
+    Built once from STEP_QUESTIONS, STEP_FLOW and the form class. The graph is
+    validated up front, transitions are table lookups and answers are kept as
+    a fixed-length vector so the session size does not grow with each step.
+    """
+
+    def __init__(self, step_questions, step_flow, form_class, start_step=1, max_selections=3):
+        self.start_step = start_step
+        self.max_selections = max_selections
+        self.steps = tuple(sorted(step_questions))
+        self._slots = {step: slot for slot, step in enumerate(self.steps)}
+
+        self._fields = {}
+        self._kinds = {}
+        self._choices = {}
+        self._choice_index = {}
+        for step in self.steps:
+            field_name = step_questions[step]['field']
+            unbound = getattr(form_class, field_name, None)
+            if unbound is None:
+                raise ValueError(f"Step {step} refers to unknown form field '{field_name}'")
+            if issubclass(unbound.field_class, RadioField):
+                kind = CHOICE
+            elif issubclass(unbound.field_class, SelectMultipleField):
+                kind = MULTI
+            else:
+                kind = TEXT
+            self._fields[step] = field_name
+            self._kinds[step] = kind
+            if kind != TEXT:
+                choices = tuple(value for value, _ in unbound.kwargs.get('choices', ()))
+                self._choices[step] = choices
+                self._choice_index[step] = {value: index for index, value in enumerate(choices)}
+
+        self._transitions = self._compile(step_flow)
+        self._validate()
+
+    def _compile(self, step_flow):
+        """Turn STEP_FLOW into {step: target} or {step: {choice_index: target}}"""
+        if set(step_flow) != set(self.steps):
+            raise ValueError(f"STEP_FLOW and STEP_QUESTIONS cover different steps: {sorted(set(step_flow) ^ set(self.steps))}")
+
+        transitions = {}
+        for step, target in step_flow.items():
+            if isinstance(target, dict):
+                if self._kinds[step] != CHOICE:
+                    raise ValueError(f"Step {step} branches but is not a single-choice question")
+                missing = set(self._choices[step]) - set(target)
+                unknown = set(target) - set(self._choices[step])
+                if missing or unknown:
+                    raise ValueError(f"Step {step} branches do not match its choices (missing {sorted(missing)}, unknown {sorted(unknown)})")
+                for value in target.values():
+                    self._check_target(step, value)
+                transitions[step] = {self._choice_index[step][value]: next_step for value, next_step in target.items()}
+            else:
+                self._check_target(step, target)
+                transitions[step] = target
+        return transitions
+
+    def _check_target(self, step, target):
+        if target != RESULTS and target not in self._slots:
+            raise ValueError(f"Step {step} leads to unknown step {target!r}")
+
+    def _targets(self, step):
+        target = self._transitions[step]
+        return target.values() if isinstance(target, dict) else (target,)
+
+    def _validate(self):
+        """Every step must be reachable from the start and able to reach the results"""
+        if self.start_step not in self._slots:
+            raise ValueError(f"Start step {self.start_step} is not defined")
+
+        reachable = set()
+        pending = [self.start_step]
+        while pending:
+            step = pending.pop()
+            if step in reachable:
+                continue
+            reachable.add(step)
+            pending.extend(target for target in self._targets(step) if target != RESULTS)
+        unreachable = set(self.steps) - reachable
+        if unreachable:
+            raise ValueError(f"Steps {sorted(unreachable)} cannot be reached from step {self.start_step}")
+
+        finishing = set()
+        changed = True
+        while changed:
+            changed = False
+            for step in self.steps:
+                if step not in finishing and any(target == RESULTS or target in finishing for target in self._targets(step)):
+                    finishing.add(step)
+                    changed = True
+        dead_ends = set(self.steps) - finishing
+        if dead_ends:
+            raise ValueError(f"Steps {sorted(dead_ends)} never reach the results")
+
+    def is_step(self, step):
+        return step in self._slots
+
+    def field_name(self, step):
+        return self._fields[step]
+
+    def kind(self, step):
+        return self._kinds[step]
+
+    def branches(self, step):
+        """True if the answer to step decides the next step"""
+        return isinstance(self._transitions[step], dict)
+
+    def new_state(self):
+        """Session state: [current_step, answer slot per step]"""
+        return [self.start_step] + [None] * len(self.steps)
+
+    def current_step(self, state):
+        return state[0] if state else self.start_step
+
+    def set_current_step(self, state, step):
+        state[0] = step if self.is_step(step) else self.start_step
+
+    def encode_answer(self, step, value):
+        """Return the compact form of a submitted value, or None if it is not a valid answer"""
+        kind = self._kinds[step]
+        if kind == CHOICE:
+            if not value and not self.branches(step):
+                return SKIPPED
+            return self._choice_index[step].get(value)
+        if kind == MULTI:
+            mask = 0
+            for item in value:
+                index = self._choice_index[step].get(item)
+                if index is not None:
+                    mask |= 1 << index
+            return mask
+        return value
+
+    def set_answer(self, state, step, value):
+        """Store a submitted value and return the next step (or RESULTS); None if the answer is invalid"""
+        encoded = self.encode_answer(step, value)
+        if encoded is None:
+            return None
+        state[self._slots[step] + 1] = encoded
+        target = self._transitions[step]
+        if isinstance(target, dict):
+            return target[encoded]
+        return target
+
+    def decode_answer(self, step, encoded):
+        kind = self._kinds[step]
+        if kind == CHOICE:
+            return '' if encoded == SKIPPED else self._choices[step][encoded]
+        if kind == MULTI:
+            return [value for index, value in enumerate(self._choices[step]) if encoded & (1 << index)]
+        return encoded
+
+    def answers(self, state):
+        """Answers as {'<step>': value}, the shape the results and report code expect"""
+        if not state:
+            return {}
+        return {
+            str(step): self.decode_answer(step, encoded)
+            for step, encoded in zip(self.steps, state[1:])
+            if encoded is not None
+        }
+
+    def path(self, state):
+        """Steps visited from the start by following the stored answers, ending at the first unanswered step"""
+        path = []
+        step = self.start_step
+        while step != RESULTS and step not in path:
+            path.append(step)
+            encoded = state[self._slots[step] + 1] if state else None
+            if encoded is None:
+                break
+            target = self._transitions[step]
+            step = target[encoded] if isinstance(target, dict) else target
+        return path
+
+    def previous_step(self, state, step):
+        """The step before `step` on the current answer path"""
+        path = self.path(state)
+        if step in path:
+            index = path.index(step)
+            return path[index - 1] if index > 0 else self.start_step
+        # Steps past the end of the path go back to its last step
+        return path[-1] if path else self.start_step
@@ -0,0 +1,77 @@
+import re
+from app.services.chat_service import ChatService
+
+# Words, numbers and single symbols; a BPE tokenizer rarely merges across them
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+# Characters per token inside a long word (Turkish splits into short pieces)
+CHARS_PER_TOKEN = 3
+# Chat format overhead: role and separators per message, reply priming per prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+PROMPT_OVERHEAD_TOKENS = 3
+
+
+def estimate_tokens(text):
+    """Count tokens locally, erring on the high side (no tokenizer download needed)"""
+    if not text:
+        return 0
+    return sum(-(-len(piece) // CHARS_PER_TOKEN) for piece in _TOKEN_PIECES.findall(text))
+
+
+class PromptBuilder:
+    """Assembles chat prompts that fit a token budget
+
+    A prompt is the static system prompt (counted once, here), the user
+    state and conversation summary, as many recent turns as fit, and the
+    new message. Turns that no longer fit are folded into the
+    conversation's summary once and skipped from then on.
+    """
+
+    def __init__(self, system_prompt, tokenizer=estimate_tokens):
+        self.system_prompt = system_prompt
+        self.tokenizer = tokenizer
+        self.system_tokens = tokenizer(system_prompt)
+
+    def count(self, content):
+        """Tokens one message with this content takes in the prompt"""
+        return self.tokenizer(content or '') + MESSAGE_OVERHEAD_TOKENS
+
+    def build(self, conversation, history, message, state=None, budget=4000):
+        """Return the chat messages for a new user message
+
+        history is the conversation's recent turns, oldest first. Older
+        turns are summarized until the prompt fits budget; the system
+        prompt, the user state and the new message are always sent.
+        """
+        history = [turn for turn in history if turn.id > conversation.summarized_through_id]
+        state_section = f"\n\nKULLANICI DURUMU: {state}" if state else ''
+
+        fixed = (PROMPT_OVERHEAD_TOKENS + MESSAGE_OVERHEAD_TOKENS + self.system_tokens
+                 + self.tokenizer(state_section) + self.count(message))
+        history_tokens = sum(self.count(turn.content) for turn in history)
+
+        # Drop the oldest turns into the summary until everything fits
+        start = 0
+        while start < len(history) and \
+                fixed + self.tokenizer(self._summary_section(conversation.summary)) + history_tokens > budget:
+            ChatService.summarize(conversation, [history[start]])
+            history_tokens -= self.count(history[start].content)
+            start += 1
+
+        # With every turn summarized, the oldest summary points are left out of this prompt too
+        summary = conversation.summary
+        while summary and fixed + self.tokenizer(self._summary_section(summary)) + history_tokens > budget:
+            summary = summary.split('\n', 1)[1] if '\n' in summary else None
+
+        messages = [{
+            "role": "system",
+            "content": self.system_prompt + state_section + self._summary_section(summary)
+        }]
+        messages.extend(turn.to_prompt() for turn in history[start:])
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    @staticmethod
+    def _summary_section(summary):
+        if not summary:
+            return ''
+        return f"\n\nÖNCEKİ KONUŞMA ÖZETİ (kullanıcının daha önce anlattıkları):\n{summary}"
@@ -1,7 +1,145 @@
+import json
+import threading
+import time as _time
+from dataclasses import dataclass
+from types import MappingProxyType
+from flask import current_app
 from app import db
-from app.models.psychologist import Psychologist
+from app.models.psychologist import Psychologist, parse_specialties, compile_working_hours
+from app.models.psychologist_specialty import PsychologistSpecialty, normalize_specialty
 from app.models.appointment import Appointment
-from datetime import datetime, timedelta
+from app.models.review import Review
+from datetime import date as _date, time, timedelta
+from sqlalchemy import case, func, or_
+
+
+# Spellings accepted for the stored gender and language values (compared case-insensitively)
+GENDER_ALIASES = {
+    'female': ('female', 'f', 'woman', 'kadın', 'kadin', 'bayan'),
+    'male': ('male', 'm', 'man', 'erkek', 'bay'),
+}
+LANGUAGE_ALIASES = {
+    'turkish': ('turkish', 'türkçe', 'turkce', 'tr'),
+    'english': ('english', 'ingilizce', 'en'),
+}
+
+
+def _aliases(value, table):
+    """Return every accepted spelling for value, or just value itself if it is not in the table"""
+    value = (value or '').strip().casefold()
+    for aliases in table.values():
+        if value in aliases:
+            return aliases
+    return (value,) if value else ()
+
+
+@dataclass(frozen=True)
+class PsychologistSnapshot:
+    """Immutable, session-independent copy of a psychologist's directory data"""
+    id: int
+    first_name: str
+    last_name: str
+    specialties: tuple
+    specialty_keys: frozenset
+    languages: tuple
+    gender: str
+    profile_image_url: str
+    bio: str
+    working_hours: MappingProxyType
+    average_rating: int
+    review_count: int
+    
+    @classmethod
+    def from_model(cls, psychologist):
+        """Build a snapshot from a Psychologist row"""
+        specialties = tuple(s for s in psychologist.get_specialties() if isinstance(s, str))
+        return cls(
+            id=psychologist.id,
+            first_name=psychologist.first_name,
+            last_name=psychologist.last_name,
+            specialties=specialties,
+            specialty_keys=frozenset(normalize_specialty(s) for s in specialties),
+            languages=tuple(l.strip() for l in (psychologist.languages or '').split(',') if l.strip()),
+            gender=psychologist.gender,
+            profile_image_url=psychologist.profile_image_url,
+            bio=psychologist.bio,
+            working_hours=MappingProxyType(psychologist.get_working_hours()),
+            average_rating=psychologist.average_rating,
+            review_count=psychologist.review_count
+        )
+    
+    @property
+    def full_name(self):
+        """Return the psychologist's full name"""
+        return f"{self.first_name} {self.last_name}"
+    
+    def get_specialties(self):
+        """Return specialties as a list, like Psychologist.get_specialties"""
+        return list(self.specialties)
+    
+    def get_working_hours(self):
+        """Return working hours as a dictionary, like Psychologist.get_working_hours"""
+        return dict(self.working_hours)
+
+
+class PsychologistDirectory:
+    """In-process, read-through cache of psychologist snapshots
+    
+    The version is bumped every time the snapshot set is reloaded or
+    invalidated, so it can be used as part of other cache keys.
+    """
+    
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+    
+    def _is_fresh(self):
+        if self._snapshots is None:
+            return False
+        return self.ttl is None or _time.monotonic() - self._loaded_at < self.ttl
+    
+    def get(self):
+        """Return a tuple of PsychologistSnapshot ordered by id, loading it on a miss"""
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._snapshots
+            self.misses += 1
+            version = self.version
+        
+        snapshots = tuple(
+            PsychologistSnapshot.from_model(p) for p in Psychologist.query.order_by(Psychologist.id).all()
+        )
+        
+        with self._lock:
+            # Do not store a result that an invalidation made stale while it was loading
+            if version == self.version:
+                self._snapshots = snapshots
+                self._loaded_at = _time.monotonic()
+                self.version += 1
+        return snapshots
+    
+    def invalidate(self):
+        """Drop the cached snapshots"""
+        with self._lock:
+            self._snapshots = None
+            self.version += 1
+    
+    def stats(self):
+        """Return version, hit/miss counters and the cached entry count"""
+        with self._lock:
+            return {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._snapshots) if self._snapshots is not None else 0
+            }
+
 
 class PsychologistService:
     """Service for psychologist-related operations"""
@@ -11,6 +149,43 @@ class PsychologistService:
         """Get all psychologists"""
         return Psychologist.query.all()
     
+    @staticmethod
+    def _directory():
+        """Return the directory cache of the current application"""
+        directory = current_app.extensions.get('psychologist_directory')
+        if directory is None:
+            directory = current_app.extensions.setdefault(
+                'psychologist_directory',
+                PsychologistDirectory(ttl=current_app.config.get('PSYCHOLOGIST_DIRECTORY_TTL'))
+            )
+        return directory
+    
+    @staticmethod
+    def get_directory():
+        """Get cached snapshots of all psychologists (no query on a cache hit)"""
+        return PsychologistService._directory().get()
+    
+    @staticmethod
+    def get_directory_version():
+        """Get the current directory version stamp"""
+        return PsychologistService._directory().version
+    
+    @staticmethod
+    def get_report_stamp():
+        """Get [psychologist count, latest updated_at], read from the database so every process agrees"""
+        count, last_updated = db.session.query(func.count(Psychologist.id), func.max(Psychologist.updated_at)).one()
+        return [count, last_updated.isoformat() if last_updated else None]
+    
+    @staticmethod
+    def invalidate_directory():
+        """Drop the cached directory after psychologist or review changes"""
+        PsychologistService._directory().invalidate()
+    
+    @staticmethod
+    def directory_stats():
+        """Get directory cache counters"""
+        return PsychologistService._directory().stats()
+    
     @staticmethod
     def get_psychologist_by_id(psychologist_id):
         """Get a psychologist by ID"""
@@ -18,18 +193,140 @@ class PsychologistService:
     
     @staticmethod
     def filter_by_specialty(specialty):
-        """Filter psychologists by specialty"""
-        # This is a simple implementation that checks if the specialty is in the list
-        # A more sophisticated approach would use full-text search or a separate table
-        psychologists = Psychologist.query.all()
-        filtered = []
+        """Filter psychologists by specialty (case-insensitive, indexed lookup)"""
+        return Psychologist.query.join(
+            PsychologistSpecialty, PsychologistSpecialty.psychologist_id == Psychologist.id
+        ).filter(
+            PsychologistSpecialty.specialty_key == normalize_specialty(specialty)
+        ).all()
+    
+    @staticmethod
+    def match(specialties, support_type=None):
+        """Match psychologists against several specialties in one query
         
-        for psychologist in psychologists:
-            specialties = psychologist.get_specialties()
-            if specialty.lower() in [s.lower() for s in specialties]:
-                filtered.append(psychologist)
+        Returns a list of (psychologist, match_score) tuples, where match_score is
+        the number of requested specialties (including the support type) the
+        psychologist covers, ordered by score and then average rating.
+        """
+        requested = list(specialties or [])
+        if support_type:
+            requested.append(support_type)
+        keys = {normalize_specialty(s) for s in requested} - {''}
+        if not keys:
+            return []
         
-        return filtered
+        match_score = func.count(PsychologistSpecialty.id).label('match_score')
+        average_rating = func.coalesce(
+            Psychologist.rating_sum * 1.0 / func.nullif(Psychologist.rating_count, 0), 0
+        )
+        
+        return db.session.query(Psychologist, match_score).join(
+            PsychologistSpecialty, PsychologistSpecialty.psychologist_id == Psychologist.id
+        ).filter(
+            PsychologistSpecialty.specialty_key.in_(keys)
+        ).group_by(
+            Psychologist.id
+        ).order_by(
+            match_score.desc(), average_rating.desc(), Psychologist.id
+        ).all()
+    
+    @staticmethod
+    def search_candidates(specialty=None, gender=None, language=None, limit=5, today=None):
+        """Find psychologists for the chatbot with the filtering and ranking done in SQL
+        
+        specialty is a prefix of a normalized specialty key ('anxiety' finds
+        'anxiety disorders'), looked up through the specialty_key index; gender
+        is matched against the stored gender and language against the
+        comma-separated languages. Psychologists who have not listed any
+        languages are kept, but rank below those who list the requested one.
+        The query orders by that language score and average rating and applies
+        the limit; free slots in the next 7 days break ties among the rows
+        returned. Returns compact dicts.
+        """
+        average_rating = func.coalesce(
+            Psychologist.rating_sum * 1.0 / func.nullif(Psychologist.rating_count, 0), 0
+        ).label('average_rating')
+        query = db.session.query(
+            Psychologist.id,
+            Psychologist.first_name,
+            Psychologist.last_name,
+            Psychologist.specialties,
+            Psychologist.languages,
+            Psychologist.working_hours,
+            average_rating
+        )
+        
+        # Prefix match as a key range, so the specialty_key index is used
+        specialty_key = normalize_specialty(specialty)
+        if specialty_key:
+            key_end = specialty_key[:-1] + chr(ord(specialty_key[-1]) + 1)
+            query = query.filter(Psychologist.id.in_(
+                db.session.query(PsychologistSpecialty.psychologist_id).filter(
+                    PsychologistSpecialty.specialty_key >= specialty_key,
+                    PsychologistSpecialty.specialty_key < key_end
+                )
+            ))
+        
+        genders = _aliases(gender, GENDER_ALIASES)
+        if genders:
+            query = query.filter(func.lower(Psychologist.gender).in_(genders))
+        
+        # ',tr,en,' style list so short codes only match whole entries
+        order_by = [average_rating.desc(), Psychologist.id]
+        languages = _aliases(language, LANGUAGE_ALIASES)
+        if languages:
+            language_list = ',' + func.replace(func.lower(Psychologist.languages), ' ', '', type_=db.String) + ','
+            listed = or_(*[language_list.contains(f',{alias},', autoescape=True) for alias in languages])
+            query = query.filter(or_(
+                Psychologist.languages.is_(None),
+                Psychologist.languages == '',
+                listed
+            ))
+            order_by.insert(0, case((listed, 0), else_=1))
+        
+        rows = query.order_by(*order_by).limit(limit).all()
+        if not rows:
+            return []
+        
+        # Booked slots for the coming week, one grouped query for all candidates
+        start = today or _date.today()
+        end = start + timedelta(days=6)
+        booked = dict(db.session.query(
+            Appointment.psychologist_id,
+            func.count(Appointment.id)
+        ).filter(
+            Appointment.psychologist_id.in_([row.id for row in rows]),
+            Appointment.status == 'planned',
+            Appointment.appointment_date >= start,
+            Appointment.appointment_date <= end
+        ).group_by(Appointment.psychologist_id).all())
+        
+        ranked = []
+        for row in rows:
+            try:
+                working_hours = json.loads(row.working_hours) if row.working_hours else {}
+            except json.JSONDecodeError:
+                working_hours = {}
+            working_hours = compile_working_hours(working_hours if isinstance(working_hours, dict) else {})
+            weekly_slots = sum(
+                len(PsychologistService._working_slots(working_hours, start + timedelta(days=offset)))
+                for offset in range(7)
+            )
+            listed = {entry.strip().casefold() for entry in (row.languages or '').split(',') if entry.strip()}
+            candidate = {
+                'id': row.id,
+                'name': f"{row.first_name} {row.last_name}",
+                'specialties': parse_specialties(row.specialties),
+                'languages': sorted(listed),
+                'rating': round(row.average_rating, 1),
+                'free_slots_7d': max(weekly_slots - booked.get(row.id, 0), 0)
+            }
+            unlisted = bool(languages) and not listed & set(languages)
+            ranked.append(((unlisted, -row.average_rating, -candidate['free_slots_7d']), candidate))
+        
+        # Stable sort: only ties in the SQL order are reordered
+        ranked.sort(key=lambda item: item[0])
+        return [candidate for _, candidate in ranked]
     
     @staticmethod
     def create_psychologist(first_name, last_name, specialties, bio, working_hours):
@@ -47,6 +344,7 @@ class PsychologistService:
         # Save to database
         db.session.add(psychologist)
         db.session.commit()
+        PsychologistService.invalidate_directory()
         
         return psychologist
     
@@ -71,51 +369,132 @@ class PsychologistService:
         
         # Save changes
         db.session.commit()
+        PsychologistService.invalidate_directory()
         
         return psychologist
     
+    @staticmethod
+    def add_review(psychologist_id, user_id, rating, comment=None):
+        """Add a review and update the psychologist's rating aggregates in the same transaction"""
+        review = Review(
+            rating=rating,
+            comment=comment,
+            user_id=user_id,
+            psychologist_id=psychologist_id
+        )
+        db.session.add(review)
+        
+        # Increment in SQL so concurrent reviews do not overwrite each other
+        Psychologist.query.filter_by(id=psychologist_id).update({
+            Psychologist.rating_sum: Psychologist.rating_sum + rating,
+            Psychologist.rating_count: Psychologist.rating_count + 1
+        }, synchronize_session='evaluate')
+        db.session.commit()
+        PsychologistService.invalidate_directory()
+        
+        return review
+    
+    @staticmethod
+    def _review_aggregates():
+        """Return {psychologist_id: (rating_sum, rating_count)} computed from the reviews table"""
+        rows = db.session.query(
+            Review.psychologist_id,
+            func.sum(Review.rating),
+            func.count(Review.id)
+        ).group_by(Review.psychologist_id).all()
+        return {psychologist_id: (rating_sum or 0, rating_count) for psychologist_id, rating_sum, rating_count in rows}
+    
+    @staticmethod
+    def backfill_ratings():
+        """Recompute stored rating aggregates from the reviews table, returns the number of rows changed"""
+        aggregates = PsychologistService._review_aggregates()
+        updated = 0
+        for psychologist in Psychologist.query.all():
+            rating_sum, rating_count = aggregates.get(psychologist.id, (0, 0))
+            if psychologist.rating_sum != rating_sum or psychologist.rating_count != rating_count:
+                psychologist.rating_sum = rating_sum
+                psychologist.rating_count = rating_count
+                updated += 1
+        db.session.commit()
+        if updated:
+            PsychologistService.invalidate_directory()
+        return updated
+    
+    @staticmethod
+    def check_rating_consistency():
+        """Return a list of (psychologist, expected_sum, expected_count) for out-of-date aggregates"""
+        aggregates = PsychologistService._review_aggregates()
+        mismatches = []
+        for psychologist in Psychologist.query.all():
+            rating_sum, rating_count = aggregates.get(psychologist.id, (0, 0))
+            if psychologist.rating_sum != rating_sum or psychologist.rating_count != rating_count:
+                mismatches.append((psychologist, rating_sum, rating_count))
+        return mismatches
+    
     @staticmethod
     def get_available_slots(psychologist_id, date):
         """Get available time slots for a psychologist on a specific date"""
+        return PsychologistService.get_available_slots_for_range(psychologist_id, date, date).get(date, [])
+    
+    @staticmethod
+    def get_available_slots_for_range(psychologist_id, start_date, end_date):
+        """Get available time slots for every date in [start_date, end_date]
+        
+        Booked slots are fetched with a single query and subtracted in memory.
+        Returns a dict mapping each date to its list of free slot times.
+        """
         psychologist = Psychologist.query.get(psychologist_id)
         if not psychologist:
-            return []
+            return {}
         
-        # Get working hours for the day
-        working_hours = psychologist.get_working_hours()
-        day_of_week = date.strftime('%A')
+        slots_by_date, _ = PsychologistService.get_availability_calendar(psychologist, start_date, end_date)
+        return slots_by_date
+    
+    @staticmethod
+    def get_availability_calendar(psychologist, start_date, end_date):
+        """Get free slots for a date range plus the time of the latest appointment change
         
-        if day_of_week not in working_hours:
-            return []
+        Returns (slots_by_date, last_modified); last_modified is None when the range
+        has no appointments. Uses a single appointments query.
+        """
+        if end_date < start_date:
+            return {}, None
         
-        day_hours = working_hours[day_of_week]
-        if not day_hours:
-            return []
+        appointments = db.session.query(
+            Appointment.appointment_date,
+            Appointment.appointment_time,
+            Appointment.status,
+            Appointment.updated_at
+        ).filter(
+            Appointment.psychologist_id == psychologist.id,
+            Appointment.appointment_date >= start_date,
+            Appointment.appointment_date <= end_date
+        ).all()
         
-        # Parse working hours
-        start_time_str, end_time_str = day_hours.split('-')
-        start_time = datetime.strptime(start_time_str, '%H:%M').time()
-        end_time = datetime.strptime(end_time_str, '%H:%M').time()
+        booked = {
+            (appointment_date, appointment_time)
+            for appointment_date, appointment_time, status, _ in appointments
+            if status == 'planned'
+        }
+        last_modified = max((updated_at for *_, updated_at in appointments if updated_at), default=None)
         
-        # Generate time slots (assuming 1-hour appointments)
+        working_hours = psychologist.get_compiled_working_hours()
+        slots_by_date = {}
+        day = start_date
+        while day <= end_date:
+            slots_by_date[day] = [
+                slot for slot in PsychologistService._working_slots(working_hours, day)
+                if (day, slot) not in booked
+            ]
+            day += timedelta(days=1)
+        
+        return slots_by_date, last_modified
+    
+    @staticmethod
+    def _working_slots(compiled_hours, date):
+        """Generate the 1-hour slots inside the compiled working hours of the given date"""
         slots = []
-        slot_time = datetime.combine(date, start_time)
-        end_datetime = datetime.combine(date, end_time)
-        
-        while slot_time < end_datetime:
-            slot = slot_time.time()
-            
-            # Check if slot is available
-            conflict = Appointment.check_conflict(
-                psychologist_id=psychologist_id,
-                appointment_date=date,
-                appointment_time=slot
-            )
-            
-            if not conflict:
-                slots.append(slot)
-            
-            # Move to next slot
-            slot_time += timedelta(hours=1)
-        
-        return slots
\ No newline at end of file
+        for start, end in compiled_hours.get(date.weekday(), ()):
+            # Generate time slots (assuming 1-hour appointments)
+            slots.extend(time(minute // 60, minute % 60) for minute in range(start, min(end, 24 * 60), 60))
+        return slots
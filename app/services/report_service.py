@@ -0,0 +1,565 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fpdf import FPDF
+from fpdf.ttfonts import TTFontFile
+
+# Parsed font metrics shared by every report in the process, keyed by font file paths
+_FONT_CACHE = {}
+_FONT_CACHE_LOCK = threading.Lock()
+
+# Embedded font subsets keyed by (font file, character set); reports share most characters
+SUBSET_CACHE_SIZE = 128
+_SUBSET_CACHE = OrderedDict()
+_SUBSET_CACHE_LOCK = threading.Lock()
+subset_cache_stats = {'hits': 0, 'misses': 0}
+
+_TO_UNICODE_CMAP = (
+    "/CIDInit /ProcSet findresource begin\n"
+    "12 dict begin\n"
+    "begincmap\n"
+    "/CIDSystemInfo\n"
+    "<</Registry (Adobe)\n"
+    "/Ordering (UCS)\n"
+    "/Supplement 0\n"
+    ">> def\n"
+    "/CMapName /Adobe-Identity-UCS def\n"
+    "/CMapType 2 def\n"
+    "1 begincodespacerange\n"
+    "<0000> <FFFF>\n"
+    "endcodespacerange\n"
+    "1 beginbfrange\n"
+    "<0000> <FFFF> <0000>\n"
+    "endbfrange\n"
+    "endcmap\n"
+    "CMapName currentdict /CMap defineresource pop\n"
+    "end\n"
+    "end"
+)
+
+
+def _load_fonts(font_regular, font_bold):
+    """Load NotoSans metrics once per process and return (fonts, font_files) templates"""
+    key = (font_regular, font_bold)
+    with _FONT_CACHE_LOCK:
+        if key not in _FONT_CACHE:
+            template = FPDF()
+            # alias_nb_pages affects the initial glyph subset, so match the report setup
+            template.alias_nb_pages()
+            template.add_font("NotoSans", "", font_regular, uni=True)
+            template.add_font("NotoSans", "B", font_bold, uni=True)
+            # The bundled .pkl metric files store the TTF path of the machine they were
+            # generated on; point them at the local files
+            for fontkey, path in (('notosans', font_regular), ('notosansB', font_bold)):
+                template.fonts[fontkey]['ttffile'] = path
+                template.font_files[fontkey]['ttffile'] = path
+            _FONT_CACHE[key] = (template.fonts, template.font_files)
+        return _FONT_CACHE[key]
+
+
+class ReportPDF(FPDF):
+    """FPDF document with the ModeCalm header and page-number footer
+
+    The finished document is assembled in a bytearray instead of FPDF's str
+    buffer, so binary streams (fonts, images) are appended as-is rather than
+    decoded to latin-1 and encoded back on output.
+    """
+
+    def __init__(self, logo_path, report_font):
+        super().__init__()
+        self.logo_path = logo_path
+        self.report_font = report_font
+        self.buffer = bytearray()
+
+    def _out(self, s):
+        if self.state == 2:
+            # Page content is still collected as text by FPDF
+            super()._out(s)
+            return
+        if isinstance(s, str):
+            s = s.encode('latin-1')
+        elif not isinstance(s, (bytes, bytearray)):
+            s = str(s).encode('latin-1')
+        self.buffer += s
+        self.buffer += b"\n"
+
+    def output_bytes(self):
+        """Finish the document and return it as bytes"""
+        if self.state < 3:
+            self.close()
+        # Page texts are already in the buffer; release them before copying it out
+        self.pages = {}
+        pdf_bytes = bytes(self.buffer)
+        self.buffer = bytearray()
+        return pdf_bytes
+
+    def _putfonts(self):
+        # TrueType subsets come from the per-charset cache; FPDF writes the core fonts.
+        # The report registers NotoSans before anything else, so object order is unchanged.
+        ttf_fonts = {fontkey: font for fontkey, font in self.fonts.items() if font['type'] == 'TTF'}
+        for font in sorted(ttf_fonts.values(), key=lambda font: font['i']):
+            self._put_ttf_subset(font)
+        for fontkey in ttf_fonts:
+            del self.fonts[fontkey]
+        try:
+            super()._putfonts()
+        finally:
+            self.fonts.update(ttf_fonts)
+
+    def _put_ttf_subset(self, font):
+        """Write the same objects as FPDF's TTF branch, using a cached subset"""
+        # FPDF drops the leading 0 placeholder before subsetting
+        embedded = _embedded_subset(font, frozenset(font['subset'][1:]))
+        fontname = 'MPDFAA+' + font['name']
+        font['n'] = self.n + 1
+
+        # Type0 Font
+        self._newobj()
+        self._out('<</Type /Font')
+        self._out('/Subtype /Type0')
+        self._out('/BaseFont /' + fontname)
+        self._out('/Encoding /Identity-H')
+        self._out('/DescendantFonts [' + str(self.n + 1) + ' 0 R]')
+        self._out('/ToUnicode ' + str(self.n + 2) + ' 0 R')
+        self._out('>>')
+        self._out('endobj')
+
+        # CIDFontType2
+        self._newobj()
+        self._out('<</Type /Font')
+        self._out('/Subtype /CIDFontType2')
+        self._out('/BaseFont /' + fontname)
+        self._out('/CIDSystemInfo ' + str(self.n + 2) + ' 0 R')
+        self._out('/FontDescriptor ' + str(self.n + 3) + ' 0 R')
+        if font['desc'].get('MissingWidth'):
+            self._out('/DW %d' % font['desc']['MissingWidth'])
+        self._out(embedded['widths'])
+        self._out('/CIDToGIDMap ' + str(self.n + 4) + ' 0 R')
+        self._out('>>')
+        self._out('endobj')
+
+        # ToUnicode
+        self._newobj()
+        self._out('<</Length ' + str(len(_TO_UNICODE_CMAP)) + '>>')
+        self._putstream(_TO_UNICODE_CMAP)
+        self._out('endobj')
+
+        # CIDSystemInfo dictionary
+        self._newobj()
+        self._out('<</Registry (Adobe)')
+        self._out('/Ordering (UCS)')
+        self._out('/Supplement 0')
+        self._out('>>')
+        self._out('endobj')
+
+        # Font descriptor
+        self._newobj()
+        self._out('<</Type /FontDescriptor')
+        self._out('/FontName /' + fontname)
+        for kd in ('Ascent', 'Descent', 'CapHeight', 'Flags', 'FontBBox', 'ItalicAngle', 'StemV', 'MissingWidth'):
+            v = font['desc'][kd]
+            if kd == 'Flags':
+                v = (v | 4) & ~32  # Not symbolic
+            self._out(' /%s %s' % (kd, v))
+        self._out('/FontFile2 ' + str(self.n + 2) + ' 0 R')
+        self._out('>>')
+        self._out('endobj')
+
+        # CIDToGIDMap
+        self._newobj()
+        self._out('<</Length ' + str(len(embedded['cidtogidmap'])))
+        self._out('/Filter /FlateDecode')
+        self._out('>>')
+        self._putstream(embedded['cidtogidmap'])
+        self._out('endobj')
+
+        # Font file
+        self._newobj()
+        self._out('<</Length ' + str(len(embedded['fontstream'])))
+        self._out('/Filter /FlateDecode')
+        self._out('/Length1 ' + str(embedded['fontsize']))
+        self._out('>>')
+        self._putstream(embedded['fontstream'])
+        self._out('endobj')
+
+    def header(self):
+        if os.path.exists(self.logo_path):
+            self.image(self.logo_path, x=10, y=8, w=30)
+        self.set_font(self.report_font, 'B', 14)
+        self.cell(0, 10, "ModeCalm - Evaluation Report", ln=True, align='C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('helvetica', 'I', 8)
+        self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", 0, 0, 'C')
+
+
+class _WidthsCapture:
+    """Collects the /W array FPDF._putTTfontwidths writes"""
+
+    def __init__(self):
+        self.lines = []
+
+    def _out(self, s):
+        self.lines.append(s)
+
+
+def _embedded_subset(font, charset):
+    """Return the compressed subset, CIDToGIDMap and /W widths for charset, building them once"""
+    key = (font['ttffile'], charset)
+    with _SUBSET_CACHE_LOCK:
+        embedded = _SUBSET_CACHE.get(key)
+        if embedded is not None:
+            _SUBSET_CACHE.move_to_end(key)
+            subset_cache_stats['hits'] += 1
+            return embedded
+        subset_cache_stats['misses'] += 1
+
+    ttf = TTFontFile()
+    ttfontstream = ttf.makeSubset(font['ttffile'], sorted(charset))
+
+    cidtogidmap = bytearray(256 * 256 * 2)
+    for cc, glyph in ttf.codeToGlyph.items():
+        cidtogidmap[cc * 2] = glyph >> 8
+        cidtogidmap[cc * 2 + 1] = glyph & 0xFF
+
+    # The width table only tests membership, so a set keeps it linear
+    capture = _WidthsCapture()
+    FPDF._putTTfontwidths(capture, dict(font, subset=charset), ttf.maxUni)
+
+    embedded = {
+        'fontstream': zlib.compress(ttfontstream),
+        'fontsize': len(ttfontstream),
+        'cidtogidmap': zlib.compress(bytes(cidtogidmap)),
+        'widths': capture.lines[-1],
+    }
+    with _SUBSET_CACHE_LOCK:
+        _SUBSET_CACHE[key] = embedded
+        while len(_SUBSET_CACHE) > SUBSET_CACHE_SIZE:
+            _SUBSET_CACHE.popitem(last=False)
+    return embedded
+
+
+class ReportRenderer:
+    """Renders matching evaluation reports
+
+    Fonts are parsed once per process and finished PDFs are kept in an LRU
+    cache keyed by a hash of the report inputs.
+    """
+
+    def __init__(self, static_folder, step_questions, suggestion_templates, cache_size=64):
+        self.static_folder = static_folder
+        self.step_questions = step_questions
+        self.suggestion_templates = suggestion_templates
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(answers, recommended_id, therapist_stamp, user_label, report_date):
+        """Hash the inputs that determine a report's content
+
+        therapist_stamp stands for the therapists' data (see PsychologistService.get_report_stamp).
+        """
+        payload = json.dumps(
+            [answers, recommended_id, therapist_stamp, user_label, report_date],
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_cached(self, key):
+        """Return cached PDF bytes for key, or None"""
+        with self._cache_lock:
+            pdf_bytes = self._cache.get(key)
+            if pdf_bytes is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return pdf_bytes
+
+    def store(self, key, pdf_bytes):
+        """Cache PDF bytes for key, evicting the least recently used report"""
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[key] = pdf_bytes
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _new_pdf(self):
+        """Create a report document with the preloaded fonts attached"""
+        font_regular = os.path.join(self.static_folder, "fonts", "NotoSans-Regular.ttf")
+        font_bold = os.path.join(self.static_folder, "fonts", "NotoSans-Bold.ttf")
+        logo_path = os.path.join(self.static_folder, 'images', 'arkaplan.jpg')
+
+        if not (os.path.exists(font_regular) and os.path.exists(font_bold)):
+            pdf = ReportPDF(logo_path, 'Helvetica')
+            pdf.alias_nb_pages()
+            return pdf
+
+        fonts, font_files = _load_fonts(font_regular, font_bold)
+        pdf = ReportPDF(logo_path, 'NotoSans')
+        pdf.alias_nb_pages()
+        # Glyph widths are shared read-only; the used-glyph subset is per document
+        pdf.fonts = {fontkey: dict(font, subset=list(font['subset'])) for fontkey, font in fonts.items()}
+        pdf.font_files = {name: dict(info) for name, info in font_files.items()}
+        return pdf
+
+    @staticmethod
+    def _rating_as_text(rating, max_stars=5):
+        """Sadece PDF için sayısal puan döndürür."""
+        if rating is None or rating == 0:
+            return 'No reviews'
+        rounded_rating = round(rating * 2) / 2
+        return f"{rounded_rating} / {max_stars}"
+
+    def _add_therapist(self, pdf, therapist, is_recommended=False):
+        """PDF'e tek bir terapist bilgisini biçimlendirilmiş şekilde ekler."""
+        # Tahmini yükseklik (görsel + metinler için minimum)
+        image_box_height = 40
+        min_height = 50
+
+        # Sayfa sonunda yeterli boşluk yoksa yeni sayfa ekle
+        if pdf.get_y() + min_height > pdf.page_break_trigger:
+            pdf.add_page()
+
+        start_y = pdf.get_y()
+
+        image_box_width = 40
+        text_start_x = pdf.l_margin + image_box_width + 5
+        text_start_y = start_y + 5
+
+        # Kutuyu çiz
+        if is_recommended:
+            pdf.set_fill_color(240, 255, 240)
+        else:
+            pdf.set_draw_color(200, 200, 200)
+
+        # Görseli yerleştirin
+        image_path = None
+        if therapist.profile_image_url:
+            image_path = os.path.join(self.static_folder, 'images', therapist.profile_image_url.lstrip('/\\'))
+            if os.path.exists(image_path):
+                pdf.image(image_path, x=pdf.l_margin + 2, y=start_y + 2, w=image_box_width - 4, h=image_box_height - 4)
+
+        # Metinleri yerleştirin
+        rating_text = self._rating_as_text(therapist.average_rating)
+        specialties_str = ", ".join(therapist.get_specialties())
+        self._write_therapist_text(pdf, therapist, text_start_x, text_start_y, rating_text, specialties_str)
+
+        # Metin bloğunun bittiği son Y pozisyonunu alın
+        end_y_text = pdf.get_y()
+
+        # Görselin bittiği pozisyonu hesaplayın
+        end_y_image = start_y + image_box_height + 5  # Görsel ve tampon boşluk
+
+        # Bir sonraki bloğun başlayacağı konumu, görsel ve metin bloğundan hangisi daha yüksekse ona göre ayarlayın
+        next_y = max(end_y_text, end_y_image)
+
+        # Kutuyu son yüksekliğe göre yeniden çiz
+        if is_recommended:
+            pdf.rect(pdf.l_margin, start_y, pdf.w - pdf.l_margin - pdf.r_margin, next_y - start_y, 'DF')
+        else:
+            pdf.rect(pdf.l_margin, start_y, pdf.w - pdf.l_margin - pdf.r_margin, next_y - start_y, 'D')
+
+        # Metinleri ve görseli tekrar üzerine yazma (ilk deneme sırasında çizilen kutuyu örtmek için)
+        if image_path and os.path.exists(image_path):
+            pdf.image(image_path, x=pdf.l_margin + 2, y=start_y + 2, w=image_box_width - 4, h=image_box_height - 4)
+        self._write_therapist_text(pdf, therapist, text_start_x, text_start_y, rating_text, specialties_str)
+
+        # Bir sonraki eleman için Y pozisyonunu ayarlayın
+        pdf.set_y(next_y + 5)
+
+    @staticmethod
+    def _write_therapist_text(pdf, therapist, x, y, rating_text, specialties_str):
+        font = pdf.report_font
+        pdf.set_xy(x, y)
+        pdf.set_font(font, 'B', 12)
+        pdf.cell(0, 7, therapist.full_name, ln=True)
+        pdf.set_x(x)
+        pdf.set_font(font, '', 11)
+        pdf.cell(0, 7, f"Average Score: {rating_text}", ln=True)
+        pdf.set_x(x)
+        pdf.set_font(font, '', 10)
+        pdf.multi_cell(pdf.w - x - pdf.r_margin, 5, f"Areas of Expertise: {specialties_str}")
+
+    def _add_suggestions(self, pdf, support_type, answers):
+        font = pdf.report_font
+        area_answers = {
+            'Couples Therapy': '12',
+            'Child & Adolescent Therapy': '15',
+            'Individual Therapy': '7',
+        }
+        if support_type in area_answers:
+            therapy_suggestions = self.suggestion_templates.get(support_type, {})
+            for area in answers.get(area_answers[support_type], []):
+                suggestions = therapy_suggestions.get(area, [])
+                if suggestions:
+                    # Başlık için kalın fontu ve yeni satırı ayarla
+                    pdf.set_font(font, 'B', 11)
+                    pdf.set_x(15)
+                    pdf.multi_cell(0, 7, f"- {area}:")
+                    # Öneriler için normal fontu ve girintiyi ayarla
+                    pdf.set_font(font, '', 11)
+                    for suggestion in suggestions:
+                        pdf.set_x(25)
+                        pdf.multi_cell(0, 7, f"• {suggestion}")
+                    pdf.ln(2)
+        else:
+            for area in answers.get('7', []):
+                suggestions = self.suggestion_templates.get(area.capitalize(), [])
+                if suggestions:
+                    for suggestion in suggestions:
+                        pdf.set_x(15)
+                        pdf.multi_cell(0, 7, f"- {suggestion}")
+                    pdf.ln(2)
+
+        # Hiçbir öneri yoksa genel bir metin göster
+        if not any(
+            (answers.get('12', []), answers.get('15', []), answers.get('7', []))
+        ):
+            pdf.set_x(15)
+            pdf.multi_cell(0, 7, "- Sessions that will support your general psychological well-being are recommended.")
+
+    def render(self, user_label, report_date, answers, recommendation, other_therapists):
+        """Lay out the report and return the PDF as bytes"""
+        pdf = self._new_pdf()
+        font = pdf.report_font
+
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.set_left_margin(15)
+        pdf.set_right_margin(15)
+
+        pdf.set_font(font, 'B', 12)
+        pdf.cell(0, 8, f"User: {user_label}", ln=True)
+        pdf.cell(0, 8, f"Report Date: {report_date}", ln=True)
+        pdf.ln(5)
+
+        pdf.set_font(font, 'B', 12)
+        pdf.cell(0, 10, "Your answers:", ln=True)
+        pdf.ln(2)
+
+        # answers sözlüğünde yer alan adımlar üzerinden döngü kur
+        for step_num_str in sorted(answers.keys(), key=int):
+            # Soru metnini STEP_QUESTIONS sözlüğünden al
+            question_data = self.step_questions.get(int(step_num_str))
+            if not question_data:
+                continue  # Eğer soru tanımı yoksa, atla.
+
+            answer = answers.get(step_num_str)
+
+            # Cevap formatını düzelt
+            if isinstance(answer, list):
+                answer = ", ".join(answer)
+            answer_text = "—" if not answer or (isinstance(answer, str) and not answer.strip()) else str(answer)
+
+            pdf.set_font(font, 'B', 11)
+            pdf.multi_cell(0, 7, f"Question: {question_data['question']}")
+
+            pdf.set_x(pdf.l_margin)
+            pdf.set_font(font, '', 11)
+            pdf.multi_cell(0, 7, f"Answer: {answer_text}")
+            pdf.ln(3)
+
+        pdf.ln(5)
+
+        pdf.set_font(font, 'B', 12)
+        pdf.cell(0, 10, "Summary and Evaluation:", ln=True)
+        pdf.ln(2)
+
+        self._add_suggestions(pdf, answers.get('6'), answers)
+
+        pdf.ln(3)
+
+        pdf.add_page()
+        pdf.set_font(font, 'B', 14)
+        pdf.cell(0, 10, "Therapist Recommendations Special to You", ln=True, align='C')
+        pdf.ln(10)
+
+        if recommendation:
+            pdf.set_font(font, 'B', 12)
+            pdf.cell(0, 10, "Recommended Therapist", ln=True)
+            self._add_therapist(pdf, recommendation, is_recommended=True)
+
+        if other_therapists:
+            pdf.set_font(font, 'B', 12)
+            pdf.cell(0, 10, "Other Suitable Therapists", ln=True)
+            for therapist in other_therapists:
+                self._add_therapist(pdf, therapist)
+
+        if not recommendation and not other_therapists:
+            pdf.set_font(font, '', 11)
+            pdf.multi_cell(0, 7, "Based on your answers, no suitable therapists were found for you at this time. Please try again later or expand your criteria.")
+
+        return pdf.output_bytes()
+
+
+class ReportJob:
+    """A report rendering in the background for one user"""
+
+    def __init__(self, owner_id, future):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.future = future
+        self.created_at = time.monotonic()
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return 'running' if self.future.running() else 'pending'
+        return 'failed' if self.future.exception() is not None else 'ready'
+
+    def result(self, timeout=None):
+        """Return the PDF bytes, waiting up to timeout seconds"""
+        return self.future.result(timeout)
+
+
+class ReportJobQueue:
+    """Runs report jobs on a local thread pool and keeps their results for ttl seconds"""
+
+    def __init__(self, max_workers=2, ttl=600):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, app, owner_id, func, *args):
+        """Run func(*args) inside an app context and return the new job"""
+        def run():
+            with app.app_context():
+                return func(*args)
+
+        job = ReportJob(owner_id, self._executor.submit(run))
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id, owner_id):
+        """Return the job if it exists and belongs to owner_id, otherwise None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        return job
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.future.done() and job.created_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class ToolResultCache:
+    """TTL + LRU cache for deterministic chatbot tool results
+
+    Entries carry tags, e.g. ('availability', psychologist_id, date), so a
+    booking can drop exactly the results it makes stale.
+    """
+
+    def __init__(self, max_entries=512, ttl=300, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, tags=()):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, tags=(), cacheable=lambda value: True):
+        """Return the cached value for key, or compute it and store it if cacheable(value)"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if cacheable(value):
+                self.set(key, value, tags)
+        return value
+
+    def invalidate(self, tag):
+        """Drop every entry carrying tag; returns the number dropped"""
+        with self._lock:
+            stale = [key for key, (_, tags, _) in self._entries.items() if tag in tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters, the hit rate and the cached entry count"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self._entries)
+            }
+
+
+def get_tool_cache():
+    """Return the tool result cache of the current application"""
+    cache = current_app.extensions.get('tool_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('tool_cache', ToolResultCache(
+            max_entries=current_app.config.get('TOOL_CACHE_SIZE', 512),
+            ttl=current_app.config.get('TOOL_CACHE_TTL', 300)
+        ))
+    return cache
+
+
+def availability_tag(psychologist_id, date):
+    """Tag of cached results that depend on the psychologist's bookings on date"""
+    return ('availability', int(psychologist_id), date.isoformat())
+
+
+def invalidate_availability(psychologist_id, date):
+    """Drop cached availability after a booking for the psychologist on date changed"""
+    return get_tool_cache().invalidate(availability_tag(psychologist_id, date))
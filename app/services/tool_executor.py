@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ToolExecutor:
+    """Runs independent chatbot tool calls concurrently on a local thread pool
+
+    Each call gets its own app context (and so its own database session).
+    A single call runs inline in the caller's thread.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-tool')
+
+    def map(self, app, func, items):
+        """Return [func(item) for item in items], running the items in parallel"""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        def run(item):
+            with app.app_context():
+                return func(item)
+
+        futures = [self._executor.submit(run, item) for item in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,349 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import session as current_session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+
+
+class SessionValueSerializer:
+    """Flask's tagged JSON (tuples, bytes, datetimes, ...) without needing an app context"""
+
+    def __init__(self):
+        self._tagger = TaggedJSONSerializer()
+
+    def dumps(self, value):
+        return json.dumps(self._tagger.tag(value), separators=(',', ':'), sort_keys=True, ensure_ascii=False)
+
+    def loads(self, raw):
+        return json.loads(raw, object_hook=self._tagger.untag)
+
+
+class SessionStore(ABC):
+    """Storage backend for server-side sessions
+
+    Values are stored per key as serialized text so a request only writes
+    the keys it changed.
+    """
+
+    @abstractmethod
+    def load(self, sid):
+        """Return (values, expires) for a live session, or None"""
+
+    @abstractmethod
+    def save(self, sid, updates, deletes, expires):
+        """Write changed keys, drop deleted ones and set the session expiry"""
+
+    @abstractmethod
+    def touch(self, sid, expires):
+        """Extend the session expiry without rewriting its values"""
+
+    @abstractmethod
+    def delete(self, sid):
+        """Remove a session and all of its values"""
+
+    @abstractmethod
+    def purge_expired(self):
+        """Remove expired sessions and return how many were removed"""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store, used by tests and single-process development"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._sessions[sid]
+                return None
+            self._sessions.move_to_end(sid)
+            return dict(entry[1]), entry[0]
+
+    def save(self, sid, updates, deletes, expires):
+        with self._lock:
+            values = self._sessions[sid][1] if sid in self._sessions else {}
+            values.update(updates)
+            for key in deletes:
+                values.pop(key, None)
+            self._sessions[sid] = (expires, values)
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def touch(self, sid, expires):
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid] = (expires, self._sessions[sid][1])
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires, _) in self._sessions.items() if expires <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """File-backed store; one row per session plus one row per session key"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, expires REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions (expires)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS session_values ('
+                'sid TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (sid, key))'
+            )
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        rows = self._connection().execute(
+            'SELECT s.expires, v.key, v.value FROM sessions s '
+            'LEFT JOIN session_values v ON v.sid = s.sid '
+            'WHERE s.sid = ? AND s.expires > ?',
+            (sid, time.time())
+        ).fetchall()
+        if not rows:
+            return None
+        return {key: value for _, key, value in rows if key is not None}, rows[0][0]
+
+    def save(self, sid, updates, deletes, expires):
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO sessions (sid, expires) VALUES (?, ?)', (sid, expires))
+            if deletes:
+                conn.executemany('DELETE FROM session_values WHERE sid = ? AND key = ?', [(sid, key) for key in deletes])
+            if updates:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO session_values (sid, key, value) VALUES (?, ?, ?)',
+                    [(sid, key, value) for key, value in updates.items()]
+                )
+
+    def touch(self, sid, expires):
+        with self._connection() as conn:
+            conn.execute('UPDATE sessions SET expires = ? WHERE sid = ?', (expires, sid))
+
+    def delete(self, sid):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM session_values WHERE sid = ?', (sid,))
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def purge_expired(self):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('DELETE FROM session_values WHERE sid IN (SELECT sid FROM sessions WHERE expires <= ?)', (now,))
+            return conn.execute('DELETE FROM sessions WHERE expires <= ?', (now,)).rowcount
+
+
+class ServerSideSession(SessionMixin):
+    """Session whose values are deserialized on first access
+
+    On save only keys whose serialized form changed are written back, so
+    keys a request never touches cost nothing.
+    """
+
+    def __init__(self, sid, serializer, raw=None, expires=None, new=False):
+        self.sid = sid
+        self.previous_sid = None
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        self.expires = expires
+        self._serializer = serializer
+        self._raw = dict(raw or {})
+        self._values = {}
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        self.accessed = True
+        if key not in self._values:
+            if key not in self._raw:
+                raise KeyError(key)
+            self._values[key] = self._serializer.loads(self._raw[key])
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        self.accessed = True
+        self.modified = True
+        self._values[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.accessed = True
+        self.modified = True
+        self._values.pop(key, None)
+        if self._raw.pop(key, None) is not None:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        self.accessed = True
+        return key in self._values or key in self._raw
+
+    def __iter__(self):
+        self.accessed = True
+        return iter(set(self._raw) | set(self._values))
+
+    def __len__(self):
+        return len(set(self._raw) | set(self._values))
+
+    def regenerate(self):
+        """Move the session to a new id, keeping its values
+
+        Call it when the user logs in or out, so an id planted before
+        login (session fixation) is never authenticated.
+        """
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+    def changes(self):
+        """Return (updates, deletes); values mutated in place are detected too
+
+        A new session (e.g. after regenerate) writes every key.
+        """
+        updates = {} if not self.new else {
+            key: raw for key, raw in self._raw.items() if key not in self._values
+        }
+        for key, value in self._values.items():
+            raw = self._serializer.dumps(value)
+            if self.new or raw != self._raw.get(key):
+                updates[key] = raw
+        return updates, set() if self.new else set(self._deleted)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a SessionStore; the cookie only carries a signed session id"""
+
+    serializer = SessionValueSerializer()
+
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session', key_derivation='hmac')
+
+    def _new_session(self):
+        return ServerSideSession(secrets.token_urlsafe(32), self.serializer, new=True)
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self._new_session()
+        try:
+            sid = self._signer(app).unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return self._new_session()
+        loaded = self.store.load(sid)
+        if loaded is None:
+            return self._new_session()
+        raw, expires = loaded
+        return ServerSideSession(sid, self.serializer, raw=raw, expires=expires)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # The old id of a regenerated session must stop working
+        if getattr(session, 'previous_sid', None):
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if not session.new or session.previous_sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+            return
+
+        now = time.time()
+        updates, deletes = session.changes()
+        if session.new or updates or deletes:
+            self.store.save(session.sid, updates, deletes, now + self.ttl)
+        elif session.expires is not None and session.expires - now < self.ttl / 2:
+            # Sliding expiry without rewriting values on every request
+            self.store.touch(session.sid, now + self.ttl)
+
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid.encode('utf-8')).decode('utf-8'),
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+
+
+def regenerate_session():
+    """Give the current session a new id (no-op for the cookie backend)"""
+    regenerate = getattr(current_session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+
+
+def init_session_store(app):
+    """Install the session backend selected by SESSION_BACKEND ('sqlite', 'memory' or 'cookie')"""
+    backend = app.config.get('SESSION_BACKEND', 'sqlite')
+    if backend == 'cookie':
+        return None
+    if backend == 'memory':
+        store = MemorySessionStore(app.config.get('SESSION_MEMORY_MAX_ENTRIES', 10000))
+    elif backend == 'sqlite':
+        path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.db')
+        store = SQLiteSessionStore(path)
+        from app import scheduler
+        scheduler.add_job(
+            func=store.purge_expired,
+            trigger='interval',
+            minutes=30,
+            id='purge_expired_sessions',
+            replace_existing=True
+        )
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND '{backend}'")
+    app.session_interface = ServerSideSessionInterface(store, app.config.get('SESSION_TTL', 7 * 24 * 3600))
+    return store
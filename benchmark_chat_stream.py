@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Script to measure time-to-first-byte of the chatbot endpoints against the local fake OpenAI server
+
+  message - /chatbot/api/message, JSON returned once the whole reply is generated
+  stream  - /chatbot/api/stream, Server-Sent Events flushed as tokens arrive
+
+Usage: python benchmark_chat_stream.py [token_delay_ms] [rounds]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('MAIL_SERVER', 'localhost')
+os.environ.setdefault('MAIL_PORT', '25')
+os.environ.setdefault('MAIL_USE_TLS', 'false')
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.user import User
+from tests.fake_openai import FakeOpenAIServer
+
+REPLY = ('Anladım, son zamanlarda yaşadığınız kaygı gerçekten yorucu olmalı. '
+         'Belirttiğiniz belirtilere göre kaygı bozuklukları alanında çalışan bir psikologla '
+         'görüşmeniz faydalı olabilir. İsterseniz size uygun psikologları arayabilirim.')
+
+
+class BenchmarkConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    OPENAI_API_KEY = 'benchmark'
+
+
+def measure(client, url, buffered):
+    """Return (first byte, first content, total) in seconds for one request"""
+    started = time.perf_counter()
+    response = client.post(url, json={'message': 'Son zamanlarda çok kaygılıyım'}, buffered=buffered)
+    first_byte = first_content = None
+    for chunk in response.response:
+        now = time.perf_counter() - started
+        first_byte = first_byte if first_byte is not None else now
+        if first_content is None and (buffered or b'event: token' in chunk):
+            first_content = now
+    return first_byte, first_content, time.perf_counter() - started
+
+
+def main():
+    token_delay = (int(sys.argv[1]) if len(sys.argv) > 1 else 30) / 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    fake = FakeOpenAIServer(reply=REPLY, token_delay=token_delay).start()
+    BenchmarkConfig.OPENAI_BASE_URL = fake.base_url
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(email='benchmark@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+
+        print(f"{len(fake.tokens(REPLY))} tokens, {token_delay * 1000:.0f} ms per token, {rounds} rounds")
+        print("=" * 60)
+        for name, url, buffered in (('message', '/chatbot/api/message', True), ('stream', '/chatbot/api/stream', False)):
+            results = [measure(client, url, buffered) for _ in range(rounds)]
+            first_byte, first_content, total = (statistics.median(column) * 1000 for column in zip(*results))
+            print(f"{name:<8} ttfb={first_byte:7.1f} ms  first_token={first_content:7.1f} ms  total={total:7.1f} ms")
+
+    fake.stop()
+
+
+if __name__ == "__main__":
+    main()
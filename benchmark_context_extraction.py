@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script to measure chatbot context extraction over a batch of messages
+
+  legacy   - lower() and an `in` test per keyword (old behaviour)
+  compiled - KeywordMatcher, one regex scan per message
+
+Usage: python benchmark_context_extraction.py [message_count] [rounds]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('MAIL_SERVER', 'localhost')
+os.environ.setdefault('MAIL_PORT', '25')
+os.environ.setdefault('MAIL_USE_TLS', 'false')
+
+from app.routes.chatbot import SYMPTOM_KEYWORDS, SPECIALTY_KEYWORDS, SYMPTOM_MATCHER, SPECIALTY_MATCHER
+
+USER_MESSAGES = [
+    'Son zamanlarda çok kaygılıyım ve geceleri uyuyamıyorum',
+    'Eşimle ilişkimizde sürekli tartışıyoruz, çok KIZGINIM',
+    'İşte herkese sinirleniyorum, öfkemi kontrol edemiyorum',
+    'Çocuğum okulda zorlanıyor, aile olarak ne yapacağımızı bilmiyoruz',
+    'I have been feeling anxious and sad for weeks',
+    'Merhaba, randevu almak istiyorum',
+]
+ASSISTANT_MESSAGES = [
+    'Anladım. Belirttiklerinize göre anksiyete alanında çalışan bir psikolog uygun olabilir.',
+    'İlişki sorunları konusunda deneyimli psikologları arayabilirim.',
+    'Öfke kontrolü için Anger Management alanındaki psikologlara bakalım.',
+    'Size yardımcı olmaktan memnuniyet duyarım. Hangi tarih uygun?',
+]
+
+
+def legacy(user_message, assistant_message, context):
+    user_message_lower = user_message.lower()
+    for keyword, symptom in SYMPTOM_KEYWORDS.items():
+        if keyword in user_message_lower and symptom not in context['symptoms']:
+            context['symptoms'].append(symptom)
+    assistant_lower = assistant_message.lower()
+    for keyword, specialty in SPECIALTY_KEYWORDS.items():
+        if keyword in assistant_lower:
+            context['preferred_specialty'] = specialty
+            break
+
+
+def compiled(user_message, assistant_message, context):
+    for symptom in SYMPTOM_MATCHER.find_all(user_message):
+        if symptom not in context['symptoms']:
+            context['symptoms'].append(symptom)
+    specialty = SPECIALTY_MATCHER.first(assistant_message)
+    if specialty:
+        context['preferred_specialty'] = specialty
+
+
+def measure(extract, pairs):
+    """Return the seconds taken to extract context from every message pair"""
+    started = time.perf_counter()
+    for user_message, assistant_message in pairs:
+        extract(user_message, assistant_message, {'symptoms': [], 'preferred_specialty': None})
+    return time.perf_counter() - started
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    rng = random.Random(0)
+    pairs = [(rng.choice(USER_MESSAGES), rng.choice(ASSISTANT_MESSAGES)) for _ in range(message_count)]
+
+    print(f"{message_count} messages, median of {rounds} rounds")
+    for name, extract in (('legacy', legacy), ('compiled', compiled)):
+        median = statistics.median(measure(extract, pairs) for _ in range(rounds))
+        print(f"{name:>8}: {median * 1000:8.2f} ms  ({median / message_count * 1e6:6.1f} us/message)")
+
+
+if __name__ == '__main__':
+    main()
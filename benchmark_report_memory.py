@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Script to measure peak memory of rendering an evaluation report with 200 therapists
+
+Each output mode runs in its own process so the peak RSS values do not affect
+each other:
+  legacy - FPDF's str buffer, then .encode('latin-1') into a BytesIO (old behaviour)
+  bytes  - ReportPDF's bytearray buffer, returned as bytes
+
+Usage: python benchmark_report_memory.py [therapist_count]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from fpdf import FPDF
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+
+
+class BenchmarkTherapist:
+    def __init__(self, index):
+        self.full_name = f"Therapist {index} Yılmaz"
+        self.average_rating = index % 6
+        self.profile_image_url = f"Image{index % 8 + 1}.png"
+
+    def get_specialties(self):
+        return ['Depressive feelings', 'Anxiety/Panic/Worry', 'Sleep/Appetite problems', 'Family relationships']
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run(mode, therapist_count):
+    from app.services import report_service
+    from app.routes.matching import STEP_QUESTIONS, SUGGESTION_TEMPLATES
+
+    if mode == 'legacy':
+        class LegacyReportPDF(report_service.ReportPDF):
+            def __init__(self, *args):
+                super().__init__(*args)
+                self.buffer = ''
+
+            _out = FPDF._out
+
+            def output_bytes(self):
+                return self.output(dest='S').encode('latin-1')
+
+        report_service.ReportPDF = LegacyReportPDF
+
+    renderer = report_service.ReportRenderer(STATIC_FOLDER, STEP_QUESTIONS, SUGGESTION_TEMPLATES, cache_size=0)
+    answers = {'1': 'No', '6': 'Individual Therapy', '7': ['Depressive feelings', 'Anxiety/Panic/Worry']}
+    therapists = [BenchmarkTherapist(i) for i in range(therapist_count)]
+
+    # Warm up fonts and images so both modes start from the same baseline
+    renderer.render('Benchmark User', '01/01/2026', answers, therapists[0], [])
+    baseline = peak_rss_kb()
+
+    started = time.perf_counter()
+    pdf_bytes = renderer.render('Benchmark User', '01/01/2026', answers, therapists[0], therapists[1:])
+    response_body = BytesIO(pdf_bytes)
+    elapsed = time.perf_counter() - started
+
+    print(f"{mode:<8} size={len(response_body.getbuffer()) // 1024} KB  "
+          f"peak_rss={peak_rss_kb()} KB  growth={peak_rss_kb() - baseline} KB  time={elapsed:.2f}s")
+
+
+def main():
+    therapist_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"Rendering an evaluation report with {therapist_count} therapists")
+    print("=" * 60)
+    for mode in ('legacy', 'bytes'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, str(therapist_count)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
+        run(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,69 @@
+"""Psychologist specialties table for indexed specialty lookups
+
+Revision ID: 8c1f2b7d4e90
+Revises: 45a0b701e4ee
+Create Date: 2026-10-17 10:12:31.418207
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f2b7d4e90'
+down_revision = '45a0b701e4ee'
+branch_labels = None
+depends_on = None
+
+
+def _parse_specialties(value):
+    # Same rules as Psychologist.get_specialties: JSON list, else comma-separated text
+    if not value:
+        return []
+    try:
+        names = json.loads(value)
+    except json.JSONDecodeError:
+        names = value.split(',')
+    if isinstance(names, str):
+        names = [names]
+    return [name.strip() for name in names if isinstance(name, str) and name.strip()]
+
+
+def upgrade():
+    specialties_table = op.create_table('psychologist_specialties',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('psychologist_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('specialty_key', sa.String(length=255), nullable=False),
+    sa.ForeignKeyConstraint(['psychologist_id'], ['psychologists.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('psychologist_id', 'specialty_key', name='uq_psychologist_specialties_psychologist_key')
+    )
+    with op.batch_alter_table('psychologist_specialties', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_psychologist_specialties_psychologist_id'), ['psychologist_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_psychologist_specialties_specialty_key'), ['specialty_key'], unique=False)
+
+    # Backfill from the existing JSON / comma-separated specialties text
+    connection = op.get_bind()
+    psychologists = connection.execute(sa.text('SELECT id, specialties FROM psychologists')).fetchall()
+    rows = []
+    for psychologist_id, specialties in psychologists:
+        seen = set()
+        for name in _parse_specialties(specialties):
+            key = name.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append({'psychologist_id': psychologist_id, 'name': name, 'specialty_key': key})
+    if rows:
+        op.bulk_insert(specialties_table, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('psychologist_specialties', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_psychologist_specialties_specialty_key'))
+        batch_op.drop_index(batch_op.f('ix_psychologist_specialties_psychologist_id'))
+
+    op.drop_table('psychologist_specialties')
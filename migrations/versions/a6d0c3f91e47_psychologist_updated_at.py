@@ -0,0 +1,28 @@
+"""Psychologist updated_at for report cache keys
+
+Revision ID: a6d0c3f91e47
+Revises: f2b6d9a4c8e1
+Create Date: 2026-10-18 09:12:41.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d0c3f91e47'
+down_revision = 'f2b6d9a4c8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('psychologists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE psychologists SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade():
+    with op.batch_alter_table('psychologists', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
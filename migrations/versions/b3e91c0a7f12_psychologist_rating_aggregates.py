@@ -0,0 +1,35 @@
+"""Psychologist rating_sum and rating_count aggregates
+
+Revision ID: b3e91c0a7f12
+Revises: 8c1f2b7d4e90
+Create Date: 2026-10-17 11:02:48.530611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e91c0a7f12'
+down_revision = '8c1f2b7d4e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('psychologists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from existing reviews; `flask ratings check` verifies the result
+    op.execute(
+        'UPDATE psychologists SET '
+        'rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.psychologist_id = psychologists.id), '
+        'rating_count = (SELECT COUNT(*) FROM reviews WHERE reviews.psychologist_id = psychologists.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('psychologists', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,28 @@
+"""Appointment updated_at for availability cache validators
+
+Revision ID: c47d2e8a9b35
+Revises: b3e91c0a7f12
+Create Date: 2026-10-17 11:48:05.274093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d2e8a9b35'
+down_revision = 'b3e91c0a7f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE appointments SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
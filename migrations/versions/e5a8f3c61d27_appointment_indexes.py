@@ -0,0 +1,44 @@
+"""Composite indexes on appointments and unique planned slot
+
+Revision ID: e5a8f3c61d27
+Revises: c47d2e8a9b35
+Create Date: 2026-10-17 12:20:41.906318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8f3c61d27'
+down_revision = 'c47d2e8a9b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The unique planned-slot index cannot be created over existing double bookings
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT psychologist_id, appointment_date, appointment_time, COUNT(*) FROM appointments "
+        "WHERE status = 'planned' "
+        "GROUP BY psychologist_id, appointment_date, appointment_time HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add uq_appointments_planned_slot, these slots have more than one planned appointment '
+            '(cancel the extra bookings first): ' + ', '.join(str(tuple(row)) for row in duplicates)
+        )
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_psychologist_slot', ['psychologist_id', 'appointment_date', 'appointment_time', 'status'], unique=False)
+        batch_op.create_index('ix_appointments_user_status_date', ['user_id', 'status', 'appointment_date'], unique=False)
+        batch_op.create_index('uq_appointments_planned_slot', ['psychologist_id', 'appointment_date', 'appointment_time'], unique=True,
+                              sqlite_where=sa.text("status = 'planned'"),
+                              postgresql_where=sa.text("status = 'planned'"))
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('uq_appointments_planned_slot')
+        batch_op.drop_index('ix_appointments_user_status_date')
+        batch_op.drop_index('ix_appointments_psychologist_slot')
@@ -0,0 +1,56 @@
+"""Chat conversations and messages
+
+Revision ID: f2b6d9a4c8e1
+Revises: e5a8f3c61d27
+Create Date: 2026-10-17 15:02:13.514208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d9a4c8e1'
+down_revision = 'e5a8f3c61d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_conversations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=True),
+    sa.Column('summarized_through_id', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('context', sa.Text(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_conversations', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_conversations_user_created', ['user_id', 'created_at'], unique=False)
+
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['chat_conversations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_conversation_id', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_conversation_id')
+
+    op.drop_table('chat_messages')
+    with op.batch_alter_table('chat_conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_conversations_user_created')
+
+    op.drop_table('chat_conversations')
@@ -0,0 +1,192 @@
+"""Local stand-in for the OpenAI chat completions API used by the chatbot tests
+
+Runs a threaded HTTP server on 127.0.0.1 that answers POST /v1/chat/completions
+with a scripted reply, either as a single JSON body or as SSE chunks with an
+optional delay per token, so streaming can be tested offline.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    """Scripted chat completions server
+
+    When `tool_calls` is set ([{'name': ..., 'arguments': {...}}, ...]) and
+    the request offers tools, the first `tool_rounds` completions after the
+    user message ask for those tools; the next one returns `reply`. Setting
+    `fail_status` makes requests fail with that HTTP status (only the next
+    `fail_times` requests when that is set).
+    """
+
+    def __init__(self, reply='Merhaba, size nasıl yardımcı olabilirim?', tool_calls=None, tool_rounds=1, token_delay=0.0):
+        self.reply = reply
+        self.tool_calls = tool_calls
+        self.tool_rounds = tool_rounds
+        self.token_delay = token_delay
+        self.fail_status = None
+        self.fail_times = None
+        self.requests = []
+        self.probes = 0
+        self.connections = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def tokens(self, text):
+        """Split a reply the way the API streams it: one word (with its space) per chunk"""
+        words = text.split(' ')
+        return [word + ' ' for word in words[:-1]] + [words[-1]]
+
+    def _respond(self, body):
+        """Return ('tool_calls', calls) or ('content', text) for a request body"""
+        self.requests.append(body)
+        messages = body['messages']
+        last_user = max(i for i, message in enumerate(messages) if message['role'] == 'user')
+        rounds = sum(1 for message in messages[last_user:] if message.get('tool_calls'))
+        if self.tool_calls and body.get('tools') and body.get('tool_choice') != 'none' and rounds < self.tool_rounds:
+            return 'tool_calls', [
+                {
+                    'id': f'call_{rounds}_{index}',
+                    'type': 'function',
+                    'function': {'name': call['name'], 'arguments': json.dumps(call.get('arguments', {}))}
+                }
+                for index, call in enumerate(self.tool_calls)
+            ]
+        return 'content', self.reply
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def do_GET(self):
+                if '/models/' not in self.path:
+                    self.send_error(404)
+                    return
+                fake.probes += 1
+                if self._failed():
+                    return
+                model = self.path.rsplit('/', 1)[-1]
+                self._json({'id': model, 'object': 'model', 'created': 0, 'owned_by': 'openai'})
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if fake.fail_status and fake.fail_times != 0:
+                    fake.requests.append(body)
+                    self._failed()
+                    return
+                kind, value = fake._respond(body)
+                if body.get('stream'):
+                    self._stream(body, kind, value)
+                else:
+                    self._complete(body, kind, value)
+
+            def _envelope(self, body, obj, choice):
+                return {
+                    'id': 'chatcmpl-fake',
+                    'object': obj,
+                    'created': int(time.time()),
+                    'model': body.get('model', 'gpt-4'),
+                    'choices': [dict(index=0, **choice)]
+                }
+
+            def _complete(self, body, kind, value):
+                message = {'role': 'assistant', 'content': None}
+                if kind == 'tool_calls':
+                    message['tool_calls'] = value
+                else:
+                    message['content'] = value
+                    # The whole reply is generated before anything is sent
+                    time.sleep(fake.token_delay * len(fake.tokens(value)))
+                payload = self._envelope(body, 'chat.completion', {
+                    'message': message,
+                    'finish_reason': 'tool_calls' if kind == 'tool_calls' else 'stop'
+                })
+                payload['usage'] = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                self._json(payload)
+
+            def _json(self, payload, status=200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _failed(self):
+                """Send the configured error response; returns False when the server is healthy"""
+                if not fake.fail_status or fake.fail_times == 0:
+                    return False
+                if fake.fail_times is not None:
+                    fake.fail_times -= 1
+                self._json({'error': {'message': 'Service unavailable', 'type': 'server_error'}}, fake.fail_status)
+                return True
+
+            def _stream(self, body, kind, value):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+
+                if kind == 'tool_calls':
+                    # Per call: id and name first, then the arguments in two pieces like the real API
+                    deltas = [{'role': 'assistant', 'content': None}]
+                    for index, call in enumerate(value):
+                        arguments = call['function']['arguments']
+                        half = len(arguments) // 2
+                        deltas.append({'tool_calls': [{
+                            'index': index, 'id': call['id'], 'type': 'function',
+                            'function': {'name': call['function']['name'], 'arguments': ''}
+                        }]})
+                        deltas.append({'tool_calls': [{'index': index, 'function': {'arguments': arguments[:half]}}]})
+                        deltas.append({'tool_calls': [{'index': index, 'function': {'arguments': arguments[half:]}}]})
+                    finish_reason = 'tool_calls'
+                else:
+                    deltas = [{'role': 'assistant', 'content': ''}]
+                    deltas.extend({'content': token} for token in fake.tokens(value))
+                    finish_reason = 'stop'
+
+                for delta in deltas:
+                    if fake.token_delay and 'content' in delta and delta['content']:
+                        time.sleep(fake.token_delay)
+                    self._event(self._envelope(body, 'chat.completion.chunk', {'delta': delta, 'finish_reason': None}))
+                self._event(self._envelope(body, 'chat.completion.chunk', {'delta': {}, 'finish_reason': finish_reason}))
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+        return Handler
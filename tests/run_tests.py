@@ -11,12 +11,23 @@ from tests.test_psychologist_model import PsychologistModelTestCase
 from tests.test_appointment_model import AppointmentModelTestCase
 from tests.test_user_service import UserServiceTestCase
 from tests.test_psychologist_service import PsychologistServiceTestCase
-from tests.test_appointment_service import AppointmentServiceTestCase
+from tests.test_appointment_service import AppointmentServiceTestCase, ConcurrentBookingTestCase
+from tests.test_report_service import ReportServiceTestCase
+from tests.test_matching_flow import MatchingFlowTestCase
+from tests.test_sessions import SessionStoreTestCase
+from tests.test_chat_service import ChatServiceTestCase
+from tests.test_prompt_builder import PromptBuilderTestCase
+from tests.test_keyword_matcher import KeywordMatcherTestCase
+from tests.test_llm_health import ProviderHealthTestCase
+from tests.test_llm_client import LLMClientTestCase
+from tests.test_tool_cache import ToolCacheTestCase, ToolCacheInvalidationTestCase
 from tests.test_auth_routes import AuthRoutesTestCase
 from tests.test_main_routes import MainRoutesTestCase
 from tests.test_psychologist_routes import PsychologistRoutesTestCase
 from tests.test_appointment_routes import AppointmentRoutesTestCase
 from tests.test_user_routes import UserRoutesTestCase
+from tests.test_matching_routes import MatchingRoutesTestCase
+from tests.test_chatbot_routes import ChatbotRoutesTestCase, ParallelToolCallsTestCase
 
 def run_tests():
     """Run all tests"""
@@ -32,6 +43,17 @@ def run_tests():
     test_suite.addTest(unittest.makeSuite(UserServiceTestCase))
     test_suite.addTest(unittest.makeSuite(PsychologistServiceTestCase))
     test_suite.addTest(unittest.makeSuite(AppointmentServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(ConcurrentBookingTestCase))
+    test_suite.addTest(unittest.makeSuite(ReportServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(MatchingFlowTestCase))
+    test_suite.addTest(unittest.makeSuite(SessionStoreTestCase))
+    test_suite.addTest(unittest.makeSuite(ChatServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(PromptBuilderTestCase))
+    test_suite.addTest(unittest.makeSuite(KeywordMatcherTestCase))
+    test_suite.addTest(unittest.makeSuite(ProviderHealthTestCase))
+    test_suite.addTest(unittest.makeSuite(LLMClientTestCase))
+    test_suite.addTest(unittest.makeSuite(ToolCacheTestCase))
+    test_suite.addTest(unittest.makeSuite(ToolCacheInvalidationTestCase))
     
     # Add route tests
     test_suite.addTest(unittest.makeSuite(AuthRoutesTestCase))
@@ -39,6 +61,9 @@ def run_tests():
     test_suite.addTest(unittest.makeSuite(PsychologistRoutesTestCase))
     test_suite.addTest(unittest.makeSuite(AppointmentRoutesTestCase))
     test_suite.addTest(unittest.makeSuite(UserRoutesTestCase))
+    test_suite.addTest(unittest.makeSuite(MatchingRoutesTestCase))
+    test_suite.addTest(unittest.makeSuite(ChatbotRoutesTestCase))
+    test_suite.addTest(unittest.makeSuite(ParallelToolCallsTestCase))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -4,7 +4,10 @@ from app import create_app, db
 from app.models.user import User
 from app.models.psychologist import Psychologist
 from app.models.appointment import Appointment
+from app.services.appointment_service import AppointmentService
 from app.config import TestingConfig
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
 
 class AppointmentModelTestCase(unittest.TestCase):
     def setUp(self):
@@ -130,6 +133,54 @@ class AppointmentModelTestCase(unittest.TestCase):
             appointment_time=appointment_time
         )
         self.assertFalse(conflict)
+    
+    def test_planned_slot_is_unique(self):
+        """Test a slot can hold only one planned appointment"""
+        slot = dict(psychologist_id=self.psychologist.id, appointment_date=date(2023, 1, 2), appointment_time=time(10, 0))
+        db.session.add(Appointment(user_id=self.user.id, status='cancelled', **slot))
+        db.session.add(Appointment(user_id=self.user.id, status='planned', **slot))
+        db.session.commit()
+        
+        db.session.add(Appointment(user_id=self.user.id, status='planned', **slot))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+    
+    def _query_plan(self, func):
+        """Run func and return the EXPLAIN QUERY PLAN details of the statements it executed"""
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        
+        connection = db.session.connection()
+        return [
+            ' '.join(row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+            for statement, parameters in statements
+        ]
+    
+    def test_queries_use_indexes(self):
+        """Test the conflict check and the user history queries are index lookups"""
+        psychologist_id = self.psychologist.id
+        user_id = self.user.id
+        
+        plans = self._query_plan(lambda: Appointment.check_conflict(psychologist_id, date(2023, 1, 2), time(10, 0)))
+        self.assertEqual(len(plans), 1)
+        self.assertRegex(plans[0], 'SEARCH appointments USING (COVERING )?INDEX '
+                                   '(uq_appointments_planned_slot|ix_appointments_psychologist_slot)')
+        
+        plans = self._query_plan(lambda: AppointmentService.get_upcoming_appointments(user_id))
+        self.assertEqual(len(plans), 1)
+        self.assertIn('ix_appointments_user_status_date', plans[0])
+        
+        plans = self._query_plan(lambda: AppointmentService.get_past_appointments(user_id))
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertIn('ix_appointments_user_status_date', plan)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
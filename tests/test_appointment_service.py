@@ -1,4 +1,8 @@
+import os
+import tempfile
+import threading
 import unittest
+from unittest import mock
 from datetime import datetime, date, time
 from app import create_app, db
 from app.models.user import User
@@ -6,6 +10,7 @@ from app.models.psychologist import Psychologist
 from app.models.appointment import Appointment
 from app.services.appointment_service import AppointmentService
 from app.config import TestingConfig
+from sqlalchemy.exc import IntegrityError
 
 class AppointmentServiceTestCase(unittest.TestCase):
     def setUp(self):
@@ -110,6 +115,18 @@ class AppointmentServiceTestCase(unittest.TestCase):
         self.assertIsNone(appointment)
         self.assertEqual(message, "This time slot is already booked")
     
+    def test_create_appointment_other_integrity_error(self):
+        """Test integrity errors other than the slot index are not reported as a booked slot"""
+        error = IntegrityError('INSERT INTO appointments ...', {}, Exception('NOT NULL constraint failed: appointments.status'))
+        with mock.patch.object(db.session, 'commit', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                AppointmentService.create_appointment(
+                    user_id=self.user.id,
+                    psychologist_id=self.psychologist.id,
+                    appointment_date=self.test_date,
+                    appointment_time=self.test_time
+                )
+    
     def test_get_appointment_by_id(self):
         """Test getting an appointment by ID"""
         # Create an appointment
@@ -241,5 +258,83 @@ class AppointmentServiceTestCase(unittest.TestCase):
         self.assertEqual(len(appointments), 1)
         self.assertEqual(appointments[0].status, 'completed')
 
+
+class ConcurrentBookingTestCase(unittest.TestCase):
+    """Parallel bookings of one slot against a file-backed SQLite database"""
+    THREADS = 8
+    
+    def setUp(self):
+        """Set up test environment"""
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        
+        class FileTestingConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+        
+        self.app = create_app(FileTestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        
+        self.users = []
+        for i in range(self.THREADS):
+            user = User(email=f'user{i}@example.com')
+            user.set_password('password123')
+            self.users.append(user)
+        db.session.add_all(self.users)
+        
+        self.psychologist = Psychologist(first_name='John', last_name='Doe')
+        self.psychologist.set_working_hours({'Monday': '09:00-17:00'})
+        db.session.add(self.psychologist)
+        db.session.commit()
+        
+        self.test_date = date(2023, 1, 2)  # A Monday
+        self.test_time = time(10, 0)  # 10:00 AM
+    
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+    
+    def test_parallel_bookings_of_one_slot(self):
+        """Test only one of several simultaneous bookings for a slot succeeds"""
+        user_ids = [user.id for user in self.users]
+        psychologist_id = self.psychologist.id
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        
+        def book(user_id):
+            with self.app.app_context():
+                barrier.wait()
+                try:
+                    appointment, message = AppointmentService.create_appointment(
+                        user_id=user_id,
+                        psychologist_id=psychologist_id,
+                        appointment_date=self.test_date,
+                        appointment_time=self.test_time
+                    )
+                    results.append((appointment is not None, message))
+                finally:
+                    db.session.remove()
+        
+        threads = [threading.Thread(target=book, args=(user_id,)) for user_id in user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(sum(1 for created, _ in results if created), 1)
+        for created, message in results:
+            if not created:
+                self.assertEqual(message, "This time slot is already booked")
+        
+        self.assertEqual(Appointment.query.filter_by(status='planned').count(), 1)
+        # Only the successful booking used up a free trial
+        self.assertEqual(User.query.filter_by(has_used_free_trial=True).count(), 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.models.chat import ChatConversation
+from app.services.chat_service import ChatService, SUMMARY_MAX_CHARS
+from app.config import TestingConfig
+
+class ChatServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(email='user@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_turns(self, conversation, count, start=0):
+        for i in range(start, start + count):
+            ChatService.add_message(conversation, 'user', f'question {i}')
+            ChatService.add_message(conversation, 'assistant', f'answer {i}')
+        db.session.commit()
+
+    def test_active_conversation(self):
+        """Test conversations are reused until closed"""
+        conversation = ChatService.get_active_conversation(self.user.id)
+        db.session.commit()
+        self.assertEqual(ChatService.get_active_conversation(self.user.id).id, conversation.id)
+
+        ChatService.close_conversation(self.user.id)
+        self.assertIsNone(ChatService.get_active_conversation(self.user.id, create=False))
+        self.assertNotEqual(ChatService.get_active_conversation(self.user.id).id, conversation.id)
+
+    def test_load_window(self):
+        """Test only the recent window is loaded and older turns are summarized"""
+        conversation = ChatService.get_active_conversation(self.user.id)
+        self.add_turns(conversation, 3)
+
+        summary, recent = ChatService.load_window(conversation, window=4)
+        self.assertEqual([turn.content for turn in recent], ['question 1', 'answer 1', 'question 2', 'answer 2'])
+        self.assertEqual(summary, '- question 0')
+
+        # Later calls only fold the turns that slid out since the last call
+        self.add_turns(conversation, 2, start=3)
+        summary, recent = ChatService.load_window(conversation, window=4)
+        self.assertEqual(recent[0].content, 'question 3')
+        self.assertEqual(summary.split('\n'), ['- question 0', '- question 1', '- question 2'])
+        self.assertEqual(conversation.summarized_through_id, recent[0].id - 1)
+
+    def test_summary_is_bounded(self):
+        """Test the rolling summary does not grow without limit"""
+        conversation = ChatService.get_active_conversation(self.user.id)
+        for i in range(60):
+            ChatService.add_message(conversation, 'user', f'{i} ' + 'uzun bir mesaj ' * 30)
+            ChatService.add_message(conversation, 'assistant', 'ok')
+            ChatService.load_window(conversation, window=2)
+        db.session.commit()
+
+        self.assertLessEqual(len(conversation.summary), SUMMARY_MAX_CHARS)
+        self.assertTrue(conversation.summary.split('\n')[-1].startswith('- 58 '))
+
+    def test_context(self):
+        """Test the user context is stored on the conversation"""
+        conversation = ChatService.get_active_conversation(self.user.id)
+        context = conversation.get_context()
+        context['symptoms'].append('anxiety')
+        conversation.set_context(context)
+        db.session.commit()
+
+        stored = ChatConversation.query.get(conversation.id)
+        self.assertEqual(stored.get_context()['symptoms'], ['anxiety'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, time as dt_time
+from flask import current_app
+from app import create_app, db
+from app.models.user import User
+from app.models.chat import ChatMessage
+from app.services.chat_service import ChatService
+from app.services.psychologist_service import PsychologistService
+from app.services.appointment_service import AppointmentService
+from app.services.llm_client import init_llm_client
+from app.services.llm_health import ProviderHealth
+from app.services.tool_executor import ToolExecutor
+from app.routes.chatbot import psychology_consultant
+from app.config import TestingConfig
+from tests.fake_openai import FakeOpenAIServer
+
+class InlineToolExecutor:
+    """Runs tool calls one after another in the request's thread
+
+    The in-memory test database is a single connection shared by all
+    threads, so tool calls must not run on a thread pool here.
+    """
+    def __init__(self):
+        self.batches = []
+
+    def map(self, app, func, items):
+        items = list(items)
+        self.batches.append(len(items))
+        return [func(item) for item in items]
+
+    def shutdown(self, wait=True):
+        pass
+
+REPLY = 'Anladım, kaygı ile ilgili yaşadıklarınız çok yorucu olmalı. Size yardımcı olabilecek bir psikolog önerebilirim.'
+
+class ChatbotRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = User(email='user@example.com', full_name='Test User')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+        self.psychologist = PsychologistService.create_psychologist(
+            first_name='John',
+            last_name='Doe',
+            specialties=['Anxiety Disorders'],
+            bio='Experienced therapist.',
+            working_hours={'Monday': '09:00-17:00'}
+        )
+
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(self.user.id)
+            sess['_fresh'] = True
+
+        # Point the shared OpenAI client at the local stub
+        self.fake = FakeOpenAIServer(reply=REPLY).start()
+        self.app.config.update(OPENAI_API_KEY='test-key', OPENAI_BASE_URL=self.fake.base_url, LLM_MAX_RETRIES=0)
+        self.llm = init_llm_client(self.app)
+        # Probes are run by the tests, not in the background
+        self.llm.health.scheduler = None
+        self.tool_executor = self.app.extensions['chat_tools'] = InlineToolExecutor()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        executor = self.app.extensions.get('chat_tools')
+        if executor is not None:
+            executor.shutdown()
+        self.llm.close()
+        self.fake.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def read_events(self, response):
+        """Parse an SSE body into (event, data) pairs, recording when each chunk arrived"""
+        events, arrivals, buffer = [], [], ''
+        for chunk in response.response:
+            arrivals.append(time.perf_counter())
+            buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+            while '\n\n' in buffer:
+                block, buffer = buffer.split('\n\n', 1)
+                fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+                if 'event' in fields:
+                    events.append((fields['event'], json.loads(fields['data']), arrivals[-1]))
+        return events, arrivals
+
+    def test_stream_message(self):
+        """Test the reply is streamed as token events and then persisted"""
+        response = self.client.post('/chatbot/api/stream', json={'message': 'Çok kaygılıyım'}, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        events, _ = self.read_events(response)
+        tokens = [data['text'] for event, data, _ in events if event == 'token']
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), REPLY)
+        self.assertEqual(events[-1][0], 'done')
+        self.assertEqual(events[-1][1]['message'], REPLY)
+        self.assertTrue(self.fake.requests[0]['stream'])
+
+        conversation = ChatService.get_active_conversation(self.user.id, create=False)
+        turns = [(turn.role, turn.content) for turn in conversation.messages.order_by(ChatMessage.id)]
+        self.assertEqual(turns, [('user', 'Çok kaygılıyım'), ('assistant', REPLY)])
+        self.assertIn('anxiety', conversation.get_context()['symptoms'])
+
+    def test_stream_runs_tools_inline(self):
+        """Test a streamed tool call is run before the final answer is streamed"""
+        self.fake.tool_calls = [{'name': 'search_psychologists', 'arguments': {'specialty': 'Anxiety'}}]
+
+        response = self.client.post('/chatbot/api/stream', json={'message': 'Psikolog önerir misin?'}, buffered=False)
+        events, _ = self.read_events(response)
+
+        names = [event for event, _, _ in events]
+        self.assertEqual(names[0], 'tool')
+        self.assertEqual(events[0][1]['name'], 'search_psychologists')
+        self.assertEqual(names[-1], 'done')
+
+        # The second completion got the assembled call and its result
+        tool_message = self.fake.requests[1]['messages'][-1]
+        self.assertEqual(tool_message['role'], 'tool')
+        self.assertEqual(tool_message['tool_call_id'], 'call_0_0')
+        self.assertIn('John Doe', tool_message['content'])
+        call = self.fake.requests[1]['messages'][-2]['tool_calls'][0]
+        self.assertEqual(json.loads(call['function']['arguments']), {'specialty': 'Anxiety'})
+
+    def test_parallel_tool_calls(self):
+        """Test several tool calls in one turn are all answered before the next completion"""
+        psychologists = [self.psychologist] + [
+            PsychologistService.create_psychologist(
+                first_name=name, last_name='Test', specialties=['Depression'], bio='', working_hours={'Monday': '09:00-11:00'}
+            )
+            for name in ('Ayşe', 'Mehmet')
+        ]
+        self.fake.tool_calls = [
+            {'name': 'check_availability', 'arguments': {'psychologist_id': p.id, 'date_str': '2030-01-07'}}
+            for p in psychologists
+        ]
+
+        response = self.client.post('/chatbot/api/message', json={'message': 'Pazartesi kim müsait?'})
+        self.assertEqual(response.get_json()['message'], REPLY)
+        self.assertEqual(len(self.fake.requests), 2)
+
+        messages = self.fake.requests[1]['messages']
+        self.assertEqual(len(messages[-4]['tool_calls']), 3)
+        results = messages[-3:]
+        self.assertEqual([m['tool_call_id'] for m in results], ['call_0_0', 'call_0_1', 'call_0_2'])
+        for psychologist, result in zip(psychologists, results):
+            self.assertEqual(json.loads(result['content'])['psychologist_name'], psychologist.full_name)
+        # All three read-only calls were handed to the executor together
+        self.assertEqual(self.tool_executor.batches, [3])
+
+    def test_double_booking_keeps_user_turn(self):
+        """Test a booking that hits a taken slot does not roll back the chat turn"""
+        other = User(email='other@example.com')
+        other.set_password('password123')
+        db.session.add(other)
+        db.session.commit()
+        appointment, _ = AppointmentService.create_appointment(other.id, self.psychologist.id, date(2030, 1, 7), dt_time(10, 0))
+        self.assertIsNotNone(appointment)
+
+        self.fake.tool_calls = [{'name': 'create_appointment', 'arguments': {
+            'psychologist_id': self.psychologist.id, 'date_str': '2030-01-07', 'time_str': '10:00'
+        }}]
+        response = self.client.post('/chatbot/api/message', json={'message': 'Pazartesi 10:00 olur mu?'})
+        self.assertEqual(response.get_json()['message'], REPLY)
+
+        tool_message = self.fake.requests[1]['messages'][-1]
+        self.assertIn('already booked', tool_message['content'])
+        conversation = ChatService.get_active_conversation(self.user.id, create=False)
+        turns = [(turn.role, turn.content) for turn in conversation.messages.order_by(ChatMessage.id)]
+        self.assertEqual(turns, [('user', 'Pazartesi 10:00 olur mu?'), ('assistant', REPLY)])
+
+    def test_tool_round_cap(self):
+        """Test the model has to answer once the tool round cap is reached"""
+        self.app.config['CHAT_MAX_TOOL_ROUNDS'] = 2
+        self.fake.tool_rounds = 10
+        self.fake.tool_calls = [{'name': 'get_psychologist_details', 'arguments': {'psychologist_id': self.psychologist.id}}]
+
+        response = self.client.post('/chatbot/api/message', json={'message': 'Merhaba'})
+        self.assertEqual(response.get_json()['message'], REPLY)
+        self.assertEqual([body['tool_choice'] for body in self.fake.requests], ['auto', 'auto', 'none'])
+
+    def test_tool_executor(self):
+        """Test tool calls run concurrently, each with an app context"""
+        executor = ToolExecutor(max_workers=3)
+
+        def slow(item):
+            time.sleep(0.2)
+            return item, current_app.name
+
+        started = time.perf_counter()
+        results = executor.map(self.app, slow, [1, 2, 3])
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(results, [(1, self.app.name), (2, self.app.name), (3, self.app.name)])
+        executor.shutdown()
+
+    def test_stream_time_to_first_byte(self):
+        """Test the first token arrives long before the whole reply is generated"""
+        self.fake.token_delay = 0.03
+
+        started = time.perf_counter()
+        response = self.client.post('/chatbot/api/message', json={'message': 'Merhaba'})
+        blocking_total = time.perf_counter() - started
+        self.assertEqual(response.get_json()['message'], REPLY)
+
+        started = time.perf_counter()
+        response = self.client.post('/chatbot/api/stream', json={'message': 'Merhaba'}, buffered=False)
+        events, arrivals = self.read_events(response)
+        first_byte = arrivals[0] - started
+        first_token = next(arrived for event, _, arrived in events if event == 'token') - started
+        stream_total = arrivals[-1] - started
+
+        self.assertLess(first_byte, first_token)
+        self.assertLess(first_token, stream_total / 2)
+        self.assertLess(first_token, blocking_total / 2)
+
+    def test_single_upstream_call_per_message(self):
+        """Test a normal turn makes exactly one completion request and no probe"""
+        response = self.client.post('/chatbot/api/message', json={'message': 'Merhaba'})
+        self.assertEqual(response.get_json()['message'], REPLY)
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(self.fake.requests[0]['model'], 'gpt-4')
+        self.assertEqual(self.fake.probes, 0)
+
+    def test_provider_down_fails_fast(self):
+        """Test the circuit opens after provider errors and later turns skip the upstream call"""
+        self.fake.fail_status = 503
+        health = self.llm.health
+        for _ in range(health.failure_threshold):
+            response = self.client.post('/chatbot/api/message', json={'message': 'Merhaba'})
+            self.assertEqual(response.get_json()['type'], 'error')
+        self.assertEqual(health.state, ProviderHealth.OPEN)
+        sent = len(self.fake.requests)
+
+        response = self.client.post('/chatbot/api/message', json={'message': 'Merhaba'})
+        self.assertIn('saniye sonra', response.get_json()['message'])
+        response = self.client.post('/chatbot/api/stream', json={'message': 'Merhaba'}, buffered=False)
+        events, _ = self.read_events(response)
+        self.assertEqual([event for event, _, _ in events], ['error'])
+        self.assertEqual(len(self.fake.requests), sent)
+
+        # Failed turns are not stored
+        self.assertEqual(ChatMessage.query.count(), 0)
+
+    def test_probe_recovers_provider(self):
+        """Test the probe closes the circuit once the provider is back"""
+        health = self.llm.health
+        health.backoff = 0
+        self.fake.fail_status = 503
+        self.assertFalse(health.probe())
+        self.assertEqual(health.state, ProviderHealth.OPEN)
+
+        self.fake.fail_status = None
+        self.assertTrue(health.probe())
+        self.assertEqual(health.state, ProviderHealth.CLOSED)
+        self.assertEqual(self.fake.probes, 2)
+
+    def test_stream_requires_message(self):
+        """Test an empty message is rejected before the stream starts"""
+        response = self.client.post('/chatbot/api/stream', json={'message': '  '})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_unavailable(self):
+        """Test an error event is sent when OpenAI is not configured"""
+        self.llm.api_key = None
+        response = self.client.post('/chatbot/api/stream', json={'message': 'Merhaba'}, buffered=False)
+        events, _ = self.read_events(response)
+        self.assertEqual([event for event, _, _ in events], ['error'])
+        self.assertEqual(self.fake.requests, [])
+
+class ParallelToolCallsTestCase(unittest.TestCase):
+    """Tool calls on the real thread pool, against a file database"""
+
+    def setUp(self):
+        """Set up test environment"""
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+        class FileTestingConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+
+        self.app = create_app(FileTestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(email='user@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.psychologists = [
+            PsychologistService.create_psychologist(
+                first_name=name, last_name='Test', specialties=['Depression'], bio='', working_hours={'Monday': '09:00-11:00'}
+            )
+            for name in ('John', 'Ayşe', 'Mehmet')
+        ]
+
+    def tearDown(self):
+        """Clean up test environment"""
+        self.app.extensions['chat_tools'].shutdown()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def test_tools_run_in_worker_sessions(self):
+        """Test read-only tools run on the pool, each with its own session"""
+        conversation = ChatService.get_active_conversation(self.user.id)
+        ChatService.add_message(conversation, 'user', 'Pazartesi kim müsait?')
+
+        messages = psychology_consultant._run_tool_calls([
+            {'id': f'call_{p.id}', 'name': 'check_availability',
+             'arguments': json.dumps({'psychologist_id': p.id, 'date_str': '2030-01-07'})}
+            for p in self.psychologists
+        ], self.user.id)
+
+        self.assertEqual(
+            [json.loads(m['content'])['psychologist_name'] for m in messages[1:]],
+            [p.full_name for p in self.psychologists]
+        )
+        # The workers' sessions did not touch the request's chat state
+        db.session.rollback()
+        self.assertEqual(ChatMessage.query.count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from app.services.keyword_matcher import KeywordMatcher, turkish_fold, match_fold, keyword_spellings
+from app.routes.chatbot import SYMPTOM_MATCHER, SPECIALTY_MATCHER
+
+class KeywordMatcherTestCase(unittest.TestCase):
+    def test_turkish_fold(self):
+        """Test Turkish case folding keeps dotted and dotless i apart"""
+        self.assertEqual(turkish_fold('İLİŞKİ'), 'ilişki')
+        self.assertEqual(turkish_fold('KIZGIN'), 'kızgın')
+        self.assertNotEqual(turkish_fold('SINIR'), turkish_fold('sinir'))
+
+    def test_match_fold(self):
+        """Test an ASCII capital I matches both i and ı"""
+        self.assertIn(match_fold('ANXIETY'), keyword_spellings('anxiety'))
+        self.assertIn(match_fold('KIZGIN'), keyword_spellings('kızgın'))
+        self.assertIn(match_fold('İLİŞKİ'), keyword_spellings('ilişki'))
+        self.assertNotIn(match_fold('sınır'), keyword_spellings('sinir'))
+        self.assertEqual(len(keyword_spellings('sinir')), 4)
+
+    def test_all_caps(self):
+        """Test all-caps English and ASCII-typed Turkish messages still match"""
+        self.assertEqual(SPECIALTY_MATCHER.first('I have ANXIETY and DEPRESSION'), 'Anxiety Disorders')
+        self.assertEqual(SPECIALTY_MATCHER.first('BIPOLAR disorder'), 'Bipolar Disorder')
+        self.assertEqual(SPECIALTY_MATCHER.first('FAMILY therapy'), 'Family Therapy')
+        self.assertEqual(SPECIALTY_MATCHER.first('ILISKI sorunlari'), 'Relationship Issues')
+        self.assertEqual(SYMPTOM_MATCHER.find_all('COK KIZGINIM VE KAYGILIYIM'), ['anger', 'anxiety'])
+        self.assertEqual(SYMPTOM_MATCHER.find_all('ILISKI VE COCUK SORUNLARI'), ['relationship', 'child'])
+
+    def test_dotless_i_is_not_dotted_i(self):
+        """Test 'sınır' (boundary) is not taken for 'sinir' (anger)"""
+        self.assertEqual(SYMPTOM_MATCHER.find_all('Sınırlarımı korumakta zorlanıyorum'), [])
+        self.assertIsNone(SPECIALTY_MATCHER.first('Sınırlarımı korumakta zorlanıyorum'))
+
+    def test_ascii_spelling(self):
+        """Test spellings without Turkish characters are listed keywords"""
+        self.assertEqual(SYMPTOM_MATCHER.find_all('cok kizginim ve kaygiliyim'), ['anger', 'anxiety'])
+
+    def test_find_all(self):
+        """Test every keyword is found once, in order of appearance"""
+        found = SYMPTOM_MATCHER.find_all('Çok KIZGINIM, kaygılarım arttı ve yine kızgınım')
+        self.assertEqual(found, ['anger', 'anxiety'])
+
+    def test_word_start(self):
+        """Test keywords match at the start of a word only"""
+        matcher = KeywordMatcher({'anger': 'Anger Management'})
+        self.assertIsNone(matcher.first('You are in danger'))
+        self.assertEqual(matcher.first('Anger issues'), 'Anger Management')
+
+    def test_longest_keyword_wins(self):
+        """Test the longest keyword at a position is matched"""
+        matcher = KeywordMatcher({'sinir': 'short', 'sinirli': 'long'})
+        self.assertEqual(matcher.find_all('çok sinirliyim'), ['long'])
+
+    def test_first(self):
+        """Test the keyword listed first in the table decides the specialty, wherever it is in the text"""
+        self.assertEqual(SPECIALTY_MATCHER.first('Depresyon ve kaygı için...'), 'Anxiety Disorders')
+        self.assertEqual(SPECIALTY_MATCHER.first('Aile içi ilişki sorunları'), 'Relationship Issues')
+        self.assertIsNone(SPECIALTY_MATCHER.first('Merhaba'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import openai
+from app.services.llm_client import LLMClient, LLMBusyError
+from app.services.llm_health import ProviderHealth
+from tests.fake_openai import FakeOpenAIServer
+
+MESSAGES = [{'role': 'user', 'content': 'Merhaba'}]
+
+class LLMClientTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.fake = FakeOpenAIServer(reply='Merhaba, nasılsınız?').start()
+        self.sleeps = []
+        self.client = self.make_client()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        self.client.close()
+        self.fake.stop()
+
+    def make_client(self, **kwargs):
+        options = dict(api_key='test-key', base_url=self.fake.base_url, retry_backoff=0.5,
+                       max_retry_backoff=4, sleep=self.sleeps.append)
+        options.update(kwargs)
+        return LLMClient(**options)
+
+    def test_available(self):
+        """Test a missing or placeholder key disables the client"""
+        self.assertTrue(self.client.available)
+        for key in (None, '', 'your-openai-api-key-here'):
+            client = LLMClient(api_key=key)
+            self.assertFalse(client.available)
+            client.close()
+
+    def test_health_is_used(self):
+        """Test a ProviderHealth passed in is kept and probes through the client"""
+        health = ProviderHealth(None, failure_threshold=5)
+        client = self.make_client(health=health)
+        self.assertIs(client.health, health)
+        self.assertEqual(health.probe_func, client.probe)
+        client.close()
+
+    def test_connections_are_reused(self):
+        """Test consecutive calls share one keep-alive connection"""
+        for _ in range(3):
+            response = self.client.chat(model='gpt-4', messages=MESSAGES)
+            self.assertEqual(response.choices[0].message.content, 'Merhaba, nasılsınız?')
+        self.assertEqual(len(self.fake.requests), 3)
+        self.assertEqual(self.fake.connections, 1)
+
+    def test_retries_server_errors_with_jitter(self):
+        """Test 5xx responses are retried after jittered, growing delays"""
+        self.fake.fail_status = 503
+        self.fake.fail_times = 2
+
+        response = self.client.chat(model='gpt-4', messages=MESSAGES)
+        self.assertEqual(response.choices[0].message.content, 'Merhaba, nasılsınız?')
+        self.assertEqual(len(self.fake.requests), 3)
+        self.assertEqual(self.client.stats['retries'], 2)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0 <= self.sleeps[0] <= 0.5)
+        self.assertTrue(0 <= self.sleeps[1] <= 1.0)
+
+    def test_gives_up_after_max_retries(self):
+        """Test the error is raised once the retries are used up"""
+        self.fake.fail_status = 429
+        with self.assertRaises(openai.RateLimitError):
+            self.client.chat(model='gpt-4', messages=MESSAGES)
+        self.assertEqual(len(self.fake.requests), 1 + self.client.max_retries)
+
+    def test_bad_request_not_retried(self):
+        """Test client errors fail at once"""
+        self.fake.fail_status = 400
+        with self.assertRaises(openai.BadRequestError):
+            self.client.chat(model='gpt-4', messages=MESSAGES)
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_timeout(self):
+        """Test a slow reply hits the per-call timeout and is not retried"""
+        self.fake.token_delay = 0.2
+        with self.assertRaises(openai.APITimeoutError):
+            self.client.chat(model='gpt-4', messages=MESSAGES, timeout=0.1)
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_concurrency_is_bounded(self):
+        """Test an open stream holds its slot and extra callers fail instead of queueing forever"""
+        client = self.make_client(max_concurrency=1, queue_timeout=0.05)
+        stream = client.chat(model='gpt-4', messages=MESSAGES, stream=True)
+        with self.assertRaises(LLMBusyError):
+            client.chat(model='gpt-4', messages=MESSAGES)
+        self.assertEqual(client.stats['busy'], 1)
+
+        text = ''.join(chunk.choices[0].delta.content or '' for chunk in stream if chunk.choices)
+        self.assertEqual(text, 'Merhaba, nasılsınız?')
+        self.assertEqual(client.chat(model='gpt-4', messages=MESSAGES).choices[0].message.content, 'Merhaba, nasılsınız?')
+        client.close()
+
+    def test_slot_released_on_error(self):
+        """Test a failed call gives its slot back"""
+        client = self.make_client(max_concurrency=1, queue_timeout=0.05, max_retries=0)
+        self.fake.fail_status = 400
+        for _ in range(3):
+            with self.assertRaises(openai.BadRequestError):
+                client.chat(model='gpt-4', messages=MESSAGES)
+        client.close()
+
+if __name__ == '__main__':
+    unittest.main()
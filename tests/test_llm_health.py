@@ -0,0 +1,117 @@
+import unittest
+from app.services.llm_health import ProviderHealth, CircuitOpenError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class ProviderDown(Exception):
+    pass
+
+class BadRequest(Exception):
+    pass
+
+class ProviderHealthTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.clock = FakeClock()
+        self.probe_fails = False
+        self.health = ProviderHealth(
+            self.probe,
+            failure_threshold=2,
+            backoff=5,
+            max_backoff=20,
+            is_failure=lambda error: isinstance(error, ProviderDown),
+            clock=self.clock
+        )
+
+    def probe(self):
+        if self.probe_fails:
+            raise ProviderDown()
+
+    def fail(self):
+        raise ProviderDown()
+
+    def raise_bad_request(self):
+        raise BadRequest()
+
+    def trip(self):
+        for _ in range(self.health.failure_threshold):
+            with self.assertRaises(ProviderDown):
+                self.health.call(self.fail)
+
+    def test_closed_calls_pass_through(self):
+        """Test calls go straight through while the provider is healthy"""
+        self.assertEqual(self.health.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.health.state, ProviderHealth.CLOSED)
+        self.assertEqual(self.health.stats['calls'], 1)
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        """Test consecutive failures open the circuit and later calls are not made"""
+        self.trip()
+        self.assertEqual(self.health.state, ProviderHealth.OPEN)
+
+        calls = []
+        with self.assertRaises(CircuitOpenError) as context:
+            self.health.call(calls.append, 'sent')
+        self.assertEqual(calls, [])
+        self.assertAlmostEqual(context.exception.retry_in, 5)
+        self.assertEqual(self.health.stats['rejected'], 1)
+
+    def test_request_errors_do_not_trip(self):
+        """Test errors caused by the request itself keep the circuit closed"""
+        for _ in range(5):
+            with self.assertRaises(BadRequest):
+                self.health.call(self.raise_bad_request)
+        self.assertEqual(self.health.state, ProviderHealth.CLOSED)
+
+    def test_half_open_allows_one_trial(self):
+        """Test only one trial runs after the backoff and its result decides the state"""
+        self.trip()
+        self.clock.now += 5
+
+        self.assertTrue(self.health.allow_request())
+        self.assertEqual(self.health.state, ProviderHealth.HALF_OPEN)
+        self.assertFalse(self.health.allow_request())
+
+        self.health.record_success()
+        self.assertEqual(self.health.state, ProviderHealth.CLOSED)
+        self.assertEqual(self.health.call(lambda: 'ok'), 'ok')
+
+    def test_backoff_grows_after_failed_trials(self):
+        """Test each failed trial doubles the wait up to the maximum"""
+        self.trip()
+        waits = [self.health.retry_in()]
+        for _ in range(3):
+            self.clock.now += waits[-1]
+            with self.assertRaises(ProviderDown):
+                self.health.call(self.fail)
+            waits.append(self.health.retry_in())
+        self.assertEqual(waits, [5, 10, 20, 20])
+
+    def test_probe(self):
+        """Test a failed probe opens the circuit at once and a later probe closes it"""
+        self.probe_fails = True
+        self.assertFalse(self.health.probe())
+        self.assertEqual(self.health.state, ProviderHealth.OPEN)
+
+        # Not due yet: the probe is skipped
+        self.probe_fails = False
+        self.assertFalse(self.health.probe())
+        self.assertEqual(self.health.stats['probes'], 1)
+
+        self.clock.now += 5
+        self.assertTrue(self.health.probe())
+        self.assertEqual(self.health.state, ProviderHealth.CLOSED)
+
+    def test_start_probes_once(self):
+        """Test start() probes right away when there is no scheduler"""
+        self.health.start()
+        self.assertEqual(self.health.stats['probes'], 1)
+        self.assertEqual(self.health.state, ProviderHealth.CLOSED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from app.forms.matching_form import TherapistMatchingForm
+from app.routes.matching import STEP_QUESTIONS, STEP_FLOW, MATCHING_FLOW
+from app.services.matching_flow import MatchingFlow, RESULTS, SKIPPED
+
+class MatchingFlowTestCase(unittest.TestCase):
+    def build(self, flow_changes):
+        """Compile the wizard with some STEP_FLOW entries replaced"""
+        step_flow = dict(STEP_FLOW)
+        step_flow.update(flow_changes)
+        return MatchingFlow(STEP_QUESTIONS, step_flow, TherapistMatchingForm)
+
+    def test_transitions(self):
+        """Test answers lead to the same steps as STEP_FLOW"""
+        state = MATCHING_FLOW.new_state()
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 1, 'No'), 6)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 6, 'Child & Adolescent Therapy'), 13)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 13, '2'), 14)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 14, '9'), 15)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 15, ['Emotion regulation', 'Boundary violations']), RESULTS)
+        self.assertIsNone(MATCHING_FLOW.set_answer(state, 6, 'Group Therapy'))
+
+        self.assertEqual(MATCHING_FLOW.path(state), [1, 6, 13, 14, 15])
+        self.assertEqual(MATCHING_FLOW.answers(state), {
+            '1': 'No',
+            '6': 'Child & Adolescent Therapy',
+            '13': '2',
+            '14': '9',
+            '15': ['Emotion regulation', 'Boundary violations'],
+        })
+
+    def test_skip_question(self):
+        """Test only questions whose answer picks the next step must be answered"""
+        state = MATCHING_FLOW.new_state()
+        self.assertIsNone(MATCHING_FLOW.set_answer(state, 1, ''))
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 1, 'No'), 6)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 6, 'Couples Therapy'), 11)
+        self.assertEqual(MATCHING_FLOW.set_answer(state, 11, ''), 12)
+        self.assertEqual(state[11], SKIPPED)
+        self.assertEqual(MATCHING_FLOW.answers(state)['11'], '')
+        self.assertEqual(MATCHING_FLOW.path(state), [1, 6, 11, 12])
+
+    def test_compact_state(self):
+        """Test the session state has one small slot per step"""
+        state = MATCHING_FLOW.new_state()
+        MATCHING_FLOW.set_answer(state, 7, ['Negative thoughts', 'Depressive feelings', 'Lack of belonging'])
+        self.assertEqual(len(state), len(STEP_QUESTIONS) + 1)
+        self.assertIsInstance(state[7], int)
+
+    def test_graph_validation(self):
+        """Test broken step graphs are rejected when the flow is built"""
+        with self.assertRaises(ValueError):
+            self.build({9: {'Yes': 10}})  # 'No' has no branch
+        with self.assertRaises(ValueError):
+            self.build({8: 99})  # Unknown step
+        with self.assertRaises(ValueError):
+            self.build({1: {'Yes': 6, 'No': 6}})  # Steps 2-5, 8-10 unreachable
+        with self.assertRaises(ValueError):
+            self.build({14: 13})  # 13 and 14 loop without reaching the results
+        with self.assertRaises(ValueError):
+            self.build({7: {'Negative thoughts': 'results'}})  # Branch on a multi-select
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.services.psychologist_service import PsychologistService
+from app.routes.matching import MATCHING_FLOW
+from app.config import TestingConfig
+
+class MatchingRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        # Create test users
+        self.user = User(email='user@example.com', full_name='Test User')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        self.other_user = User(email='other@example.com', full_name='Other User')
+        self.other_user.set_password('password123')
+        db.session.add(self.other_user)
+        db.session.commit()
+
+        self.psychologist = PsychologistService.create_psychologist(
+            first_name='John',
+            last_name='Doe',
+            specialties=['Depressive feelings', 'Anxiety/Panic/Worry'],
+            bio='Experienced therapist.',
+            working_hours={'Monday': '09:00-17:00'}
+        )
+
+        self.login_as(self.user)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        jobs = self.app.extensions.get('report_jobs')
+        if jobs is not None:
+            jobs.shutdown()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login_as(self, user):
+        """Log user in and store finished matching answers in the session"""
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+            state = MATCHING_FLOW.new_state()
+            MATCHING_FLOW.set_answer(state, 1, 'No')
+            MATCHING_FLOW.set_answer(state, 6, 'Individual Therapy')
+            MATCHING_FLOW.set_answer(state, 7, ['Depressive feelings'])
+            sess['matching'] = state
+            sess['recommended_therapist_id'] = self.psychologist.id
+
+    def test_wizard_session_size(self):
+        """Test walking the wizard keeps a fixed-size answer vector in the session"""
+        with self.client.session_transaction() as sess:
+            sess.pop('matching')
+        self.client.get('/matching/')
+
+        sizes = []
+        for step, field, value in [
+            (1, 'previous_support', 'Yes'),
+            (2, 'previous_support_type', 'Psychotherapy'),
+            (3, 'psychotherapy_approach', 'Schema Therapy'),
+            (4, 'session_frequency', '1-3'),
+            (5, 'reason', 'Stress'),
+            (6, 'support_type', 'Couples Therapy'),
+            (11, 'been_together_years', '1-3'),
+        ]:
+            response = self.client.post('/matching/', data={'step': step, field: value})
+            self.assertEqual(response.status_code, 302)
+            with self.client.session_transaction() as sess:
+                sizes.append(len(sess['matching']))
+        self.assertEqual(len(set(sizes)), 1)
+
+        response = self.client.post('/matching/', data={
+            'step': 12, 'togetherness_improvement_areas': ['Communication problems', 'Financial problems']
+        })
+        self.assertTrue(response.location.endswith('/matching/results'))
+        with self.client.session_transaction() as sess:
+            answers = MATCHING_FLOW.answers(sess['matching'])
+        self.assertEqual(answers['6'], 'Couples Therapy')
+        self.assertEqual(answers['12'], ['Communication problems', 'Financial problems'])
+
+        # Going back follows the answered path: 12 -> 11 -> 6 -> 5
+        with self.client.session_transaction() as sess:
+            state = sess['matching']
+            state[0] = 12
+            sess['matching'] = state
+        for expected in (11, 6, 5):
+            response = self.client.get('/matching/back')
+            self.assertTrue(response.location.endswith(f'step={expected}'))
+
+        # Unknown choices are rejected instead of stored
+        response = self.client.post('/matching/', data={'step': 6, 'support_type': 'Group Therapy'})
+        self.assertTrue(response.location.endswith('step=6'))
+
+    def test_skip_question(self):
+        """Test a question that does not pick the next step can be left blank"""
+        with self.client.session_transaction() as sess:
+            sess.pop('matching')
+        self.client.get('/matching/')
+
+        self.client.post('/matching/', data={'step': 1, 'previous_support': 'Yes'})
+        self.client.post('/matching/', data={'step': 2, 'previous_support_type': 'Psychotherapy'})
+        response = self.client.post('/matching/', data={'step': 3})
+        self.assertTrue(response.location.endswith('step=4'))
+        with self.client.session_transaction() as sess:
+            self.assertEqual(MATCHING_FLOW.answers(sess['matching'])['3'], '')
+            self.assertNotIn('_flashes', sess)
+
+        # A question whose answer picks the next step still needs one
+        response = self.client.post('/matching/', data={'step': 2})
+        self.assertTrue(response.location.endswith('step=2'))
+
+    def test_generate_report(self):
+        """Test the synchronous report download"""
+        response = self.client.get('/matching/generate_report')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertTrue(response.data.startswith(b'%PDF'))
+
+        # Repeat downloads are served from the renderer cache
+        repeat = self.client.get('/matching/generate_report')
+        self.assertEqual(repeat.data, response.data)
+        self.assertEqual(self.app.extensions['report_renderer'].hits, 1)
+
+    def test_generate_report_async(self):
+        """Test the background report job and its status endpoint"""
+        response = self.client.get('/matching/generate_report?async=1')
+        self.assertEqual(response.status_code, 202)
+        data = response.get_json()
+        self.assertIn(data['status'], ('pending', 'running', 'ready'))
+        self.assertEqual(data['status_url'], f"/matching/report/{data['job_id']}")
+
+        job = self.app.extensions['report_jobs'].get(data['job_id'], self.user.id)
+        job.result(timeout=30)
+
+        response = self.client.get(data['status_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertTrue(response.data.startswith(b'%PDF'))
+
+        # Jobs are only visible to the user who started them
+        self.assertIsNone(self.app.extensions['report_jobs'].get(data['job_id'], self.other_user.id))
+
+        response = self.client.get('/matching/report/unknown')
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from app import create_app, db
+from app.models.user import User
+from app.services.chat_service import ChatService
+from app.services.prompt_builder import PromptBuilder, estimate_tokens, MESSAGE_OVERHEAD_TOKENS, PROMPT_OVERHEAD_TOKENS
+from app.config import TestingConfig
+
+class WordTokenizer:
+    """Tokenizer stub: one token per word, remembering what it counted"""
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, text):
+        self.texts.append(text)
+        return len(text.split())
+
+class PromptBuilderTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(email='user@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+        self.tokenizer = WordTokenizer()
+        self.builder = PromptBuilder('system prompt words', tokenizer=self.tokenizer)
+        self.conversation = ChatService.get_active_conversation(self.user.id)
+        for i in range(5):
+            ChatService.add_message(self.conversation, 'user', f'question {i} ' + 'word ' * 8)
+            ChatService.add_message(self.conversation, 'assistant', f'answer {i} ' + 'word ' * 8)
+        db.session.commit()
+        self.history = ChatService.get_recent_messages(self.conversation, 10)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def prompt_tokens(self, messages):
+        return PROMPT_OVERHEAD_TOKENS + sum(
+            len(message['content'].split()) + MESSAGE_OVERHEAD_TOKENS for message in messages
+        )
+
+    def test_everything_fits(self):
+        """Test the whole history is sent when it fits the budget"""
+        messages = self.builder.build(self.conversation, self.history, 'new message', budget=1000)
+
+        self.assertEqual(len(messages), 12)
+        self.assertEqual(messages[0], {'role': 'system', 'content': 'system prompt words'})
+        self.assertEqual(messages[-1], {'role': 'user', 'content': 'new message'})
+        self.assertIsNone(self.conversation.summary)
+
+    def test_history_fits_budget(self):
+        """Test older turns are dropped into the summary until the prompt fits"""
+        messages = self.builder.build(self.conversation, self.history, 'new message', state='kaygı', budget=100)
+
+        self.assertLessEqual(self.prompt_tokens(messages), 100)
+        self.assertEqual([turn['content'] for turn in messages[1:-1]], [turn.content for turn in self.history[-2:]])
+        self.assertIn('KULLANICI DURUMU: kaygı', messages[0]['content'])
+        self.assertIn('- question 0', messages[0]['content'])
+        self.assertEqual(self.conversation.summarized_through_id, self.history[-3].id)
+
+    def test_summary_fits_budget(self):
+        """Test the oldest summary points are left out when even the summary does not fit"""
+        messages = self.builder.build(self.conversation, self.history, 'new message', budget=60)
+
+        self.assertLessEqual(self.prompt_tokens(messages), 60)
+        self.assertEqual(len(messages), 2)
+        self.assertNotIn('- question 0', messages[0]['content'])
+        self.assertIn('- question 4', messages[0]['content'])
+        self.assertEqual(self.conversation.summary.count('\n'), 4)
+
+    def test_overflow_is_summarized_once(self):
+        """Test turns already in the summary are neither resent nor summarized again"""
+        first = self.builder.build(self.conversation, self.history, 'new message', budget=100)
+        summary = self.conversation.summary
+        summarized_through_id = self.conversation.summarized_through_id
+
+        second = self.builder.build(self.conversation, self.history, 'new message', budget=100)
+        self.assertEqual(second, first)
+        self.assertEqual(self.conversation.summary, summary)
+        self.assertEqual(self.conversation.summarized_through_id, summarized_through_id)
+        self.assertEqual(summary.count('- question 0'), 1)
+
+    def test_system_prompt_counted_once(self):
+        """Test the static system prompt is tokenized when the builder is created only"""
+        self.builder.build(self.conversation, self.history, 'new message', budget=80)
+        self.builder.build(self.conversation, self.history, 'another message', budget=80)
+
+        self.assertEqual(self.tokenizer.texts.count('system prompt words'), 1)
+        self.assertEqual(self.builder.system_tokens, 3)
+
+    def test_estimate_tokens(self):
+        """Test the local token estimate"""
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('Merhaba, dünya!'), 3 + 1 + 2 + 1)
+
+if __name__ == '__main__':
+    unittest.main()
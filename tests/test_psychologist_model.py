@@ -3,6 +3,7 @@ import json
 from datetime import datetime, date
 from app import create_app, db
 from app.models.psychologist import Psychologist
+from app.models.psychologist_specialty import PsychologistSpecialty
 from app.models.appointment import Appointment
 from app.config import TestingConfig
 
@@ -35,6 +36,25 @@ class PsychologistModelTestCase(unittest.TestCase):
         psychologist = Psychologist.query.first()
         self.assertEqual(psychologist.get_specialties(), specialties)
     
+    def test_specialty_entries_sync(self):
+        """Test specialty rows follow the specialties text"""
+        p = Psychologist(
+            first_name='John',
+            last_name='Doe',
+            specialties='Anxiety, depression, ANXIETY'
+        )
+        db.session.add(p)
+        db.session.commit()
+        
+        keys = sorted(entry.specialty_key for entry in p.specialty_entries)
+        self.assertEqual(keys, ['anxiety', 'depression'])
+        
+        p.set_specialties(['Depression', 'Trauma'])
+        db.session.commit()
+        
+        keys = sorted(entry.specialty_key for entry in PsychologistSpecialty.query.all())
+        self.assertEqual(keys, ['depression', 'trauma'])
+    
     def test_working_hours_handling(self):
         """Test working hours JSON handling"""
         working_hours = {
@@ -56,6 +76,33 @@ class PsychologistModelTestCase(unittest.TestCase):
         psychologist = Psychologist.query.first()
         self.assertEqual(psychologist.get_working_hours(), working_hours)
     
+    def test_compiled_working_hours(self):
+        """Test compiled working hours and cache invalidation"""
+        p = Psychologist(
+            first_name='John',
+            last_name='Doe'
+        )
+        p.set_working_hours({
+            'Monday': '09:00-12:00, 13:30-17:00',
+            'Tuesday': 'Not available',
+            'Friday': '10:00-18:00'
+        })
+        self.assertEqual(p.get_compiled_working_hours(), {0: ((540, 720), (810, 1020)), 4: ((600, 1080),)})
+        self.assertIs(p.get_compiled_working_hours(), p.get_compiled_working_hours())
+        
+        monday = date(2023, 1, 2)  # A Monday
+        self.assertTrue(p.is_within_working_hours(monday, '12:00'))
+        self.assertFalse(p.is_within_working_hours(monday, '13:00'))
+        self.assertFalse(p.is_within_working_hours(date(2023, 1, 3), '10:00'))
+        
+        # Setting new hours invalidates the cache
+        p.set_working_hours({'Tuesday': '10:00-11:00'})
+        self.assertEqual(p.get_compiled_working_hours(), {1: ((600, 660),)})
+        
+        # So does assigning the raw JSON text
+        p.working_hours = json.dumps({'Sunday': '08:00-09:00'})
+        self.assertEqual(p.get_compiled_working_hours(), {6: ((480, 540),)})
+    
     def test_full_name_property(self):
         """Test full_name property"""
         p = Psychologist(
@@ -1,9 +1,10 @@
 import unittest
 from flask import url_for
-from datetime import date
+from datetime import date, time, timedelta
 from app import create_app, db
 from app.models.user import User
 from app.models.psychologist import Psychologist
+from app.models.appointment import Appointment
 from app.config import TestingConfig
 
 class PsychologistRoutesTestCase(unittest.TestCase):
@@ -132,6 +133,41 @@ class PsychologistRoutesTestCase(unittest.TestCase):
         self.assertIn(b'John Doe - Availability', response.data)
         self.assertIn(today.encode(), response.data)
     
+    def test_psychologist_availability_calendar(self):
+        """Test the multi-day JSON availability mode and its cache validators"""
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(self.user.id)
+            sess['_fresh'] = True
+        
+        # A full week starting next Monday
+        monday = date.today() + timedelta(days=7 - date.today().weekday())
+        sunday = monday + timedelta(days=6)
+        db.session.add(Appointment(user_id=self.user.id, psychologist_id=self.psychologist1.id,
+                                   appointment_date=monday, appointment_time=time(9, 0), status='planned'))
+        db.session.commit()
+        
+        url = self.availability_url + f'?from={monday.isoformat()}&to={sunday.isoformat()}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(len(data['days']), 7)
+        self.assertEqual(data['days'][0]['date'], monday.isoformat())
+        self.assertNotIn('09:00', data['days'][0]['slots'])
+        self.assertIn('10:00', data['days'][0]['slots'])
+        self.assertEqual(data['days'][2]['slots'], [])
+        self.assertEqual(data['working_hours']['Monday'], [{'start': '09:00', 'end': '17:00'}])
+        self.assertIsNotNone(response.headers.get('ETag'))
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+        
+        # Revalidation with the ETag is answered with 304
+        response = self.client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        
+        # Ranges over the limit and malformed dates are rejected
+        too_long = self.availability_url + f'?from={monday.isoformat()}&to={(monday + timedelta(days=30)).isoformat()}'
+        self.assertEqual(self.client.get(too_long).status_code, 400)
+        self.assertEqual(self.client.get(self.availability_url + '?from=not-a-date').status_code, 400)
+    
     def test_search_psychologists(self):
         """Test psychologist search"""
         response = self.client.get(self.search_url + '?q=depression')
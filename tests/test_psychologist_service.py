@@ -3,8 +3,10 @@ from datetime import datetime, date, time
 from app import create_app, db
 from app.models.psychologist import Psychologist
 from app.models.appointment import Appointment
-from app.services.psychologist_service import PsychologistService
+from app.models.review import Review
+from app.services.psychologist_service import PsychologistService, PsychologistDirectory
 from app.config import TestingConfig
+from sqlalchemy import event
 
 class PsychologistServiceTestCase(unittest.TestCase):
     def setUp(self):
@@ -76,6 +78,222 @@ class PsychologistServiceTestCase(unittest.TestCase):
         psychologists = PsychologistService.filter_by_specialty('nonexistent')
         self.assertEqual(len(psychologists), 0)
     
+    def test_filter_by_specialty_case_insensitive(self):
+        """Test specialty filtering ignores case and surrounding whitespace"""
+        psychologists = PsychologistService.filter_by_specialty('  Depression ')
+        self.assertEqual([p.id for p in psychologists], [self.psychologist1.id])
+    
+    def test_filter_by_specialty_after_update(self):
+        """Test specialty filtering follows updated specialties"""
+        PsychologistService.update_psychologist(
+            psychologist_id=self.psychologist1.id,
+            specialties=['anxiety', 'stress']
+        )
+        
+        self.assertEqual(len(PsychologistService.filter_by_specialty('depression')), 0)
+        psychologists = PsychologistService.filter_by_specialty('stress')
+        self.assertEqual([p.id for p in psychologists], [self.psychologist1.id])
+    
+    def test_match(self):
+        """Test matching several specialties in one query"""
+        psychologist3 = PsychologistService.create_psychologist(
+            first_name='Robert',
+            last_name='Johnson',
+            specialties=['anxiety', 'trauma', 'Individual Therapy'],
+            bio='Specializing in anxiety and trauma.',
+            working_hours={}
+        )
+        PsychologistService.add_review(self.psychologist2.id, user_id=1, rating=5)
+        
+        matches = PsychologistService.match(['Anxiety', 'Trauma'], 'Individual Therapy')
+        self.assertEqual(
+            [(p.id, score) for p, score in matches],
+            [(psychologist3.id, 3), (self.psychologist2.id, 1), (self.psychologist1.id, 1)]
+        )
+        
+        # No requested specialties
+        self.assertEqual(PsychologistService.match([], None), [])
+    
+    def test_search_candidates(self):
+        """Test chatbot search filters on stored gender, languages and specialties"""
+        self.psychologist1.gender = 'Male'
+        self.psychologist1.languages = 'Turkish, English'
+        self.psychologist2.gender = 'Kadın'
+        self.psychologist2.languages = 'tr'
+        psychologist3 = PsychologistService.create_psychologist(
+            first_name='Robert',
+            last_name='Johnson',
+            specialties=['Anxiety Disorders'],
+            bio='Specializing in anxiety.',
+            working_hours={}
+        )
+        psychologist3.gender = 'male'
+        db.session.commit()
+        monday = date(2024, 1, 1)
+        
+        def search(**kwargs):
+            return [c['id'] for c in PsychologistService.search_candidates(today=monday, **kwargs)]
+        
+        # Same rating: more free slots in the coming week first
+        self.assertEqual(search(specialty='anxiety'), [self.psychologist1.id, psychologist3.id])
+        self.assertEqual(search(gender='female'), [self.psychologist2.id])
+        self.assertEqual(search(gender='erkek', specialty='Anxiety'), [self.psychologist1.id, psychologist3.id])
+        
+        # Unlisted languages are kept after the listed matches; 'en' does not match inside other names
+        self.assertEqual(search(language='en'), [self.psychologist1.id, psychologist3.id])
+        self.assertEqual(search(language='Türkçe'), [self.psychologist2.id, self.psychologist1.id, psychologist3.id])
+        self.assertEqual(search(specialty='nonexistent'), [])
+        
+        PsychologistService.add_review(psychologist3.id, user_id=1, rating=5)
+        self.assertEqual(search(specialty='anxiety'), [psychologist3.id, self.psychologist1.id])
+        
+        # Compact payload with booked slots subtracted
+        db.session.add(Appointment(user_id=1, psychologist_id=self.psychologist1.id, appointment_date=monday,
+                                   appointment_time=time(9, 0), status='planned'))
+        db.session.commit()
+        candidate = PsychologistService.search_candidates(specialty='depression', today=monday)[0]
+        self.assertEqual(candidate, {
+            'id': self.psychologist1.id,
+            'name': 'John Doe',
+            'specialties': ['depression', 'anxiety'],
+            'languages': ['english', 'turkish'],
+            'rating': 0,
+            'free_slots_7d': 15
+        })
+    
+    def test_add_review_updates_aggregates(self):
+        """Test adding reviews keeps the stored rating aggregates up to date"""
+        PsychologistService.add_review(self.psychologist1.id, user_id=1, rating=5, comment='Great')
+        PsychologistService.add_review(self.psychologist1.id, user_id=2, rating=2)
+        
+        psychologist = PsychologistService.get_psychologist_by_id(self.psychologist1.id)
+        self.assertEqual(psychologist.rating_sum, 7)
+        self.assertEqual(psychologist.rating_count, 2)
+        self.assertEqual(psychologist.review_count, 2)
+        self.assertEqual(psychologist.average_rating, 4)
+        self.assertEqual(self.psychologist2.average_rating, 0)
+        self.assertEqual(PsychologistService.check_rating_consistency(), [])
+    
+    def test_backfill_ratings(self):
+        """Test backfilling aggregates for reviews inserted directly"""
+        db.session.add(Review(rating=4, user_id=1, psychologist_id=self.psychologist2.id))
+        db.session.commit()
+        
+        mismatches = PsychologistService.check_rating_consistency()
+        self.assertEqual([(p.id, s, c) for p, s, c in mismatches], [(self.psychologist2.id, 4, 1)])
+        
+        self.assertEqual(PsychologistService.backfill_ratings(), 1)
+        self.assertEqual(self.psychologist2.rating_sum, 4)
+        self.assertEqual(self.psychologist2.rating_count, 1)
+        self.assertEqual(PsychologistService.check_rating_consistency(), [])
+    
+    def test_search_candidates_uses_specialty_index(self):
+        """Test the chatbot specialty search is an index range lookup with the limit in SQL"""
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            PsychologistService.search_candidates(specialty='Anx', language='tr', limit=3)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        
+        statement, parameters = statements[0]
+        self.assertIn('LIMIT', statement)
+        plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+        self.assertRegex(plan, r'SEARCH psychologist_specialties USING (COVERING )?INDEX ix_psychologist_specialties_specialty_key \(specialty_key>\? AND specialty_key<\?\)')
+        self.assertIn('SEARCH psychologists USING INTEGER PRIMARY KEY', plan)
+        self.assertNotIn('SCAN', plan)
+    
+    def _count_queries(self, func):
+        """Run func and return (result, number of SQL statements executed)"""
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return result, len(statements)
+    
+    def test_list_ratings_query_count(self):
+        """Test rating access for a 500-psychologist list costs O(1) queries"""
+        psychologists = [
+            Psychologist(first_name=f'Test{i}', last_name='Psychologist', specialties='["anxiety"]')
+            for i in range(500)
+        ]
+        db.session.add_all(psychologists)
+        db.session.flush()
+        db.session.add_all([
+            Review(rating=(i % 5) + 1, user_id=1, psychologist_id=p.id)
+            for i, p in enumerate(psychologists)
+        ])
+        db.session.commit()
+        PsychologistService.backfill_ratings()
+        
+        def read_stored_ratings():
+            return [(p.average_rating, p.review_count) for p in PsychologistService.get_all_psychologists()]
+        ratings, query_count = self._count_queries(read_stored_ratings)
+        self.assertEqual(len(ratings), 502)
+        self.assertEqual(query_count, 1)
+        self.assertEqual(ratings[2:7], [(1, 1), (2, 1), (3, 1), (4, 1), (5, 1)])
+        self.assertEqual(ratings[0], (0, 0))
+    
+    def test_report_stamp(self):
+        """Test the report stamp follows psychologist data, not the process's directory cache"""
+        stamp = PsychologistService.get_report_stamp()
+        PsychologistService.invalidate_directory()
+        self.assertEqual(PsychologistService.get_report_stamp(), stamp)
+        
+        PsychologistService.update_psychologist(self.psychologist1.id, bio='Updated bio')
+        self.assertNotEqual(PsychologistService.get_report_stamp(), stamp)
+        
+        stamp = PsychologistService.get_report_stamp()
+        PsychologistService.add_review(self.psychologist2.id, user_id=1, rating=4)
+        self.assertNotEqual(PsychologistService.get_report_stamp(), stamp)
+    
+    def test_directory_cache(self):
+        """Test the directory cache serves snapshots and is invalidated on changes"""
+        PsychologistService.invalidate_directory()
+        snapshots = PsychologistService.get_directory()
+        self.assertEqual([s.full_name for s in snapshots], ['John Doe', 'Jane Smith'])
+        self.assertEqual(snapshots[0].get_specialties(), ['depression', 'anxiety'])
+        self.assertIn('depression', snapshots[0].specialty_keys)
+        with self.assertRaises(Exception):
+            snapshots[0].first_name = 'Changed'
+        
+        # Cache hits run no queries
+        cached, query_count = self._count_queries(PsychologistService.get_directory)
+        self.assertIs(cached, snapshots)
+        self.assertEqual(query_count, 0)
+        stats = PsychologistService.directory_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 2))
+        
+        # Writes through the service invalidate the cache and bump the version
+        version = PsychologistService.get_directory_version()
+        PsychologistService.update_psychologist(self.psychologist1.id, bio='Updated bio')
+        self.assertGreater(PsychologistService.get_directory_version(), version)
+        self.assertEqual(PsychologistService.get_directory()[0].bio, 'Updated bio')
+        
+        PsychologistService.add_review(self.psychologist2.id, user_id=1, rating=4)
+        self.assertEqual(PsychologistService.get_directory()[1].review_count, 1)
+        
+        PsychologistService.create_psychologist('Robert', 'Johnson', ['grief'], 'Bio', {})
+        self.assertEqual(len(PsychologistService.get_directory()), 3)
+    
+    def test_directory_cache_ttl(self):
+        """Test expired directory entries are reloaded"""
+        directory = PsychologistDirectory(ttl=0)
+        directory.get()
+        directory.get()
+        self.assertEqual(directory.stats()['misses'], 2)
+        
+        directory = PsychologistDirectory(ttl=60)
+        directory.get()
+        directory.get()
+        self.assertEqual((directory.stats()['hits'], directory.stats()['misses']), (1, 1))
+    
     def test_create_psychologist(self):
         """Test creating a psychologist"""
         psychologist = PsychologistService.create_psychologist(
@@ -154,6 +372,32 @@ class PsychologistServiceTestCase(unittest.TestCase):
         slots = PsychologistService.get_available_slots(self.psychologist1.id, monday)
         slot_times = [slot.strftime('%H:%M') for slot in slots]
         self.assertNotIn('10:00', slot_times)
+    
+    def test_get_available_slots_for_range(self):
+        """Test computing a week of availability with a constant number of queries"""
+        monday = date(2023, 1, 2)  # A Monday
+        sunday = date(2023, 1, 8)
+        db.session.add_all([
+            Appointment(user_id=1, psychologist_id=self.psychologist1.id, appointment_date=monday,
+                        appointment_time=time(9, 0), status='planned'),
+            Appointment(user_id=1, psychologist_id=self.psychologist1.id, appointment_date=date(2023, 1, 3),
+                        appointment_time=time(11, 0), status='cancelled'),
+        ])
+        db.session.commit()
+        
+        slots_by_date, query_count = self._count_queries(
+            lambda: PsychologistService.get_available_slots_for_range(self.psychologist1.id, monday, sunday)
+        )
+        self.assertEqual(query_count, 2)
+        self.assertEqual(len(slots_by_date), 7)
+        self.assertEqual(len(slots_by_date[monday]), 7)  # 09:00-17:00 minus the booked 09:00
+        self.assertNotIn(time(9, 0), slots_by_date[monday])
+        self.assertIn(time(11, 0), slots_by_date[date(2023, 1, 3)])  # Cancelled appointments free the slot
+        self.assertEqual(slots_by_date[date(2023, 1, 4)], [])
+        
+        # Unknown psychologist or empty range
+        self.assertEqual(PsychologistService.get_available_slots_for_range(999, monday, sunday), {})
+        self.assertEqual(PsychologistService.get_available_slots_for_range(self.psychologist1.id, sunday, monday), {})
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import re
+import unittest
+from unittest import mock
+from fpdf import FPDF
+from app.routes.matching import STEP_QUESTIONS, SUGGESTION_TEMPLATES
+from app.services import report_service
+from app.services.report_service import ReportRenderer
+
+STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app', 'static'))
+
+
+class FakeTherapist:
+    profile_image_url = None
+
+    def __init__(self, full_name, average_rating=4):
+        self.full_name = full_name
+        self.average_rating = average_rating
+
+    def get_specialties(self):
+        return ['Depressive feelings', 'Anxiety/Panic/Worry']
+
+
+class ReportServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.renderer = ReportRenderer(STATIC_FOLDER, STEP_QUESTIONS, SUGGESTION_TEMPLATES, cache_size=2)
+        self.answers = {'1': 'No', '6': 'Individual Therapy', '7': ['Depressive feelings']}
+
+    def test_fonts_loaded_once(self):
+        """Test the NotoSans fonts are parsed once per process"""
+        report_service._FONT_CACHE.clear()
+        with mock.patch.object(FPDF, 'add_font', autospec=True, side_effect=FPDF.add_font) as add_font:
+            first = self.renderer.render('Ayşe Yılmaz', '01/01/2026', self.answers, FakeTherapist('Dr. Ömer Şahin'), [])
+            second = self.renderer.render('Ayşe Yılmaz', '01/01/2026', self.answers, FakeTherapist('Dr. Ömer Şahin'), [])
+        self.assertEqual(add_font.call_count, 2)  # Regular and bold, once
+        self.assertEqual(first, second)
+        self.assertIsInstance(first, bytes)
+        self.assertTrue(first.startswith(b'%PDF'))
+        self.assertTrue(first.rstrip().endswith(b'%%EOF'))
+
+    def test_font_subset(self):
+        """Test only the used glyphs are embedded and subsets are cached per character set"""
+        report_service._SUBSET_CACHE.clear()
+        answers = {
+            '1': 'Yes', '2': 'Psychotherapy', '3': 'Bilişsel davranışçı terapi',
+            '4': 'Ayda 4 seans', '5': 'Çocukluk dönemi, ilişkiler ve işteki güçlükler',
+            '6': 'Individual Therapy', '7': ['Depressive feelings', 'Anxiety/Panic/Worry', 'Feeling of loneliness'],
+        }
+        therapists = [FakeTherapist(name) for name in ('Dr. Şule Öztürk', 'Dr. Çağrı Güneş', 'Dr. İlker Ağaoğlu')]
+        hits = report_service.subset_cache_stats['hits']
+
+        pdf_bytes = self.renderer.render('Gülşen Işık', '01/01/2026', answers, therapists[0], therapists[1:])
+        self.renderer.render('Gülşen Işık', '01/01/2026', answers, therapists[0], therapists[1:])
+
+        # Both NotoSans faces together are about 1.2 MB unsubsetted
+        font_sizes = [int(size) for size in re.findall(rb'/Length1 (\d+)', pdf_bytes)]
+        self.assertEqual(len(font_sizes), 2)
+        self.assertLess(sum(font_sizes), 40 * 1024)
+        self.assertLess(len(pdf_bytes), 200 * 1024)
+        self.assertEqual(len(report_service._SUBSET_CACHE), 2)
+        self.assertEqual(report_service.subset_cache_stats['hits'] - hits, 2)
+
+    def test_cache_key(self):
+        """Test cache keys change with any report input"""
+        key = ReportRenderer.cache_key(self.answers, 1, 3, 'Ayşe', '01/01/2026')
+        self.assertEqual(key, ReportRenderer.cache_key(dict(reversed(list(self.answers.items()))), 1, 3, 'Ayşe', '01/01/2026'))
+        self.assertNotEqual(key, ReportRenderer.cache_key(self.answers, 2, 3, 'Ayşe', '01/01/2026'))
+        self.assertNotEqual(key, ReportRenderer.cache_key(self.answers, 1, 4, 'Ayşe', '01/01/2026'))
+        self.assertNotEqual(key, ReportRenderer.cache_key(self.answers, 1, 3, 'Mehmet', '01/01/2026'))
+
+    def test_pdf_cache(self):
+        """Test finished reports are served from the LRU cache"""
+        self.assertIsNone(self.renderer.get_cached('a'))
+        self.renderer.store('a', b'report-a')
+        self.renderer.store('b', b'report-b')
+        self.assertEqual(self.renderer.get_cached('a'), b'report-a')
+        self.renderer.store('c', b'report-c')  # Evicts 'b', the least recently used
+        self.assertIsNone(self.renderer.get_cached('b'))
+        self.assertEqual(self.renderer.get_cached('c'), b'report-c')
+        self.assertEqual((self.renderer.hits, self.renderer.misses), (2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from app import create_app
+from app.config import TestingConfig
+from app.sessions import SessionStore, MemorySessionStore, SQLiteSessionStore, ServerSideSession, SessionValueSerializer
+
+class SessionStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.store = self.app.session_interface.store
+        self.serializer = SessionValueSerializer()
+
+    def test_cookie_holds_only_session_id(self):
+        """Test session data stays on the server"""
+        response = self.client.post('/set-language', json={'lang': 'tr'})
+        self.assertEqual(response.status_code, 200)
+        cookie_value = response.headers['Set-Cookie'].split(';')[0].split('=', 1)[1]
+        self.assertNotIn('lang', cookie_value)
+        self.assertLess(len(cookie_value), 100)
+
+        with self.client.session_transaction() as sess:
+            self.assertEqual(sess['lang'], 'tr')
+            sess['chat_history'] = [{'role': 'user', 'content': 'x' * 5000}]
+        with self.client.session_transaction() as sess:
+            self.assertEqual(len(sess['chat_history'][0]['content']), 5000)
+            sid = sess.sid
+        self.assertIn('chat_history', self.store.load(sid)[0])
+
+    def test_only_changed_keys_written(self):
+        """Test untouched and unchanged keys are not serialized back"""
+        raw = {
+            'lang': self.serializer.dumps('tr'),
+            'chat_history': self.serializer.dumps([{'role': 'user', 'content': 'Merhaba'}]),
+            'matching': self.serializer.dumps([1, None, 2]),
+        }
+        session = ServerSideSession('sid', self.serializer, raw=raw)
+        self.assertEqual(session['lang'], 'tr')
+        session['chat_history'].append({'role': 'assistant', 'content': 'Selam'})
+        session['user_context'] = {'symptoms': []}
+
+        updates, deletes = session.changes()
+        self.assertEqual(set(updates), {'chat_history', 'user_context'})
+        self.assertEqual(deletes, set())
+        self.assertEqual(len(self.serializer.loads(updates['chat_history'])), 2)
+
+        del session['matching']
+        self.assertEqual(session.changes()[1], {'matching'})
+        self.assertEqual(set(session), {'lang', 'chat_history', 'user_context'})
+
+    def test_regenerate_session(self):
+        """Test logging out moves the session to a new id and drops the old one"""
+        with self.client.session_transaction() as sess:
+            sess['lang'] = 'tr'
+        with self.client.session_transaction() as sess:
+            old_sid = sess.sid
+
+        response = self.client.get('/auth/logout')
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(self.store.load(old_sid))
+        with self.client.session_transaction() as sess:
+            self.assertNotEqual(sess.sid, old_sid)
+            self.assertEqual(sess['lang'], 'tr')
+
+    def test_regenerate_keeps_values(self):
+        """Test a regenerated session writes every key under the new id"""
+        raw = {'lang': self.serializer.dumps('tr'), '_user_id': self.serializer.dumps('1')}
+        session = ServerSideSession('old', self.serializer, raw=raw)
+        session['_fresh'] = True
+        session.regenerate()
+
+        self.assertEqual(session.previous_sid, 'old')
+        self.assertNotEqual(session.sid, 'old')
+        updates, deletes = session.changes()
+        self.assertEqual(set(updates), {'lang', '_user_id', '_fresh'})
+        self.assertEqual(deletes, set())
+
+    def test_serializer_round_trip(self):
+        """Test tagged values survive serialization"""
+        value = {'slot': (9, 30), 'token': b'\x00\x01', 'name': 'Çağla'}
+        self.assertEqual(self.serializer.loads(self.serializer.dumps(value)), value)
+
+    def test_incomplete_store(self):
+        """Test a backend missing part of the store interface cannot be created"""
+        class LoadOnlyStore(SessionStore):
+            def load(self, sid):
+                return None
+
+        with self.assertRaises(TypeError):
+            LoadOnlyStore()
+
+    def test_memory_store_lru(self):
+        """Test the in-memory store evicts the least recently used session"""
+        store = MemorySessionStore(max_entries=2)
+        expires = time.time() + 60
+        store.save('a', {'k': '1'}, set(), expires)
+        store.save('b', {'k': '2'}, set(), expires)
+        store.load('a')
+        store.save('c', {'k': '3'}, set(), expires)
+        self.assertIsNone(store.load('b'))
+        self.assertEqual(store.load('a')[0], {'k': '1'})
+
+    def test_sqlite_store_ttl(self):
+        """Test the SQLite store applies partial updates and expires sessions"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = SQLiteSessionStore(os.path.join(directory, 'sessions.db'))
+
+        store.save('live', {'a': '1', 'b': '2'}, set(), time.time() + 60)
+        store.save('live', {'b': '3'}, {'a'}, time.time() + 60)
+        self.assertEqual(store.load('live')[0], {'b': '3'})
+
+        store.save('old', {'a': '1'}, set(), time.time() - 1)
+        self.assertIsNone(store.load('old'))
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertIsNotNone(store.load('live'))
+
+if __name__ == '__main__':
+    unittest.main()
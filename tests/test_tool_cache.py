@@ -0,0 +1,139 @@
+import unittest
+from datetime import date, time
+from app import create_app, db
+from app.models.user import User
+from app.models.psychologist import Psychologist
+from app.services.appointment_service import AppointmentService
+from app.services.psychologist_service import PsychologistService
+from app.services.tool_cache import ToolResultCache, get_tool_cache, availability_tag
+from app.routes.chatbot import PsychologyConsultantTools
+from app.config import TestingConfig
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class ToolCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.clock = FakeClock()
+        self.cache = ToolResultCache(max_entries=2, ttl=60, clock=self.clock)
+
+    def test_hit_and_miss_counters(self):
+        """Test that repeated lookups are served from the cache"""
+        calls = []
+        compute = lambda: calls.append(1) or {'slots': ['10:00']}
+
+        self.assertEqual(self.cache.get_or_compute('a', compute), {'slots': ['10:00']})
+        self.assertEqual(self.cache.get_or_compute('a', compute), {'slots': ['10:00']})
+
+        self.assertEqual(len(calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_uncacheable_results_are_not_stored(self):
+        """Test that results rejected by cacheable() are recomputed"""
+        self.cache.get_or_compute('a', lambda: 'Psychologist not found', cacheable=lambda value: isinstance(value, dict))
+
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the ttl"""
+        self.cache.set('a', 1)
+        self.clock.now += 59
+        self.assertEqual(self.cache.get('a'), 1)
+
+        self.clock.now += 2
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_invalidate_by_tag(self):
+        """Test that invalidation drops only the entries carrying the tag"""
+        monday = availability_tag(1, date(2023, 1, 2))
+        self.cache.set('monday', 1, tags=[monday])
+        self.cache.set('tuesday', 2, tags=[availability_tag(1, date(2023, 1, 3))])
+
+        self.assertEqual(self.cache.invalidate(monday), 1)
+        self.assertIsNone(self.cache.get('monday'))
+        self.assertEqual(self.cache.get('tuesday'), 2)
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+class ToolCacheInvalidationTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(email='user@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+
+        self.psychologist = Psychologist(first_name='John', last_name='Doe')
+        self.psychologist.set_working_hours({'Monday': '09:00-12:00'})
+        db.session.add(self.psychologist)
+        db.session.commit()
+
+        self.test_date = date(2023, 1, 2)  # A Monday
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_check_availability_is_cached(self):
+        """Test that a repeated availability check does not recompute"""
+        first = PsychologyConsultantTools.check_availability(self.psychologist.id, '2023-01-02')
+        second = PsychologyConsultantTools.check_availability(str(self.psychologist.id), '2023-01-02')
+
+        self.assertEqual(first['available_slots'], ['09:00', '10:00', '11:00'])
+        self.assertEqual(second, first)
+        self.assertEqual(get_tool_cache().stats()['hits'], 1)
+
+    def test_booking_invalidates_availability(self):
+        """Test that creating and cancelling an appointment refreshes cached availability"""
+        PsychologyConsultantTools.check_availability(self.psychologist.id, '2023-01-02')
+
+        appointment, _ = AppointmentService.create_appointment(
+            user_id=self.user.id,
+            psychologist_id=self.psychologist.id,
+            appointment_date=self.test_date,
+            appointment_time=time(10, 0)
+        )
+        result = PsychologyConsultantTools.check_availability(self.psychologist.id, '2023-01-02')
+        self.assertEqual(result['available_slots'], ['09:00', '11:00'])
+
+        AppointmentService.cancel_appointment(appointment.id, self.user.id)
+        result = PsychologyConsultantTools.check_availability(self.psychologist.id, '2023-01-02')
+        self.assertEqual(result['available_slots'], ['09:00', '10:00', '11:00'])
+        self.assertEqual(get_tool_cache().stats()['invalidations'], 2)
+
+    def test_psychologist_details_are_cached(self):
+        """Test that details are cached and refreshed when the directory changes"""
+        PsychologyConsultantTools.get_psychologist_details(self.psychologist.id)
+        PsychologyConsultantTools.get_psychologist_details(self.psychologist.id)
+        self.assertEqual(get_tool_cache().stats()['hits'], 1)
+
+        PsychologistService.update_psychologist(self.psychologist.id, bio='Updated bio')
+        details = PsychologyConsultantTools.get_psychologist_details(self.psychologist.id)
+        self.assertEqual(details['bio'], 'Updated bio')
+
+if __name__ == '__main__':
+    unittest.main()